@@ -8,24 +8,36 @@ Author: Arjun520
 Version: 1.2.4
 """
 
+# 启动计时从这里开始，watchdog、CommonOperations 等子系统在首次使用时才导入
+from startup_profiler import STARTUP_PROFILER
 import os
 import sys
 import json
 import time
+import stat
 import shutil
-import subprocess
 import threading
-from pathlib import Path
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 from colorama import Fore, Style, init
-import configparser
 from datetime import datetime
-import hashlib
-from common_operations import CommonOperations
+from pak_hasher import FileHasher, DEFAULT_HASH_ALGORITHM, DEFAULT_CHUNK_SIZE, format_size, format_throughput
+from fingerprint_cache import FingerprintCache
+from link_worker_pool import LinkWorkerPool, DEFAULT_WORKER_COUNT, DEFAULT_QUEUE_SIZE
+from write_quiescence import WriteQuiescenceDetector, DEFAULT_MIN_SETTLE, DEFAULT_MAX_SETTLE
+from link_registry_store import open_link_registry, BACKEND_JSON
+from dir_snapshot_store import DirectorySnapshotStore
+from copy_engine import CopyEngine, DEFAULT_BUFFER_SIZE, METHOD_REFLINK, temp_sibling
+from mod_store import ContentStore
+from retry_policy import (RetryPolicy, RetryLater, run_inline, DEFAULT_MAX_ATTEMPTS, DEFAULT_BASE_DELAY,
+                          DEFAULT_MAX_DELAY, DEFAULT_DEADLINE)
+from event_coalescer import EventCoalescer, DEFAULT_COALESCE_WINDOW, EVENT_CREATED, EVENT_DELETED, ACTION_REMOVED
+from launcher_cli import run_cli, wait_for_stop
+from save_watcher import SaveBackupScheduler, SaveDirectoryHandler, DEFAULT_SETTLE as DEFAULT_SAVE_SETTLE
+from pak_metrics import MetricsRegistry, MetricsHTTPServer, MetricsTextfileWriter, DEFAULT_TEXTFILE_INTERVAL
+from path_resolver import PathResolver
+from adaptive_observer import (ObserverSet, BACKEND_AUTO, BACKEND_NATIVE, DEFAULT_MIN_INTERVAL as DEFAULT_POLL_MIN,
+                               DEFAULT_MAX_INTERVAL as DEFAULT_POLL_MAX, DEFAULT_HEALTH_INTERVAL)
 
-# 初始化colorama
-init()
+STARTUP_PROFILER.mark("imports")
 
 # 定义emoji和颜色常量
 EMOJI = {
@@ -59,7 +71,10 @@ class PAKManagerConfig:
         # 设置日志文件路径
         self.log_file = os.path.join(self.config_dir, "Wuchang_FMM_Launcher_monitor.log")
         self.config = self.load_config()
-        self.translations = self.load_translations()
+        # 游戏目录、目标目录等路径只计算一次，配置保存时按需失效
+        self.paths = PathResolver(self.config)
+        # 翻译按语言在首次使用时加载
+        self.translations = {}
         self.current_language = self.config.get('language', 'zh_cn')
     
     def load_config(self):
@@ -72,7 +87,37 @@ class PAKManagerConfig:
             "link_method": "hardlink",
             "auto_start_modmanager": True,
             "monitor_enabled": True,
-            "log_level": "INFO"
+            "log_level": "INFO",
+            "log_max_bytes": 5 * 1024 * 1024,
+            "log_backup_count": 3,
+            "hash_algorithm": DEFAULT_HASH_ALGORITHM,
+            "hash_chunk_size": DEFAULT_CHUNK_SIZE,
+            "worker_count": DEFAULT_WORKER_COUNT,
+            "work_queue_size": DEFAULT_QUEUE_SIZE,
+            "settle_min_ms": int(DEFAULT_MIN_SETTLE * 1000),
+            "settle_max_ms": int(DEFAULT_MAX_SETTLE * 1000),
+            "event_coalesce_ms": int(DEFAULT_COALESCE_WINDOW * 1000),
+            "registry_backend": BACKEND_JSON,
+            "copy_buffer_size": DEFAULT_BUFFER_SIZE,
+            "use_mod_store": False,
+            "mod_store_directory": "",
+            "retry_max_attempts": DEFAULT_MAX_ATTEMPTS,
+            "retry_base_ms": int(DEFAULT_BASE_DELAY * 1000),
+            "retry_max_ms": int(DEFAULT_MAX_DELAY * 1000),
+            "retry_deadline_ms": int(DEFAULT_DEADLINE * 1000),
+            "metrics_port": 0,
+            "metrics_textfile": "",
+            "metrics_interval_s": int(DEFAULT_TEXTFILE_INTERVAL),
+            "backup_workers": 0,
+            "backup_keep_last": 10,
+            "backup_keep_daily": 7,
+            "backup_keep_weekly": 4,
+            "auto_backup_enabled": False,
+            "auto_backup_settle_s": int(DEFAULT_SAVE_SETTLE),
+            "observer_backend": BACKEND_AUTO,
+            "observer_poll_min_ms": int(DEFAULT_POLL_MIN * 1000),
+            "observer_poll_max_ms": int(DEFAULT_POLL_MAX * 1000),
+            "observer_health_interval_s": int(DEFAULT_HEALTH_INTERVAL)
         }
         
         if os.path.exists(self.config_file):
@@ -95,277 +140,342 @@ class PAKManagerConfig:
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=4, ensure_ascii=False)
+            # game_directory / target_directory 变化时重新计算相关路径
+            self.paths.refresh()
             return True
         except Exception as e:
             print(f"{Fore.RED}{EMOJI['ERROR']} 配置文件保存失败: {e}{Style.RESET_ALL}")
             return False
     
-    def load_translations(self):
-        """加载翻译文件"""
-        translations = {
-            "zh_cn": {
-                "title": "Fluffy Mod Manager 支持程序",
-                "version": "版本",
-                "author": "作者: Arjun520",
-                "menu": {
-                    "title": "主菜单",
-                    "setup_modmanager": "设置 Fluffy Mod Manager 路径",
-                    "setup_modmanager_configured": "设置 Fluffy Mod Manager 目录",
-                    "start_monitoring": "启动 FMM 并监控 Mod",
-                    "stop_monitoring": "停止监控",
-                    "view_links": "查看已创建的 Mod 链接",
-                    "settings": "设置",
-                    "common_operations": "常用操作",
-                    "language": "切换语言",
-                    "exit": "退出程序",
-                    "invalid_choice": "无效选择，请重试"
-                },
-                "setup": {
-                    "drag_drop_hint": "请拖放 Modmanager.exe 文件到此窗口，或输入完整路径:",
-                    "path_saved": "Fluffy Mod Manager 路径已保存",
-                    "path_invalid": "路径无效，请检查文件是否存在",
-                    "auto_start": "是否自动启动 Fluffy Mod Manager? (y/n)"
-                },
-                "monitor": {
-                    "starting": "正在启动 PAK 文件监控...",
-                    "started": "PAK 文件监控已启动",
-                    "stopped": "PAK 文件监控已停止",
-                    "new_file_detected": "检测到新的 PAK 文件",
-                    "link_created": "链接创建成功",
-                    "link_failed": "链接创建失败",
-                    "file_removed": "PAK 文件已删除，清理链接"
-                },
-                "link": {
-                    "method_hardlink": "硬链接",
-                    "method_symlink": "符号链接",
-                    "method_copy": "文件复制",
-                    "creating": "正在创建链接",
-                    "success": "链接创建成功",
-                    "failed": "链接创建失败",
-                    "cleanup": "清理链接"
-                },
-                "settings": {
-                    "title": "设置菜单",
-                    "setup_path": "设置 Fluffy Mod Manager 路径",
-                    "setup_method": "设置链接方法",
-                    "setup_target": "设置目标目录",
-                    "setup_autostart": "自动启动设置",
-                    "view_config": "查看当前配置",
-                    "return_menu": "返回主菜单",
-                    "invalid_choice": "无效选择，请重试",
-                    "continue_prompt": "按回车键继续...",
-                    "choose_method": "选择链接方法",
-                    "hardlink_desc": "硬链接 (推荐，性能最佳)",
-                    "symlink_desc": "符号链接 (需要管理员权限)",
-                    "copy_desc": "文件复制 (兼容性最好)",
-                    "smart_desc": "智能模式 (自动降级)",
-                    "choose_prompt": "请选择 (1-4):",
-                    "method_set": "链接方法已设置为:",
-                    "target_title": "设置目标目录",
-                    "current_target": "当前目标目录:",
-                    "target_hint": "相对于游戏根目录的路径，例如: Project_Plague\\Content\\Paks\\~mods",
-                    "target_prompt": "输入新的目标目录 (留空保持不变):",
-                    "target_updated": "目标目录已更新:",
-                    "autostart_title": "自动启动 Fluffy Mod Manager 设置",
-                    "current_setting": "当前设置:",
-                    "enabled": "启用",
-                    "disabled": "禁用",
-                    "autostart_prompt": "是否启用自动启动? (y/n):",
-                    "autostart_enabled": "自动启动已启用",
-                    "autostart_disabled": "自动启动已禁用",
-                    "setting_unchanged": "设置未更改"
-                },
-                "config": {
-                    "title": "当前配置",
-                    "language": "语言:",
-                    "fmm_path": "Fluffy Mod Manager路径:",
-                    "game_dir": "游戏目录:",
-                    "target_dir": "目标目录:",
-                    "link_method": "链接方法:",
-                    "auto_start": "自动启动:",
-                    "monitor_status": "监控状态:",
-                    "not_set": "未设置",
-                    "yes": "是",
-                    "no": "否",
-                    "running": "运行中",
-                    "stopped": "已停止"
-                },
-                "language": {
-                    "title": "选择语言 / Select Language",
-                    "chinese": "中文 (简体)",
-                    "english": "English",
-                    "prompt": "请选择 / Please choose (1-2):",
-                    "switched_cn": "语言已切换为中文",
-                    "invalid": "无效选择 / Invalid choice"
-                },
-                "general": {
-                    "choose_prompt": "请选择:",
-                    "continue_prompt": "按回车键继续...",
-                    "return_menu": "已返回主菜单",
-                    "exit_thanks": "感谢使用！",
-                    "program_exit": "程序已退出",
-                    "program_error": "程序运行出错:",
-                    "press_enter": "按回车键退出...",
-                    "monitoring_running": "监控已在运行中",
-                    "monitor_dir": "监控目录:",
-                    "target_dir": "目标目录:",
-                    "ctrl_c_hint": "按 Ctrl+C 返回主菜单",
-                    "found_files": "发现 {count} 个现有PAK文件，正在处理...",
-                    "fmm_started": "Fluffy Mod Manager 已启动",
-                    "fmm_start_failed": "启动 Fluffy Mod Manager 失败:",
-                    "fmm_not_configured": "Fluffy Mod Manager 路径未配置或文件不存在",
-                    "cleanup_failed": "清理链接失败:",
-                    "no_links": "暂无已创建的链接",
-                    "link_status": "已创建的PAK文件链接",
-                    "method": "方法:",
-                    "time": "时间:",
-                    "target": "目标:",
-                    "unknown": "未知",
-                    "setup_path_first": "请先设置 Fluffy Mod Manager 的路径",
-                    "file_access_retry": "文件访问重试中...",
-                    "permission_warning": "权限不足，但操作可能已成功"
-                }
+    def load_translations(self, language):
+        """加载指定语言的翻译（首次使用该语言时才构建）"""
+        builder = {"zh_cn": self._translations_zh_cn, "en": self._translations_en}.get(language)
+        return builder() if builder else {}
+    
+    @staticmethod
+    def _translations_zh_cn():
+        """中文翻译"""
+        return {
+            "title": "Fluffy Mod Manager 支持程序",
+            "version": "版本",
+            "author": "作者: Arjun520",
+            "menu": {
+                "title": "主菜单",
+                "setup_modmanager": "设置 Fluffy Mod Manager 路径",
+                "setup_modmanager_configured": "设置 Fluffy Mod Manager 目录",
+                "start_monitoring": "启动 FMM 并监控 Mod",
+                "stop_monitoring": "停止监控",
+                "view_links": "查看已创建的 Mod 链接",
+                "settings": "设置",
+                "common_operations": "常用操作",
+                "language": "切换语言",
+                "exit": "退出程序",
+                "invalid_choice": "无效选择，请重试"
+            },
+            "setup": {
+                "drag_drop_hint": "请拖放 Modmanager.exe 文件到此窗口，或输入完整路径:",
+                "path_saved": "Fluffy Mod Manager 路径已保存",
+                "path_invalid": "路径无效，请检查文件是否存在",
+                "auto_start": "是否自动启动 Fluffy Mod Manager? (y/n)"
+            },
+            "monitor": {
+                "starting": "正在启动 PAK 文件监控...",
+                "started": "PAK 文件监控已启动",
+                "stopped": "PAK 文件监控已停止",
+                "new_file_detected": "检测到新的 PAK 文件",
+                "link_created": "链接创建成功",
+                "link_failed": "链接创建失败",
+                "file_removed": "PAK 文件已删除，清理链接",
+                "retry_stats": "文件占用重试: {retries} 次重试，{recovered} 次恢复成功，{exhausted} 次超出时限，{fatal} 次不可重试",
+                "coalesce_stats": "事件合并: 收到 {events} 个事件，执行 {actions} 个动作",
+                "save_watch": "自动备份存档目录",
+                "save_backup_done": "存档已自动备份",
+                "save_backup_failed": "存档自动备份失败",
+                "metrics_endpoint": "运行指标端点",
+                "metrics_textfile": "运行指标文件",
+                "metrics_failed": "运行指标导出启动失败",
+                "observer_native": "使用系统文件通知监控",
+                "observer_polling": "使用轮询监控（网络或 FUSE 文件系统）",
+                "observer_polling_fallback": "系统文件通知不可用，改为轮询监控",
+                "missed_events": "检测到 {count} 个未收到通知的变化，已补处理: {path}",
+                "switched_to_polling": "系统文件通知不可靠，此目录改为轮询监控"
+            },
+            "link": {
+                "method_hardlink": "硬链接",
+                "method_symlink": "符号链接",
+                "method_copy": "文件复制",
+                "method_reflink": "写时复制",
+                "store_hit": "模组存储已有相同内容，跳过复制",
+                "store_other_volume": "模组存储与目标目录不在同一分区，无法从存储链接，直接链接源文件",
+                "unchanged": "目标已是相同内容，跳过重新链接",
+                "creating": "正在创建链接",
+                "success": "链接创建成功",
+                "failed": "链接创建失败",
+                "cleanup": "清理链接",
+                "hash_done": "哈希计算完成",
+                "hash_failed": "文件哈希计算失败",
+                "copy_progress": "复制进度"
+            },
+            "settings": {
+                "title": "设置菜单",
+                "setup_path": "设置 Fluffy Mod Manager 路径",
+                "setup_method": "设置链接方法",
+                "setup_target": "设置目标目录",
+                "setup_autostart": "自动启动设置",
+                "view_config": "查看当前配置",
+                "return_menu": "返回主菜单",
+                "invalid_choice": "无效选择，请重试",
+                "continue_prompt": "按回车键继续...",
+                "choose_method": "选择链接方法",
+                "hardlink_desc": "硬链接 (推荐，性能最佳)",
+                "symlink_desc": "符号链接 (需要管理员权限)",
+                "copy_desc": "文件复制 (兼容性最好)",
+                "smart_desc": "智能模式 (自动降级)",
+                "reflink_desc": "写时复制 (需文件系统支持，如 Btrfs/XFS；不支持时自动改为复制)",
+                "choose_prompt": "请选择 (1-5):",
+                "method_set": "链接方法已设置为:",
+                "target_title": "设置目标目录",
+                "current_target": "当前目标目录:",
+                "target_hint": "相对于游戏根目录的路径，例如: Project_Plague\\Content\\Paks\\~mods",
+                "target_prompt": "输入新的目标目录 (留空保持不变):",
+                "target_updated": "目标目录已更新:",
+                "autostart_title": "自动启动 Fluffy Mod Manager 设置",
+                "current_setting": "当前设置:",
+                "enabled": "启用",
+                "disabled": "禁用",
+                "autostart_prompt": "是否启用自动启动? (y/n):",
+                "autostart_enabled": "自动启动已启用",
+                "autostart_disabled": "自动启动已禁用",
+                "setting_unchanged": "设置未更改"
+            },
+            "config": {
+                "title": "当前配置",
+                "language": "语言:",
+                "fmm_path": "Fluffy Mod Manager路径:",
+                "game_dir": "游戏目录:",
+                "target_dir": "目标目录:",
+                "link_method": "链接方法:",
+                "auto_start": "自动启动:",
+                "monitor_status": "监控状态:",
+                "not_set": "未设置",
+                "yes": "是",
+                "no": "否",
+                "running": "运行中",
+                "stopped": "已停止"
             },
-            "en": {
-                "title": "Fluffy Mod Manager Supported Programs",
-                "version": "Version",
-                "author": "Author: Arjun520",
-                "menu": {
-                    "title": "Main Menu",
-                    "setup_modmanager": "Setup Fluffy Mod Manager Path",
-                    "setup_modmanager_configured": "Setup Fluffy Mod Manager Directory",
-                    "start_monitoring": "Launch FMM and Monitor Mods",
-                    "stop_monitoring": "Stop Monitoring",
-                    "view_links": "View Created Mod Links",
-                    "settings": "Settings",
-                    "common_operations": "Common Operations",
-                    "language": "Switch Language",
-                    "exit": "Exit",
-                    "invalid_choice": "Invalid choice, please try again"
-                },
-                "setup": {
-                    "drag_drop_hint": "Please drag and drop Modmanager.exe file to this window, or enter full path:",
-                    "path_saved": "Fluffy Mod Manager path saved",
-                    "path_invalid": "Invalid path, please check if file exists",
-                    "auto_start": "Auto start Fluffy Mod Manager? (y/n)"
-                },
-                "monitor": {
-                    "starting": "Starting PAK file monitoring...",
-                    "started": "PAK file monitoring started",
-                    "stopped": "PAK file monitoring stopped",
-                    "new_file_detected": "New PAK file detected",
-                    "link_created": "Link created successfully",
-                    "link_failed": "Link creation failed",
-                    "file_removed": "PAK file removed, cleaning up link"
-                },
-                "link": {
-                    "method_hardlink": "Hard Link",
-                    "method_symlink": "Symbolic Link",
-                    "method_copy": "File Copy",
-                    "creating": "Creating link",
-                    "success": "Link created successfully",
-                    "failed": "Link creation failed",
-                    "cleanup": "Cleaning up link"
-                },
-                "settings": {
-                    "title": "Settings Menu",
-                    "setup_path": "Setup Fluffy Mod Manager Path",
-                    "setup_method": "Setup Link Method",
-                    "setup_target": "Setup Target Directory",
-                    "setup_autostart": "Auto Start Settings",
-                    "view_config": "View Current Configuration",
-                    "return_menu": "Return to Main Menu",
-                    "invalid_choice": "Invalid choice, please try again",
-                    "continue_prompt": "Press Enter to continue...",
-                    "choose_method": "Choose Link Method",
-                    "hardlink_desc": "Hard Link (Recommended, Best Performance)",
-                    "symlink_desc": "Symbolic Link (Requires Admin Rights)",
-                    "copy_desc": "File Copy (Best Compatibility)",
-                    "smart_desc": "Smart Mode (Auto Fallback)",
-                    "choose_prompt": "Please choose (1-4):",
-                    "method_set": "Link method set to:",
-                    "target_title": "Setup Target Directory",
-                    "current_target": "Current target directory:",
-                    "target_hint": "Path relative to game root directory, e.g.: Project_Plague\\Content\\Paks\\~mods",
-                    "target_prompt": "Enter new target directory (leave empty to keep current):",
-                    "target_updated": "Target directory updated:",
-                    "autostart_title": "Auto Start Fluffy Mod Manager Settings",
-                    "current_setting": "Current setting:",
-                    "enabled": "Enabled",
-                    "disabled": "Disabled",
-                    "autostart_prompt": "Enable auto start? (y/n):",
-                    "autostart_enabled": "Auto start enabled",
-                    "autostart_disabled": "Auto start disabled",
-                    "setting_unchanged": "Setting unchanged"
-                },
-                "config": {
-                    "title": "Current Configuration",
-                    "language": "Language:",
-                    "fmm_path": "Fluffy Mod Manager Path:",
-                    "game_dir": "Game Directory:",
-                    "target_dir": "Target Directory:",
-                    "link_method": "Link Method:",
-                    "auto_start": "Auto Start:",
-                    "monitor_status": "Monitor Status:",
-                    "not_set": "Not Set",
-                    "yes": "Yes",
-                    "no": "No",
-                    "running": "Running",
-                    "stopped": "Stopped"
-                },
-                "language": {
-                    "title": "选择语言 / Select Language",
-                    "chinese": "中文 (简体)",
-                    "english": "English",
-                    "prompt": "请选择 / Please choose (1-2):",
-                    "switched_en": "Language switched to English",
-                    "invalid": "无效选择 / Invalid choice"
-                },
-                "general": {
-                    "choose_prompt": "Please choose:",
-                    "continue_prompt": "Press Enter to continue...",
-                    "return_menu": "Returned to main menu",
-                    "exit_thanks": "Thank you for using it!",
-                    "program_exit": "Program exited",
-                    "program_error": "Program error:",
-                    "press_enter": "Press Enter to exit...",
-                    "monitoring_running": "Monitoring is already running",
-                    "monitor_dir": "Monitor Directory:",
-                    "target_dir": "Target Directory:",
-                    "ctrl_c_hint": "Press Ctrl+C to return to main menu",
-                    "found_files": "Found {count} existing PAK files, processing...",
-                    "fmm_started": "Fluffy Mod Manager started",
-                    "fmm_start_failed": "Failed to start Fluffy Mod Manager:",
-                    "fmm_not_configured": "Fluffy Mod Manager path not configured or file does not exist",
-                    "cleanup_failed": "Failed to cleanup link:",
-                    "no_links": "No links created yet",
-                    "link_status": "Created PAK File Links",
-                    "method": "Method:",
-                    "time": "Time:",
-                    "target": "Target:",
-                    "unknown": "Unknown",
-                    "setup_path_first": "Please setup Fluffy Mod Manager path first",
-                    "file_access_retry": "Retrying file access...",
-                    "permission_warning": "Insufficient permissions, but operation may have succeeded"
-                }
+            "language": {
+                "title": "选择语言 / Select Language",
+                "chinese": "中文 (简体)",
+                "english": "English",
+                "prompt": "请选择 / Please choose (1-2):",
+                "switched_cn": "语言已切换为中文",
+                "invalid": "无效选择 / Invalid choice"
+            },
+            "general": {
+                "choose_prompt": "请选择:",
+                "continue_prompt": "按回车键继续...",
+                "return_menu": "已返回主菜单",
+                "exit_thanks": "感谢使用！",
+                "program_exit": "程序已退出",
+                "program_error": "程序运行出错:",
+                "press_enter": "按回车键退出...",
+                "monitoring_running": "监控已在运行中",
+                "monitor_dir": "监控目录:",
+                "target_dir": "目标目录:",
+                "ctrl_c_hint": "按 Ctrl+C 返回主菜单",
+                "found_files": "发现 {count} 个现有PAK文件，正在处理...",
+                "scan_plan": "对账计划: 新建 {create}，修复 {repair}，移除 {remove}，无需处理 {ok}",
+                "offline_changes": "离线期间的变化: 链接 {link}，移除 {remove}",
+                "fmm_started": "Fluffy Mod Manager 已启动",
+                "fmm_start_failed": "启动 Fluffy Mod Manager 失败:",
+                "fmm_not_configured": "Fluffy Mod Manager 路径未配置或文件不存在",
+                "cleanup_failed": "清理链接失败:",
+                "no_links": "暂无已创建的链接",
+                "link_status": "已创建的PAK文件链接",
+                "method": "方法:",
+                "time": "时间:",
+                "target": "目标:",
+                "unknown": "未知",
+                "setup_path_first": "请先设置 Fluffy Mod Manager 的路径",
+                "file_access_retry": "文件访问重试中...",
+                "permission_warning": "权限不足，但操作可能已成功",
+                "cache_stats": "指纹缓存: 命中 {hits}，未命中 {misses}，清除过期 {evicted}"
+            }
+        }
+    
+    @staticmethod
+    def _translations_en():
+        """英文翻译"""
+        return {
+            "title": "Fluffy Mod Manager Supported Programs",
+            "version": "Version",
+            "author": "Author: Arjun520",
+            "menu": {
+                "title": "Main Menu",
+                "setup_modmanager": "Setup Fluffy Mod Manager Path",
+                "setup_modmanager_configured": "Setup Fluffy Mod Manager Directory",
+                "start_monitoring": "Launch FMM and Monitor Mods",
+                "stop_monitoring": "Stop Monitoring",
+                "view_links": "View Created Mod Links",
+                "settings": "Settings",
+                "common_operations": "Common Operations",
+                "language": "Switch Language",
+                "exit": "Exit",
+                "invalid_choice": "Invalid choice, please try again"
+            },
+            "setup": {
+                "drag_drop_hint": "Please drag and drop Modmanager.exe file to this window, or enter full path:",
+                "path_saved": "Fluffy Mod Manager path saved",
+                "path_invalid": "Invalid path, please check if file exists",
+                "auto_start": "Auto start Fluffy Mod Manager? (y/n)"
+            },
+            "monitor": {
+                "starting": "Starting PAK file monitoring...",
+                "started": "PAK file monitoring started",
+                "stopped": "PAK file monitoring stopped",
+                "new_file_detected": "New PAK file detected",
+                "link_created": "Link created successfully",
+                "link_failed": "Link creation failed",
+                "file_removed": "PAK file removed, cleaning up link",
+                "retry_stats": "File-busy retries: {retries} retries, {recovered} recovered, {exhausted} exhausted, {fatal} not retryable",
+                "coalesce_stats": "Event coalescing: {events} events in, {actions} actions out",
+                "save_watch": "Auto-backing up save directory",
+                "save_backup_done": "Saves backed up automatically",
+                "save_backup_failed": "Automatic save backup failed",
+                "metrics_endpoint": "Metrics endpoint",
+                "metrics_textfile": "Metrics textfile",
+                "metrics_failed": "Failed to start the metrics exporter",
+                "observer_native": "Watching with native file notifications",
+                "observer_polling": "Watching by polling (network or FUSE filesystem)",
+                "observer_polling_fallback": "Native file notifications unavailable, watching by polling",
+                "missed_events": "Found {count} changes without a notification, processed them now: {path}",
+                "switched_to_polling": "Native file notifications are unreliable, this directory is now polled"
+            },
+            "link": {
+                "method_hardlink": "Hard Link",
+                "method_symlink": "Symbolic Link",
+                "method_copy": "File Copy",
+                "method_reflink": "Reflink (Copy-on-Write)",
+                "store_hit": "Identical content already in the mod store, copy skipped",
+                "store_other_volume": "Mod store is on a different volume from the target directory and cannot be linked from; linking sources directly",
+                "unchanged": "Target already has identical content, relink skipped",
+                "creating": "Creating link",
+                "success": "Link created successfully",
+                "failed": "Link creation failed",
+                "cleanup": "Cleaning up link",
+                "hash_done": "Hash computed",
+                "hash_failed": "Failed to hash file",
+                "copy_progress": "Copy progress"
+            },
+            "settings": {
+                "title": "Settings Menu",
+                "setup_path": "Setup Fluffy Mod Manager Path",
+                "setup_method": "Setup Link Method",
+                "setup_target": "Setup Target Directory",
+                "setup_autostart": "Auto Start Settings",
+                "view_config": "View Current Configuration",
+                "return_menu": "Return to Main Menu",
+                "invalid_choice": "Invalid choice, please try again",
+                "continue_prompt": "Press Enter to continue...",
+                "choose_method": "Choose Link Method",
+                "hardlink_desc": "Hard Link (Recommended, Best Performance)",
+                "symlink_desc": "Symbolic Link (Requires Admin Rights)",
+                "copy_desc": "File Copy (Best Compatibility)",
+                "smart_desc": "Smart Mode (Auto Fallback)",
+                "reflink_desc": "Reflink Copy-on-Write (Btrfs/XFS or similar; falls back to copy elsewhere)",
+                "choose_prompt": "Please choose (1-5):",
+                "method_set": "Link method set to:",
+                "target_title": "Setup Target Directory",
+                "current_target": "Current target directory:",
+                "target_hint": "Path relative to game root directory, e.g.: Project_Plague\\Content\\Paks\\~mods",
+                "target_prompt": "Enter new target directory (leave empty to keep current):",
+                "target_updated": "Target directory updated:",
+                "autostart_title": "Auto Start Fluffy Mod Manager Settings",
+                "current_setting": "Current setting:",
+                "enabled": "Enabled",
+                "disabled": "Disabled",
+                "autostart_prompt": "Enable auto start? (y/n):",
+                "autostart_enabled": "Auto start enabled",
+                "autostart_disabled": "Auto start disabled",
+                "setting_unchanged": "Setting unchanged"
+            },
+            "config": {
+                "title": "Current Configuration",
+                "language": "Language:",
+                "fmm_path": "Fluffy Mod Manager Path:",
+                "game_dir": "Game Directory:",
+                "target_dir": "Target Directory:",
+                "link_method": "Link Method:",
+                "auto_start": "Auto Start:",
+                "monitor_status": "Monitor Status:",
+                "not_set": "Not Set",
+                "yes": "Yes",
+                "no": "No",
+                "running": "Running",
+                "stopped": "Stopped"
+            },
+            "language": {
+                "title": "选择语言 / Select Language",
+                "chinese": "中文 (简体)",
+                "english": "English",
+                "prompt": "请选择 / Please choose (1-2):",
+                "switched_en": "Language switched to English",
+                "invalid": "无效选择 / Invalid choice"
+            },
+            "general": {
+                "choose_prompt": "Please choose:",
+                "continue_prompt": "Press Enter to continue...",
+                "return_menu": "Returned to main menu",
+                "exit_thanks": "Thank you for using it!",
+                "program_exit": "Program exited",
+                "program_error": "Program error:",
+                "press_enter": "Press Enter to exit...",
+                "monitoring_running": "Monitoring is already running",
+                "monitor_dir": "Monitor Directory:",
+                "target_dir": "Target Directory:",
+                "ctrl_c_hint": "Press Ctrl+C to return to main menu",
+                "found_files": "Found {count} existing PAK files, processing...",
+                "scan_plan": "Reconciliation plan: {create} to create, {repair} to repair, {remove} to remove, {ok} up to date",
+                "offline_changes": "Changes while offline: {link} to link, {remove} to remove",
+                "fmm_started": "Fluffy Mod Manager started",
+                "fmm_start_failed": "Failed to start Fluffy Mod Manager:",
+                "fmm_not_configured": "Fluffy Mod Manager path not configured or file does not exist",
+                "cleanup_failed": "Failed to cleanup link:",
+                "no_links": "No links created yet",
+                "link_status": "Created PAK File Links",
+                "method": "Method:",
+                "time": "Time:",
+                "target": "Target:",
+                "unknown": "Unknown",
+                "setup_path_first": "Please setup Fluffy Mod Manager path first",
+                "file_access_retry": "Retrying file access...",
+                "permission_warning": "Insufficient permissions, but operation may have succeeded",
+                "cache_stats": "Fingerprint cache: {hits} hits, {misses} misses, {evicted} stale evicted"
             }
         }
-        return translations
     
     def get_text(self, key, **kwargs):
         """获取翻译文本"""
         try:
             keys = key.split('.')
-            value = self.translations.get(self.current_language, {})
+            value = self.get_language_pack(self.current_language)
             for k in keys:
                 value = value.get(k, key)
             return value.format(**kwargs) if kwargs else value
         except:
             return key
     
+    def get_language_pack(self, language):
+        """获取某种语言的翻译，首次使用时构建"""
+        pack = self.translations.get(language)
+        if pack is None:
+            with STARTUP_PROFILER.section(f"translations:{language}"):
+                pack = self.translations[language] = self.load_translations(language)
+        return pack
+    
     def set_language(self, lang):
         """设置语言"""
-        if lang in self.translations:
+        if self.get_language_pack(lang):
             self.current_language = lang
             self.config['language'] = lang
             self.save_config()
@@ -404,147 +514,554 @@ class PAKLogo:
         print(f"{Fore.BLUE}{EMOJI['INFO']} {config.get_text('author')}{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}{'─' * 86}{Style.RESET_ALL}")
 
-class PAKFileHandler(FileSystemEventHandler):
-    """PAK文件事件处理器"""
+class PAKFileHandler:
+    """PAK文件事件处理器（实现 watchdog 的 dispatch 接口，启动时无需导入 watchdog）"""
     
     def __init__(self, pak_manager):
         self.pak_manager = pak_manager
         self.config = pak_manager.config
+        self.logger = pak_manager.logger
+        self.write_detector = pak_manager.write_detector
+    
+    def dispatch(self, event):
+        """按事件类型分发到 on_<类型> 方法"""
+        handler = getattr(self, f"on_{event.event_type}", None)
+        if handler is not None:
+            self.pak_manager.metric_events.inc(event.event_type)
+            handler(event)
     
     def on_created(self, event):
-        """文件创建事件"""
+        """文件创建事件（先合并，耗时操作由工作线程完成）"""
         if not event.is_directory and event.src_path.lower().endswith('.pak'):
-            # 等待文件写入完成，增加重试机制
-            max_retries = 5
-            for i in range(max_retries):
-                time.sleep(0.5)  # 减少单次等待时间但增加重试次数
-                if os.path.exists(event.src_path):
-                    try:
-                        # 尝试打开文件确保写入完成
-                        with open(event.src_path, 'rb') as f:
-                            f.read(1)  # 读取一个字节测试文件是否可访问
-                        break
-                    except (PermissionError, OSError):
-                        if i == max_retries - 1:
-                            return  # 最后一次重试失败则放弃
-                        continue
-                else:
-                    if i == max_retries - 1:
-                        return  # 文件不存在则放弃
-            
-            print(f"\n{Fore.GREEN}{EMOJI['INFO']} {self.config.get_text('monitor.new_file_detected')}: {os.path.basename(event.src_path)}{Style.RESET_ALL}")
-            self.pak_manager.create_pak_link(event.src_path)
+            # 立即开始跟踪写入，合并窗口内的修改/关闭事件不会丢失
+            self.write_detector.begin(event.src_path)
+            self.pak_manager.event_coalescer.add(event.src_path, EVENT_CREATED)
+    
+    def on_modified(self, event):
+        """文件修改事件（仅用于判断写入是否完成，不会触发重新链接）"""
+        if not event.is_directory and event.src_path.lower().endswith('.pak'):
+            self.write_detector.note_event(event.src_path)
+    
+    def on_closed(self, event):
+        """文件写入后关闭事件（仅 Linux inotify 提供），作为写入完成信号"""
+        if not event.is_directory and event.src_path.lower().endswith('.pak'):
+            self.write_detector.note_closed(event.src_path)
     
     def on_deleted(self, event):
-        """文件删除事件"""
+        """文件删除事件（先合并，与同一文件的创建任务按顺序执行）"""
         if not event.is_directory and event.src_path.lower().endswith('.pak'):
-            print(f"\n{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.file_removed')}: {os.path.basename(event.src_path)}{Style.RESET_ALL}")
-            self.pak_manager.cleanup_pak_link(event.src_path)
+            self.write_detector.discard(event.src_path)
+            self.pak_manager.event_coalescer.add(event.src_path, EVENT_DELETED)
+    
+    def handle_action(self, src_path, action):
+        """处理合并后的动作（创建、删除或替换）"""
+        if action == ACTION_REMOVED:
+            self.pak_manager.submit_pak_job(src_path, self._process_deleted, src_path)
+        elif self.write_detector.claim(src_path):
+            # 创建和替换都重新链接；已有等待中的任务时不重复提交
+            self.pak_manager.submit_pak_job(src_path, self._process_created, src_path)
+    
+    def _process_created(self, src_path):
+        """在工作线程中等待文件写入完成并创建链接"""
+        began = time.perf_counter()
+        ready, track = self.write_detector.wait_until_ready(src_path)
+        self.pak_manager.metric_ready_wait.observe(time.perf_counter() - began, "ready" if ready else "abandoned")
+        self.write_detector.finish(src_path, track)
+        if not ready:
+            return  # 文件已删除或等待超时则放弃
+        
+        self.logger.info(f"\n{Fore.GREEN}{EMOJI['INFO']} {self.config.get_text('monitor.new_file_detected')}: {os.path.basename(src_path)}{Style.RESET_ALL}")
+        return self.pak_manager.create_pak_link(src_path)
+    
+    def _process_deleted(self, src_path):
+        """在工作线程中清理链接"""
+        self.logger.warning(f"\n{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.file_removed')}: {os.path.basename(src_path)}{Style.RESET_ALL}")
+        return self.pak_manager.cleanup_pak_link(src_path)
 
 class PAKManager:
     """PAK文件管理器主类"""
     
     def __init__(self):
         self.config = PAKManagerConfig()
+        STARTUP_PROFILER.mark("config")
         self.observer = None
+        self.worker_pool = None
+        self.event_coalescer = None
+        self.save_scheduler = None
         self.monitoring = False
+        # 停止监控时设置，等待监控的线程阻塞在此事件上
+        self.stop_event = threading.Event()
+        # 运行状态文件，供 status 命令读取
+        self.status_file = os.path.join(self.config.config_dir, "launcher_status.json")
+        # 注册表会被多个工作线程同时修改
+        self.registry_lock = threading.RLock()
+        # 子系统在首次使用时才创建
+        self._init_lock = threading.RLock()
         # 设置链接注册表文件到配置目录
         self.link_registry_file = os.path.join(self.config.config_dir, "pak_links_registry.json")
-        self.link_registry = self.load_link_registry()
-        self.common_ops = CommonOperations(self.config)
-        
-        # 确保目标目录存在
-        self.ensure_target_directory()
+        self.hasher = self._create_hasher()
+        self.copy_engine = CopyEngine(self.config.config.get('copy_buffer_size', DEFAULT_BUFFER_SIZE))
+        self.write_detector = WriteQuiescenceDetector(
+            self.config.config.get('settle_min_ms', DEFAULT_MIN_SETTLE * 1000) / 1000,
+            self.config.config.get('settle_max_ms', DEFAULT_MAX_SETTLE * 1000) / 1000,
+            close_events=sys.platform.startswith('linux')
+        )
+        # 停止监控时保存的目录快照，用于启动时检测离线变化
+        self.snapshot_store = DirectorySnapshotStore(os.path.join(self.config.config_dir, "pak_dir_snapshot.json"))
+        # 文件指纹缓存，与注册表放在同一目录
+        self.fingerprint_cache_file = os.path.join(self.config.config_dir, "pak_fingerprint_cache.json")
+        # 文件被占用时的重试策略（指数退避 + 抖动 + 总时限）
+        self.retry_policy = RetryPolicy(
+            self.config.config.get('retry_max_attempts', DEFAULT_MAX_ATTEMPTS),
+            self.config.config.get('retry_base_ms', DEFAULT_BASE_DELAY * 1000) / 1000,
+            self.config.config.get('retry_max_ms', DEFAULT_MAX_DELAY * 1000) / 1000,
+            self.config.config.get('retry_deadline_ms', DEFAULT_DEADLINE * 1000) / 1000
+        )
+        # 热路径运行指标，可通过本地端点或文本文件导出
+        self._create_metrics()
+        self.metrics_exporters = []
+        # 目标目录在开始监控或扫描时创建
+        self._prepared_target_dir = None
+        # 目标目录 -> 能否从模组存储链接（是否与存储在同一分区）
+        self._store_reachable = {}
+        STARTUP_PROFILER.mark("manager")
+    
+    def _create_metrics(self):
+        """创建运行指标（队列深度和重试次数在导出时读取）"""
+        self.metrics = MetricsRegistry()
+        self.metric_events = self.metrics.counter(
+            "events_total", "File system events received by the PAK handler", ("type",))
+        self.metric_ready_wait = self.metrics.histogram(
+            "ready_wait_seconds", "Time spent waiting for a new PAK file to finish writing", ("result",))
+        self.metric_hash_seconds = self.metrics.histogram(
+            "hash_seconds", "Time spent hashing PAK files that missed the fingerprint cache")
+        self.metric_hash_lookups = self.metrics.counter(
+            "hash_lookups_total", "PAK hash lookups by fingerprint cache result", ("result",))
+        self.metric_link_seconds = self.metrics.histogram(
+            "link_seconds", "Time from hashing done to the link being in place, including retry delays", ("method", "result"))
+        self.metric_failures = self.metrics.counter(
+            "failures_total", "Failed operations by stage", ("stage",))
+        self.metric_registry_flush = self.metrics.histogram(
+            "registry_flush_seconds", "Time spent writing the link registry snapshot")
+        self.metrics.gauge_callback(
+            "queue_depth", "Work waiting in each monitoring stage", self._queue_depths, ("stage",))
+        self.metrics.counter_callback(
+            "retries_total", "File-busy retry policy counters", self._retry_counters, ("operation", "outcome"))
+        self.metrics.gauge_callback(
+            "links", "Links in the registry", lambda: len(self.link_registry) if self._loaded('_link_registry') else None)
+        self.metric_missed_events = self.metrics.counter(
+            "observer_missed_events_total", "Changes found by the health check that the native observer did not report")
+        self.metrics.gauge_callback(
+            "observer_poll_interval_seconds", "Current adaptive polling interval",
+            lambda: self.observer.poll_interval() if self.observer is not None else None)
+        self.metrics.gauge_callback(
+            "watched_directories", "Watched directories per observer backend",
+            lambda: self.observer.backend_counts() if self.observer is not None else {}, ("backend",))
+    
+    def _queue_depths(self):
+        """各阶段当前积压的工作数"""
+        depths = {("writing",): self.write_detector.pending_count()}
+        coalescer, pool = self.event_coalescer, self.worker_pool
+        if coalescer is not None:
+            depths[("coalescing",)] = coalescer.pending_count()
+        if pool is not None:
+            depths[("jobs",)] = pool.pending()
+            depths[("retry_wait",)] = pool.deferred()
+        if self.save_scheduler is not None:
+            depths[("save_backup",)] = self.save_scheduler.pending_count()
+        return depths
+    
+    def _retry_counters(self):
+        """重试统计转换为指标样本"""
+        return {(operation, field): value
+                for operation, counters in self.retry_policy.stats.snapshot().items()
+                for field, value in counters.items()}
+    
+    def _method_id(self, method):
+        """将翻译后的链接方式名称转换为固定的指标标签"""
+        for method_id in ("hardlink", "symlink", "reflink", "copy"):
+            if method == self.config.get_text(f'link.method_{method_id}'):
+                return method_id
+        return "none"
+    
+    def _lazy(self, name, factory):
+        """首次访问时创建子系统（工作线程可能同时访问，需加锁）"""
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            pass
+        with self._init_lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = factory()
+            return self.__dict__[name]
+    
+    def _loaded(self, name):
+        """子系统是否已创建"""
+        return name in self.__dict__
+    
+    @property
+    def logger(self):
+        """监控日志（首次使用时启动队列日志线程）"""
+        return self._lazy('_log_pipeline', self._create_log_pipeline).logger
+    
+    def _create_log_pipeline(self):
+        """创建日志管线：控制台 + 按大小轮转的日志文件，级别来自配置"""
+        # logging.handlers 导入较慢，首次输出日志时才导入
+        from pak_logging import LogPipeline, DEFAULT_LOG_MAX_BYTES, DEFAULT_LOG_BACKUP_COUNT
+        pipeline = LogPipeline(
+            self.config.log_file,
+            self.config.config.get('log_level', 'INFO'),
+            self.config.config.get('log_max_bytes', DEFAULT_LOG_MAX_BYTES),
+            self.config.config.get('log_backup_count', DEFAULT_LOG_BACKUP_COUNT)
+        )
+        pipeline.start()
+        return pipeline
+    
+    def flush_log(self):
+        """等待排队的日志输出完毕，之后的菜单和提示不会与日志交错"""
+        if self._loaded('_log_pipeline'):
+            self._log_pipeline.flush()
+    
+    @property
+    def link_registry(self):
+        """链接注册表（首次访问时加载）"""
+        return self._lazy('_link_registry', self.load_link_registry)
+    
+    @property
+    def common_ops(self):
+        """常用操作（首次访问时导入）"""
+        def create():
+            from common_operations import CommonOperations
+            return CommonOperations(self.config)
+        return self._lazy('_common_ops', create)
+    
+    @property
+    def fingerprint_cache(self):
+        """文件指纹缓存（首次访问时加载）"""
+        return self._lazy('_fingerprint_cache', lambda: FingerprintCache(self.fingerprint_cache_file))
+    
+    @property
+    def mod_store(self):
+        """内容寻址模组存储（可选），相同内容的PAK只保存一份；未启用时为 None"""
+        return self._lazy('_mod_store', self._create_mod_store)
     
     def load_link_registry(self):
-        """加载链接注册表"""
-        if os.path.exists(self.link_registry_file):
-            try:
-                with open(self.link_registry_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """加载链接注册表（json: 快照 + 追加日志；sqlite: 带索引的数据库，首次使用时迁移 JSON）"""
+        backend = self.config.config.get('registry_backend', BACKEND_JSON)
+        try:
+            registry = open_link_registry(self.link_registry_file, backend)
+        except Exception as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 注册表后端 {backend} 打开失败，改用 JSON: {e}{Style.RESET_ALL}")
+            registry = open_link_registry(self.link_registry_file, BACKEND_JSON)
+        for note in registry.recovery_notes:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 链接注册表: {note}{Style.RESET_ALL}")
+        return registry
     
     def save_link_registry(self):
-        """保存链接注册表"""
+        """立即写出注册表快照（日常操作只追加日志，由后台去抖压缩）"""
+        if not self._loaded('_link_registry'):
+            return
+        began = time.perf_counter()
         try:
-            with open(self.link_registry_file, 'w', encoding='utf-8') as f:
-                json.dump(self.link_registry, f, indent=4, ensure_ascii=False)
+            self.link_registry.flush()
+            self.metric_registry_flush.observe(time.perf_counter() - began)
         except Exception as e:
-            print(f"{Fore.RED}{EMOJI['ERROR']} 链接注册表保存失败: {e}{Style.RESET_ALL}")
+            self.metric_failures.inc("registry_flush")
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 链接注册表保存失败: {e}{Style.RESET_ALL}")
+    
+    def shutdown(self):
+        """程序退出前停止监控并写出最终状态"""
+        self.stop_monitoring()
+        if self._loaded('_link_registry'):
+            try:
+                self.link_registry.close()
+            except Exception as e:
+                self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 链接注册表保存失败: {e}{Style.RESET_ALL}")
+        self.save_fingerprint_cache()
+        if self._loaded('_mod_store') and self._mod_store is not None:
+            try:
+                self._mod_store.close()
+            except OSError as e:
+                self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 模组存储引用表保存失败: {e}{Style.RESET_ALL}")
+        # 最后停止日志线程，写出剩余记录
+        if self._loaded('_log_pipeline'):
+            self._log_pipeline.stop()
+    
+    def _create_hasher(self):
+        """根据配置创建流式哈希器"""
+        algorithm = self.config.config.get('hash_algorithm', DEFAULT_HASH_ALGORITHM)
+        chunk_size = self.config.config.get('hash_chunk_size', DEFAULT_CHUNK_SIZE)
+        try:
+            return FileHasher(algorithm, chunk_size)
+        except (ValueError, TypeError) as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 哈希算法配置无效，使用默认算法 {DEFAULT_HASH_ALGORITHM}: {e}{Style.RESET_ALL}")
+            return FileHasher(DEFAULT_HASH_ALGORITHM, DEFAULT_CHUNK_SIZE)
+    
+    def _create_mod_store(self):
+        """根据配置创建内容寻址模组存储，未启用时返回 None"""
+        if not self.config.config.get('use_mod_store', False):
+            return None
+        store_dir = self.config.config.get('mod_store_directory') or os.path.join(self.config.config_dir, "mod_store")
+        try:
+            return ContentStore(store_dir, self.copy_engine)
+        except OSError as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 模组存储不可用，直接链接源文件: {e}{Style.RESET_ALL}")
+            return None
+    
+    def save_fingerprint_cache(self):
+        """保存文件指纹缓存"""
+        if not self._loaded('_fingerprint_cache'):
+            return
+        try:
+            self.fingerprint_cache.save()
+        except Exception as e:
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 指纹缓存保存失败: {e}{Style.RESET_ALL}")
+    
+    def save_mod_store(self):
+        """写出模组存储的引用表（日常引用变化只追加日志）"""
+        if not self._loaded('_mod_store') or self._mod_store is None:
+            return
+        try:
+            self._mod_store.flush()
+        except OSError as e:
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 模组存储引用表保存失败: {e}{Style.RESET_ALL}")
     
     def ensure_target_directory(self):
-        """确保目标目录存在"""
-        target_dir = os.path.join(self.config.config['game_directory'], self.config.config['target_directory'])
+        """确保目标目录存在（同一目录只检查一次）"""
+        target_dir = self.config.paths.target_directory
+        if target_dir == self._prepared_target_dir:
+            return
         try:
             os.makedirs(target_dir, exist_ok=True)
-            print(f"{Fore.GREEN}{EMOJI['SUCCESS']} 目标目录已准备: {target_dir}{Style.RESET_ALL}")
+            self._prepared_target_dir = target_dir
+            self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} 目标目录已准备: {target_dir}{Style.RESET_ALL}")
         except Exception as e:
-            print(f"{Fore.RED}{EMOJI['ERROR']} 无法创建目标目录: {e}{Style.RESET_ALL}")
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 无法创建目标目录: {e}{Style.RESET_ALL}")
     
     def create_pak_link(self, source_path):
         """创建PAK文件链接"""
+        self.ensure_target_directory()
         filename = os.path.basename(source_path)
-        target_dir = os.path.join(self.config.config['game_directory'], self.config.config['target_directory'])
-        target_path = os.path.join(target_dir, filename)
+        target_path = os.path.join(self.config.paths.target_directory, filename)
         
-        print(f"{Fore.CYAN}{EMOJI['LINK']} {self.config.get_text('link.creating')}: {filename}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.CYAN}{EMOJI['LINK']} {self.config.get_text('link.creating')}: {filename}{Style.RESET_ALL}")
         
-        # 如果目标文件已存在，先删除
-        if os.path.exists(target_path):
-            max_retries = 3
-            deleted = False
-            for i in range(max_retries):
-                try:
-                    os.remove(target_path)
-                    deleted = True
-                    break
-                except PermissionError as e:
-                    if i == max_retries - 1:
-                        print(f"{Fore.YELLOW}{EMOJI['WARNING']} 无法删除现有文件（权限不足），尝试继续创建链接: {e}{Style.RESET_ALL}")
-                    else:
-                        time.sleep(0.5)
-                        continue
-                except Exception as e:
-                    if i == max_retries - 1:
-                        print(f"{Fore.RED}{EMOJI['ERROR']} 无法删除现有文件: {e}{Style.RESET_ALL}")
-                        return False
-                    else:
-                        time.sleep(0.5)
-                        continue
+        file_hash = self._get_file_hash(source_path)
+        link_started = time.perf_counter()
         
-        # 尝试创建链接
-        link_method = self.config.config['link_method']
-        success = False
-        actual_method = ""
+        # 目标已指向相同内容时只更新注册表，不做任何文件系统写入
+        if os.path.lexists(target_path):
+            existing_method = self._identical_target_method(source_path, target_path, file_hash)
+            if existing_method:
+                self._touch_link_entry(source_path, target_path, existing_method, file_hash)
+                self.metric_link_seconds.observe(time.perf_counter() - link_started, self._method_id(existing_method), "unchanged")
+                self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('link.unchanged')}: {filename} ({existing_method}){Style.RESET_ALL}")
+                return True
         
-        if link_method == "hardlink":
-            success, actual_method = self._try_hardlink(source_path, target_path)
-        elif link_method == "symlink":
-            success, actual_method = self._try_symlink(source_path, target_path)
-        elif link_method == "copy":
-            success, actual_method = self._try_copy(source_path, target_path)
-        else:
-            # 智能降级策略
-            success, actual_method = self._try_smart_link(source_path, target_path)
+        # 先在临时名称上创建链接，再原子替换目标，游戏不会看到缺失或不完整的PAK
+        staging_path = temp_sibling(target_path)
+        self._remove_staging(staging_path)
+        store_object = None
+        success, actual_method = False, ""
+        if self.mod_store is not None and file_hash:
+            # 启用模组存储时从存储对象生成目标文件，相同内容只保存一份
+            success, actual_method = self._link_from_store(source_path, staging_path, file_hash)
+            if success:
+                store_object = file_hash
+        if not success:
+            success, actual_method = self._link_with_method(source_path, staging_path)
+        
+        pending = {
+            "source": source_path,
+            "target": target_path,
+            "staging": staging_path,
+            "method": actual_method,
+            "file_hash": file_hash,
+            "store_object": store_object,
+            "started": link_started
+        }
+        if not success:
+            self._remove_staging(staging_path)
+            return self._finish_link(pending, False)
+        return self._commit_link(pending, self.retry_policy.begin("replace"))
+    
+    def _commit_link(self, pending, attempt):
+        """将临时链接原子替换到目标位置；目标被占用时返回 RetryLater 稍后继续，放弃时保留原目标"""
+        try:
+            os.replace(pending["staging"], pending["target"])
+        except OSError as e:
+            delay = attempt.next_delay(e)
+            if delay is not None:
+                return RetryLater(delay, self._commit_link, pending, attempt)
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} 无法替换现有文件，已保留原文件: {e}{Style.RESET_ALL}")
+            self._remove_staging(pending["staging"])
+            return self._finish_link(pending, False)
+        
+        attempt.succeeded()
+        if os.path.lexists(pending["staging"]):
+            # 临时名称与目标是同一文件的硬链接时 rename 不做任何操作
+            self._remove_staging(pending["staging"])
+        return self._finish_link(pending, True)
+    
+    def _finish_link(self, pending, success):
+        """更新存储引用和注册表，输出链接结果"""
+        source_path, target_path = pending["source"], pending["target"]
+        store_object = pending["store_object"]
+        filename = os.path.basename(source_path)
+        self.metric_link_seconds.observe(time.perf_counter() - pending["started"], self._method_id(pending["method"]),
+                                         "success" if success else "failed")
+        if not success:
+            self.metric_failures.inc("link")
+        if self.mod_store is not None:
+            if success and store_object:
+                # 引用从临时名称转移到目标，旧对象在替换完成后才回收
+                self.mod_store.add_ref(store_object, target_path)
+            elif success:
+                # 目标不再来自存储时释放旧引用
+                self.mod_store.release(target_path)
+            self.mod_store.release(pending["staging"])
         
         if success:
-            # 记录链接信息
-            self.link_registry[source_path] = {
+            # 记录链接信息（哈希计算在锁外进行）
+            entry = {
                 "target": target_path,
-                "method": actual_method,
+                "method": pending["method"],
                 "created_time": datetime.now().isoformat(),
-                "file_hash": self._get_file_hash(source_path)
+                "file_hash": pending["file_hash"],
+                "hash_algorithm": self.hasher.algorithm
             }
-            self.save_link_registry()
+            if store_object:
+                entry["store_object"] = store_object
+            with self.registry_lock:
+                self.link_registry[source_path] = entry
             
-            print(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('link.success')}: {filename} ({actual_method}){Style.RESET_ALL}")
+            self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('link.success')}: {filename} ({pending['method']}){Style.RESET_ALL}")
             return True
         else:
-            print(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('link.failed')}: {filename}{Style.RESET_ALL}")
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('link.failed')}: {filename}{Style.RESET_ALL}")
             return False
     
+    @staticmethod
+    def _remove_staging(staging_path):
+        """删除临时链接"""
+        try:
+            os.remove(staging_path)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def _is_stale_staging(name):
+        """判断是否为其他进程遗留的临时链接（.<文件名>.<pid>.<线程>.tmp）"""
+        parts = name.split('.')
+        return (name.startswith('.') and name.endswith('.tmp') and len(parts) >= 5
+                and parts[-3].isdigit() and parts[-3] != str(os.getpid()))
+    
+    def _identical_target_method(self, source, target, file_hash):
+        """检查现有目标是否已指向相同内容，返回其链接方式名称，不一致时返回 None"""
+        try:
+            target_lstat = os.lstat(target)
+            if stat.S_ISLNK(target_lstat.st_mode):
+                # 符号链接：比较链接指向（相对链接按链接所在目录解析）
+                link = os.path.join(os.path.dirname(target), os.readlink(target))
+                if os.path.normcase(os.path.abspath(link)) == os.path.normcase(os.path.abspath(source)):
+                    return self.config.get_text('link.method_symlink')
+            source_stat = os.stat(source)
+            target_stat = os.stat(target)
+        except OSError:
+            return None
+        
+        if (source_stat.st_ino == target_stat.st_ino and source_stat.st_dev == target_stat.st_dev
+                and not stat.S_ISLNK(target_lstat.st_mode)):
+            return self.config.get_text('link.method_hardlink')
+        if not file_hash or source_stat.st_size != target_stat.st_size:
+            return None
+        
+        # 大小一致时比较指纹（未变化的文件直接命中指纹缓存）
+        try:
+            target_hash, _ = self.fingerprint_cache.get_or_compute(target, self.hasher)
+        except OSError:
+            return None
+        if target_hash != file_hash:
+            return None
+        if stat.S_ISLNK(target_lstat.st_mode):
+            return self.config.get_text('link.method_symlink')
+        return self.config.get_text('link.method_copy')
+    
+    def _touch_link_entry(self, source_path, target_path, method, file_hash):
+        """目标未变化时补齐注册表记录，记录已一致时不做修改"""
+        with self.registry_lock:
+            entry = self.link_registry.get(source_path)
+            if (entry and entry.get('target') == target_path and entry.get('file_hash') == file_hash
+                    and entry.get('hash_algorithm') == self.hasher.algorithm):
+                return
+            same_target = bool(entry) and entry.get('target') == target_path
+            new_entry = {
+                "target": target_path,
+                "method": entry.get('method', method) if same_target else method,
+                "created_time": datetime.now().isoformat(),
+                "file_hash": file_hash,
+                "hash_algorithm": self.hasher.algorithm
+            }
+            if same_target and entry.get('store_object') == file_hash:
+                new_entry["store_object"] = file_hash
+            self.link_registry[source_path] = new_entry
+    
+    def _link_with_method(self, source, target):
+        """按配置的链接方式创建目标文件"""
+        link_method = self.config.config['link_method']
+        if link_method == "hardlink":
+            return self._try_hardlink(source, target)
+        elif link_method == "symlink":
+            return self._try_symlink(source, target)
+        elif link_method == "copy":
+            return self._try_copy(source, target)
+        elif link_method == "reflink":
+            # 复制引擎优先尝试写时复制，不支持时（例如 Windows/NTFS）降级为复制
+            return self._try_copy(source, target)
+        # 智能降级策略
+        return self._try_smart_link(source, target)
+    
+    def _link_from_store(self, source, target, file_hash):
+        """将源文件存入模组存储并由存储对象生成目标文件（target 为临时名称，引用先登记在它上面）"""
+        if not self._can_link_from_store(os.path.dirname(target)):
+            # 存储对象无法链接到目标时导入只会多复制一份
+            return False, ""
+        try:
+            store_path, ingested = self.mod_store.acquire(source, file_hash, target)
+        except OSError as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 模组存储导入失败，直接链接源文件: {e}{Style.RESET_ALL}")
+            return False, ""
+        if not ingested:
+            self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('link.store_hit')}: {os.path.basename(source)}{Style.RESET_ALL}")
+        
+        # 存储对象不会被修改，优先硬链接或写时复制，重复内容不再占用空间
+        if self.config.config['link_method'] == "symlink":
+            success, method = self._try_symlink(store_path, target)
+        else:
+            success, method = self._try_hardlink(store_path, target)
+            if not success:
+                success, method = self._try_reflink(store_path, target)
+            if not success:
+                success, method = self._link_with_method(store_path, target)
+        if not success:
+            self.mod_store.release(target)
+        return success, method
+    
+    def _can_link_from_store(self, target_dir):
+        """存储对象能否链接到目标目录：符号链接总是可以，其他方式需要与存储在同一分区（每个目录只检查一次）"""
+        if self.config.config['link_method'] == "symlink":
+            return True
+        reachable = self._store_reachable.get(target_dir)
+        if reachable is None:
+            try:
+                reachable = os.stat(self.mod_store.objects_dir).st_dev == os.stat(target_dir).st_dev
+            except OSError:
+                reachable = False
+            self._store_reachable[target_dir] = reachable
+            if not reachable:
+                self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('link.store_other_volume')}: {self.mod_store.root_dir}{Style.RESET_ALL}")
+        return reachable
+    
     def _try_hardlink(self, source, target):
         """尝试创建硬链接"""
         try:
@@ -562,15 +1079,34 @@ class PAKManager:
             return False, ""
     
     def _try_copy(self, source, target):
-        """尝试复制文件"""
+        """尝试复制文件（内核快速路径，写入临时文件后原子重命名）"""
+        filename = os.path.basename(source)
+        
+        def report(copied, total, rate):
+            percent = copied * 100 // total if total else 100
+            self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('link.copy_progress')}: {filename} {percent}% ({format_throughput(rate)}){Style.RESET_ALL}")
+        
         try:
-            shutil.copy2(source, target)
-            return True, self.config.get_text('link.method_copy')
+            result = self.copy_engine.copy(source, target, progress=report)
+        except Exception:
+            return False, ""
+        self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('link.copy_progress')}: {filename} 100% "
+              f"({result.method}, {format_size(result.size)}, {format_throughput(result.throughput)}){Style.RESET_ALL}")
+        # 报告实际使用的方式：克隆成功时为写时复制
+        if result.method == METHOD_REFLINK:
+            return True, self.config.get_text('link.method_reflink')
+        return True, self.config.get_text('link.method_copy')
+    
+    def _try_reflink(self, source, target):
+        """尝试写时复制克隆（不占用额外空间，需文件系统支持）"""
+        try:
+            self.copy_engine.clone(source, target)
+            return True, self.config.get_text('link.method_reflink')
         except Exception:
             return False, ""
     
     def _try_smart_link(self, source, target):
-        """智能链接策略（硬链接 -> 符号链接 -> 复制）"""
+        """智能链接策略（硬链接 -> 符号链接 -> 写时复制 -> 复制）"""
         # 尝试硬链接
         success, method = self._try_hardlink(source, target)
         if success:
@@ -581,109 +1117,455 @@ class PAKManager:
         if success:
             return success, method
         
+        # 尝试写时复制克隆
+        success, method = self._try_reflink(source, target)
+        if success:
+            return success, method
+        
         # 最后尝试复制
         return self._try_copy(source, target)
     
     def _get_file_hash(self, filepath):
-        """获取文件哈希值"""
+        """获取文件哈希值（优先使用指纹缓存，未命中时分块流式读取）"""
         try:
-            with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
-        except:
+            hexdigest, result = self.fingerprint_cache.get_or_compute(filepath, self.hasher)
+        except OSError as e:
+            self.metric_failures.inc("hash")
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('link.hash_failed')}: {os.path.basename(filepath)} ({e}){Style.RESET_ALL}")
             return ""
+        
+        if result is None:
+            # 文件未变化，直接复用缓存的哈希
+            self.metric_hash_lookups.inc("hit")
+            return hexdigest
+        self.metric_hash_lookups.inc("miss")
+        self.metric_hash_seconds.observe(result.elapsed)
+        
+        self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('link.hash_done')}: {os.path.basename(filepath)} "
+              f"({result.algorithm}, {format_size(result.size)}, {format_throughput(result.throughput)}){Style.RESET_ALL}")
+        return result.hexdigest
     
     def cleanup_pak_link(self, source_path):
-        """清理PAK文件链接"""
-        if source_path in self.link_registry:
-            target_path = self.link_registry[source_path]['target']
-            try:
-                if os.path.exists(target_path):
-                    # 增加重试机制处理文件被占用的情况
-                    max_retries = 3
-                    for i in range(max_retries):
-                        try:
-                            os.remove(target_path)
-                            print(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('link.cleanup')}: {os.path.basename(target_path)}{Style.RESET_ALL}")
-                            break
-                        except PermissionError as e:
-                            if i == max_retries - 1:
-                                # 最后一次重试失败，但不阻止注册表清理
-                                print(f"{Fore.YELLOW}{EMOJI['WARNING']} 无法删除目标文件（权限不足），但已清理注册表: {os.path.basename(target_path)}{Style.RESET_ALL}")
-                            else:
-                                time.sleep(0.5)  # 等待后重试
-                                continue
-                        except Exception as e:
-                            if i == max_retries - 1:
-                                print(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.cleanup_failed')} {e}{Style.RESET_ALL}")
-                            else:
-                                time.sleep(0.5)
-                                continue
-                
-                # 无论文件删除是否成功，都清理注册表记录
-                del self.link_registry[source_path]
-                self.save_link_registry()
-            except Exception as e:
-                print(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.cleanup_failed')} {e}{Style.RESET_ALL}")
+        """清理PAK文件链接（目标被占用时按重试策略稍后继续）"""
+        with self.registry_lock:
+            entry = self.link_registry.get(source_path)
+        if entry:
+            return self._remove_link_target(source_path, entry, self.retry_policy.begin("remove"))
     
-    def start_monitoring(self):
-        """开始监控PAK文件"""
-        # 检查是否已设置Fluffy Mod Manager路径
+    def _remove_link_target(self, source_path, entry, attempt):
+        """删除目标文件；可重试的失败返回 RetryLater，不占用工作线程等待"""
+        target_path = entry['target']
+        try:
+            if os.path.lexists(target_path):
+                os.remove(target_path)
+                self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('link.cleanup')}: {os.path.basename(target_path)}{Style.RESET_ALL}")
+            attempt.succeeded()
+        except OSError as e:
+            delay = attempt.next_delay(e)
+            if delay is not None:
+                return RetryLater(delay, self._remove_link_target, source_path, entry, attempt)
+            # 放弃删除，但不阻止注册表清理
+            self.metric_failures.inc("remove")
+            if isinstance(e, PermissionError):
+                self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 无法删除目标文件（权限不足），但已清理注册表: {os.path.basename(target_path)}{Style.RESET_ALL}")
+            else:
+                self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.cleanup_failed')} {e}{Style.RESET_ALL}")
+        
+        # 无论文件删除是否成功，都清理注册表记录
+        with self.registry_lock:
+            self.link_registry.pop(source_path, None)
+        # 释放存储对象的引用，最后一个引用释放时对象被回收
+        if entry.get('store_object') and self.mod_store is not None:
+            self.mod_store.release(target_path)
+    
+    def start_monitoring(self, interactive=True, launch_fmm=True):
+        """开始监控PAK文件，成功启动时返回 True（interactive 为假时不等待用户输入）"""
+        # 检查是否已设置Fluffy Mod Manager路径（不启动FMM时不需要）
         modmanager_path = self.config.config.get('modmanager_path', '')
-        if not modmanager_path or not os.path.exists(modmanager_path):
-            print(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.setup_path_first')}{Style.RESET_ALL}")
-            input(f"\n{Fore.YELLOW}{self.config.get_text('general.continue_prompt')}{Style.RESET_ALL}")
-            return
+        if launch_fmm and (not modmanager_path or not os.path.exists(modmanager_path)):
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.setup_path_first')}{Style.RESET_ALL}")
+            self.flush_log()
+            if interactive:
+                input(f"\n{Fore.YELLOW}{self.config.get_text('general.continue_prompt')}{Style.RESET_ALL}")
+            return False
         
         if self.monitoring:
-            print(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('general.monitoring_running')}{Style.RESET_ALL}")
-            return
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('general.monitoring_running')}{Style.RESET_ALL}")
+            return False
         
-        print(f"{Fore.CYAN}{EMOJI['MONITOR']} {self.config.get_text('monitor.starting')}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.CYAN}{EMOJI['MONITOR']} {self.config.get_text('monitor.starting')}{Style.RESET_ALL}")
+        self.stop_event.clear()
         
         # 启动Modmanager.exe（如果配置了）
-        if self.config.config.get('auto_start_modmanager') and self.config.config.get('modmanager_path'):
+        if launch_fmm and self.config.config.get('auto_start_modmanager') and self.config.config.get('modmanager_path'):
             self.start_modmanager()
         
-        # 扫描现有PAK文件
-        self.scan_existing_pak_files()
+        # 确保目标目录存在
+        self.ensure_target_directory()
+        
+        # 启动工作线程池，哈希和链接不在监控线程中执行
+        self.worker_pool = self._create_worker_pool()
         
-        # 启动文件监控
-        self.observer = Observer()
+        # 同步现有PAK文件（有快照时只处理离线变化，否则在线程池中并行对账）
+        self.sync_existing_pak_files()
+        
+        # 启动事件合并，同一文件的突发事件只产生一个动作
         event_handler = PAKFileHandler(self)
-        self.observer.schedule(event_handler, self.config.config['game_directory'], recursive=False)
+        self.event_coalescer = EventCoalescer(
+            event_handler.handle_action,
+            self.config.config.get('event_coalesce_ms', DEFAULT_COALESCE_WINDOW * 1000) / 1000
+        )
+        self.event_coalescer.start()
+        
+        # 启动文件监控（按文件系统选择系统通知或轮询）
+        self.observer = self._create_observer()
+        self.observer.schedule(event_handler, self.config.paths.game_directory, recursive=False)
+        self._schedule_save_watch()
         self.observer.start()
         self.monitoring = True
+        self.write_status("running")
+        self.start_metrics_exporters()
         
-        print(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('monitor.started')}{Style.RESET_ALL}")
-        print(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('general.monitor_dir')} {self.config.config['game_directory']}{Style.RESET_ALL}")
-        print(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('general.target_dir')} {os.path.join(self.config.config['game_directory'], self.config.config['target_directory'])}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}{EMOJI['INFO']} {self.config.get_text('general.ctrl_c_hint')}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('monitor.started')}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('general.monitor_dir')} {self.config.paths.game_directory}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('general.target_dir')} {self.config.paths.target_directory}{Style.RESET_ALL}")
+        self.logger.info(f"{Fore.YELLOW}{EMOJI['INFO']} {self.config.get_text('general.ctrl_c_hint')}{Style.RESET_ALL}")
+        self.flush_log()
+        return True
     
     def stop_monitoring(self):
         """停止监控PAK文件"""
         if self.observer and self.monitoring:
             self.observer.stop()
             self.observer.join()
+            # 备份仍在静默窗口内的存档
+            if self.save_scheduler:
+                self.save_scheduler.stop(flush=True)
+                self.save_scheduler = None
+            # 输出合并窗口内剩余的事件
+            if self.event_coalescer:
+                self.event_coalescer.stop()
+                stats = self.event_coalescer.stats()
+                self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.coalesce_stats', events=stats['events_in'], actions=stats['actions_out'])}{Style.RESET_ALL}")
+                self.event_coalescer = None
+            # 等待已入队的链接任务完成
+            if self.worker_pool:
+                self.worker_pool.shutdown(wait=True)
+                self.worker_pool = None
+            retries = self.retry_policy.stats.totals()
+            if retries['retries']:
+                self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.retry_stats', **retries)}{Style.RESET_ALL}")
+            self.save_link_registry()
+            # 指纹缓存只在扫描结束和停止时写出，不随每个链接重写
+            self.save_fingerprint_cache()
+            self.save_mod_store()
+            self.save_directory_snapshot()
+            self.stop_metrics_exporters()
             self.monitoring = False
-            print(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('monitor.stopped')}{Style.RESET_ALL}")
+            self.write_status("stopped")
+            self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('monitor.stopped')}{Style.RESET_ALL}")
+            self.flush_log()
+        self.stop_event.set()
+    
+    def _create_observer(self):
+        """创建按目录选择后端的 Observer（网络文件系统上轮询，原生通知定期做健康检查）"""
+        return ObserverSet(
+            self.config.config.get('observer_backend', BACKEND_AUTO),
+            self.config.config.get('observer_poll_min_ms', DEFAULT_POLL_MIN * 1000) / 1000,
+            self.config.config.get('observer_poll_max_ms', DEFAULT_POLL_MAX * 1000) / 1000,
+            self.config.config.get('observer_health_interval_s', DEFAULT_HEALTH_INTERVAL),
+            on_backend=self._on_observer_backend,
+            on_missed=self._on_missed_events
+        )
+    
+    def _on_observer_backend(self, path, backend, reason):
+        """报告目录使用的监控后端；轮询收不到关闭事件，该目录的写入完成改按大小和写入速率判断"""
+        self.write_detector.set_close_events(path, backend == BACKEND_NATIVE)
+        if backend == BACKEND_NATIVE:
+            self.logger.debug(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.observer_native')}: {path}{Style.RESET_ALL}")
+        elif reason == "native_failed":
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.observer_polling_fallback')}: {path}{Style.RESET_ALL}")
+        elif reason == "missed_events":
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.switched_to_polling')}: {path}{Style.RESET_ALL}")
+        else:
+            self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.observer_polling')}: {path}{Style.RESET_ALL}")
+    
+    def _on_missed_events(self, path, count, moved):
+        """健康检查发现漏掉的事件（事件已补发）"""
+        self.metric_missed_events.inc(amount=count)
+        self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.missed_events', count=count, path=path)}{Style.RESET_ALL}")
+    
+    def _schedule_save_watch(self):
+        """在同一个 Observer 上监控存档目录（Saved 和 Xbox wgs），静默后自动备份"""
+        if not self.config.config.get('auto_backup_enabled', False):
+            return
+        save_dirs = self.common_ops.get_save_directories()
+        if not save_dirs:
+            return
+        self.save_scheduler = SaveBackupScheduler(
+            self._auto_backup_saves,
+            self.config.config.get('auto_backup_settle_s', DEFAULT_SAVE_SETTLE)
+        )
+        self.save_scheduler.start()
+        for save_dir in save_dirs:
+            self.observer.schedule(SaveDirectoryHandler(self.save_scheduler, save_dir), save_dir, recursive=True)
+            self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.save_watch')}: {save_dir}{Style.RESET_ALL}")
+    
+    def _auto_backup_saves(self, save_dir):
+        """在低 I/O 优先级的备份线程中创建存档快照"""
+        try:
+            result = self.common_ops.backup_save_directory(save_dir, background=True)
+        except Exception as e:
+            self.metric_failures.inc("save_backup")
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('monitor.save_backup_failed')}: {e}{Style.RESET_ALL}")
+            return
+        self.logger.info(f"{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('monitor.save_backup_done')}: "
+                         f"{result.backup_id} ({result.changed}/{result.files}, {format_size(result.stored_bytes)}){Style.RESET_ALL}")
+    
+    def start_metrics_exporters(self):
+        """按配置启动本地指标端点和指标文本文件（端口为 0、路径为空时不启动）"""
+        port = self.config.config.get('metrics_port', 0)
+        textfile = self.config.config.get('metrics_textfile', '')
+        if port:
+            server = MetricsHTTPServer(self.metrics, port)
+            try:
+                server.start()
+                self.metrics_exporters.append(server)
+                self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.metrics_endpoint')}: http://127.0.0.1:{server.port}/metrics{Style.RESET_ALL}")
+            except OSError as e:
+                self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} {self.config.get_text('monitor.metrics_failed')}: {e}{Style.RESET_ALL}")
+        if textfile:
+            writer = MetricsTextfileWriter(self.metrics, textfile,
+                                           self.config.config.get('metrics_interval_s', DEFAULT_TEXTFILE_INTERVAL))
+            writer.start()
+            self.metrics_exporters.append(writer)
+            self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('monitor.metrics_textfile')}: {textfile}{Style.RESET_ALL}")
+    
+    def stop_metrics_exporters(self):
+        """停止指标导出（文本文件在停止时写出最终值）"""
+        for exporter in self.metrics_exporters:
+            exporter.stop()
+        self.metrics_exporters = []
+    
+    def write_status(self, state):
+        """原子写入运行状态文件"""
+        status = {
+            "state": state,
+            "pid": os.getpid(),
+            "updated_time": datetime.now().isoformat(),
+            "game_directory": self.config.paths.game_directory,
+            "target_directory": self.config.config['target_directory'],
+            "link_method": self.config.config['link_method'],
+            "link_count": len(self.link_registry)
+        }
+        if state == "running":
+            status["started_time"] = status["updated_time"]
+        else:
+            status["started_time"] = self.read_status().get("started_time")
+        temp_file = f"{self.status_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(status, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.status_file)
+        except OSError as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 状态文件写入失败: {e}{Style.RESET_ALL}")
+    
+    def read_status(self):
+        """读取运行状态文件，不存在时返回空状态"""
+        try:
+            with open(self.status_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"state": "stopped"}
+    
+    def verify_links(self):
+        """校验注册表中的链接，返回 (源文件, 目标文件, 问题) 列表"""
+        problems = []
+        for source_path, info in list(self.link_registry.items()):
+            target_path = info['target']
+            if not os.path.exists(source_path):
+                problems.append((source_path, target_path, "source_missing"))
+            elif not os.path.lexists(target_path):
+                problems.append((source_path, target_path, "target_missing"))
+            elif not self._identical_target_method(source_path, target_path, self._get_file_hash(source_path)):
+                problems.append((source_path, target_path, "content_mismatch"))
+        self.save_fingerprint_cache()
+        return problems
+    
+    def _create_worker_pool(self):
+        """按配置创建并启动工作线程池"""
+        pool = LinkWorkerPool(
+            self.config.config.get('worker_count', DEFAULT_WORKER_COUNT),
+            self.config.config.get('work_queue_size', DEFAULT_QUEUE_SIZE)
+        )
+        pool.start()
+        return pool
+    
+    def submit_pak_job(self, source_path, fn, *args):
+        """将PAK文件任务提交到工作线程池（同一文件的任务按顺序执行）"""
+        pool = self.worker_pool
+        if pool is None:
+            # 未启动线程池时直接执行（重试时就地等待）
+            return run_inline(fn, *args)
+        future = pool.submit(source_path, fn, *args)
+        future.add_done_callback(self._report_job_error)
+        return future
+    
+    def _report_job_error(self, future):
+        """输出工作线程中的未处理异常"""
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('general.program_error')} {future.exception()}{Style.RESET_ALL}")
     
     def scan_existing_pak_files(self):
-        """扫描现有的PAK文件"""
-        game_dir = self.config.config['game_directory']
-        pak_files = [f for f in os.listdir(game_dir) if f.lower().endswith('.pak') and os.path.isfile(os.path.join(game_dir, f))]
+        """扫描现有的PAK文件，与注册表和目标目录对账后并行执行创建、修复和移除"""
+        self.ensure_target_directory()
+        game_dir = self.config.paths.game_directory
+        target_dir = self.config.paths.target_directory
         
-        if pak_files:
-            print(f"{Fore.CYAN}{EMOJI['INFO']} {self.config.get_text('general.found_files', count=len(pak_files))}{Style.RESET_ALL}")
-            for pak_file in pak_files:
-                source_path = os.path.join(game_dir, pak_file)
-                if source_path not in self.link_registry:
-                    self.create_pak_link(source_path)
+        # 使用 scandir 一次获取目录项及其缓存的 stat 信息
+        sources = {}
+        with os.scandir(game_dir) as it:
+            for entry in it:
+                if entry.name.lower().endswith('.pak') and entry.is_file():
+                    sources[entry.path] = entry
+        targets = {}
+        if os.path.isdir(target_dir):
+            with os.scandir(target_dir) as it:
+                for entry in it:
+                    if self._is_stale_staging(entry.name):
+                        # 上次运行中断时遗留的临时链接
+                        self._remove_staging(entry.path)
+                        continue
+                    targets[os.path.normcase(entry.name)] = entry
+        registered = dict(self.link_registry.items_in_directory(game_dir))
+        
+        create, repair, up_to_date = [], [], 0
+        for source_path, source_entry in sources.items():
+            info = registered.get(source_path)
+            if info is None:
+                create.append(source_path)
+            elif self._target_matches(source_entry, targets.get(os.path.normcase(os.path.basename(info['target']))), info):
+                up_to_date += 1
+            else:
+                repair.append(source_path)
+        # 源文件已不存在的注册项需要清理
+        remove = [source_path for source_path in registered if source_path not in sources]
+        
+        if sources:
+            self.logger.info(f"{Fore.CYAN}{EMOJI['INFO']} {self.config.get_text('general.found_files', count=len(sources))}{Style.RESET_ALL}")
+        if create or repair or remove:
+            self.logger.info(f"{Fore.CYAN}{EMOJI['INFO']} {self.config.get_text('general.scan_plan', create=len(create), repair=len(repair), remove=len(remove), ok=up_to_date)}{Style.RESET_ALL}")
+            self._run_reconcile_plan(create + repair, remove)
+        
+        # 清理已删除或已变化文件的缓存条目
+        evicted = self.fingerprint_cache.evict_stale()
+        self.save_fingerprint_cache()
+        stats = self.fingerprint_cache.stats()
+        self.logger.info(f"{Fore.BLUE}{EMOJI['INFO']} {self.config.get_text('general.cache_stats', hits=stats['hits'], misses=stats['misses'], evicted=evicted)}{Style.RESET_ALL}")
+        self.flush_log()
+    
+    def sync_existing_pak_files(self):
+        """启动时同步现有PAK文件：有上次正常停止时的快照则只重放离线变化，否则完整对账"""
+        game_dir = self.config.paths.game_directory
+        previous = self.snapshot_store.load(game_dir, self._snapshot_context())
+        # 快照只代表上次正常停止时的状态，读取后立即作废，避免崩溃后误用
+        self.snapshot_store.invalidate()
+        if previous is None:
+            self.scan_existing_pak_files()
+            return
+        
+        current = self.snapshot_store.capture(game_dir)
+        changes = self.snapshot_store.diff(previous, current)
+        # 同时补齐上次链接失败的文件并清理多余的注册项（仅内存比较，无额外 I/O）
+        pak_files = current.paths - {game_dir}
+        registered = {source for source, _ in self.link_registry.items_in_directory(game_dir)}
+        link = set(changes.link) | (pak_files - registered)
+        remove = (set(changes.remove) | (registered - pak_files)) - link
+        
+        if link or remove:
+            self.logger.info(f"{Fore.CYAN}{EMOJI['INFO']} {self.config.get_text('general.offline_changes', link=len(link), remove=len(remove))}{Style.RESET_ALL}")
+            self._run_reconcile_plan(sorted(link), sorted(remove))
+    
+    def save_directory_snapshot(self):
+        """保存监控目录快照，供下次启动检测离线变化"""
+        game_dir = self.config.paths.game_directory
+        try:
+            snapshot = self.snapshot_store.capture(game_dir)
+            self.snapshot_store.save(game_dir, snapshot, self._snapshot_context())
+        except Exception as e:
+            self.logger.warning(f"{Fore.YELLOW}{EMOJI['WARNING']} 目录快照保存失败，下次启动将完整扫描: {e}{Style.RESET_ALL}")
+    
+    def _snapshot_context(self):
+        """影响链接结果的配置，变化时快照失效"""
+        return {
+            "target_directory": self.config.config['target_directory'],
+            "link_method": self.config.config['link_method']
+        }
+    
+    def _run_reconcile_plan(self, link_paths, remove_paths):
+        """在线程池中执行链接和清理计划；未启动监控时使用临时线程池"""
+        pool = self.worker_pool or self._create_worker_pool()
+        futures = [pool.submit(path, self.create_pak_link, path) for path in link_paths]
+        futures += [pool.submit(path, self.cleanup_pak_link, path) for path in remove_paths]
+        for future in futures:
+            future.add_done_callback(self._report_job_error)
+        from concurrent.futures import wait as wait_futures
+        wait_futures(futures)
+        if pool is not self.worker_pool:
+            pool.shutdown(wait=True)
+    
+    def _target_matches(self, source_entry, target_entry, info):
+        """检查目标文件是否仍与注册表记录一致（使用 scandir 缓存的 stat 信息和指纹缓存，不读取文件内容）
+        
+        目标可能链接到源文件，也可能由注册表记录的模组存储对象生成。
+        """
+        if target_entry is None:
+            return False
+        # 目标可能指向的文件：源文件，以及记录的存储对象
+        origins = [source_entry.path]
+        store_object = info.get('store_object')
+        if store_object and self.mod_store is not None:
+            origins.append(self.mod_store.object_path(store_object))
+        try:
+            if target_entry.is_symlink():
+                # 符号链接：比较链接指向（相对链接按链接所在目录解析）
+                link = os.path.join(os.path.dirname(target_entry.path), os.readlink(target_entry.path))
+                link = os.path.normcase(os.path.abspath(link))
+                return any(link == os.path.normcase(os.path.abspath(origin)) for origin in origins)
+            
+            source_stat = source_entry.stat()
+            target_stat = target_entry.stat()
+            # 硬链接：与源文件或存储对象是同一 inode（Windows 上 scandir 不提供设备号时仅比较 inode）
+            identities = [(source_entry.inode(), source_stat.st_dev)]
+            for origin in origins[1:]:
+                try:
+                    origin_stat = os.stat(origin)
+                    identities.append((origin_stat.st_ino, origin_stat.st_dev))
+                except OSError:
+                    pass
+            target_inode, target_dev = target_entry.inode(), target_stat.st_dev
+            for inode, dev in identities:
+                if inode == target_inode and (not (dev and target_dev) or dev == target_dev):
+                    return True
+            
+            if source_stat.st_size != target_stat.st_size:
+                return False
+            # 复制：修改时间一致（复制引擎会保留修改时间）
+            if abs(source_stat.st_mtime - target_stat.st_mtime) < 2:
+                return True
+            # 写时复制等修改时间不同的副本：比较指纹缓存中未变化文件的哈希（上次链接或校验时已记录）
+            algorithm = self.hasher.algorithm
+            source_hash = self.fingerprint_cache.lookup(source_entry.path, algorithm)
+            return bool(source_hash) and self.fingerprint_cache.lookup(target_entry.path, algorithm) == source_hash
+        except OSError:
+            return False
     
     def start_modmanager(self):
         """启动Modmanager.exe"""
         modmanager_path = self.config.config.get('modmanager_path')
         if modmanager_path and os.path.exists(modmanager_path):
             try:
+                import subprocess
                 subprocess.Popen([modmanager_path], cwd=os.path.dirname(modmanager_path))
                 print(f"{Fore.GREEN}{EMOJI['ROCKET']} {self.config.get_text('general.fmm_started')}{Style.RESET_ALL}")
             except Exception as e:
@@ -816,6 +1698,7 @@ class PAKManager:
         print(f"{Fore.GREEN}2.{Style.RESET_ALL} {self.config.get_text('settings.symlink_desc')}")
         print(f"{Fore.GREEN}3.{Style.RESET_ALL} {self.config.get_text('settings.copy_desc')}")
         print(f"{Fore.GREEN}4.{Style.RESET_ALL} {self.config.get_text('settings.smart_desc')}")
+        print(f"{Fore.GREEN}5.{Style.RESET_ALL} {self.config.get_text('settings.reflink_desc')}")
         
         choice = input(f"\n{Fore.GREEN}{EMOJI['ARROW']} {self.config.get_text('settings.choose_prompt')} ").strip()
         
@@ -823,7 +1706,8 @@ class PAKManager:
             '1': 'hardlink',
             '2': 'symlink', 
             '3': 'copy',
-            '4': 'smart'
+            '4': 'smart',
+            '5': 'reflink'
         }
         
         if choice in methods:
@@ -939,6 +1823,9 @@ class PAKManager:
             print(f"{Fore.GREEN}7.{Style.RESET_ALL} {EMOJI['LANG']} {self.config.get_text('menu.language')}")
             print(f"{Fore.GREEN}0.{Style.RESET_ALL} {EMOJI['ERROR']} {self.config.get_text('menu.exit')}")
             
+            # 首屏显示完成后输出启动计时（仅 --profile-startup）
+            STARTUP_PROFILER.report("first_screen")
+            
             choice = input(f"\n{Fore.GREEN}{EMOJI['ARROW']} {self.config.get_text('general.choose_prompt')} ").strip()
             
             if choice == '1':
@@ -946,10 +1833,9 @@ class PAKManager:
                 input(f"\n{Fore.YELLOW}{self.config.get_text('general.continue_prompt')}{Style.RESET_ALL}")
             elif choice == '2':
                 try:
-                    self.start_monitoring()
-                    # 保持监控运行，直到用户按Ctrl+C
-                    while self.monitoring:
-                        time.sleep(1)
+                    # 保持监控运行，直到用户按Ctrl+C（阻塞等待，不轮询）
+                    if self.start_monitoring():
+                        wait_for_stop(self.stop_event)
                 except KeyboardInterrupt:
                     self.stop_monitoring()
                     print(f"\n{Fore.YELLOW}{EMOJI['INFO']} {self.config.get_text('general.return_menu')}{Style.RESET_ALL}")
@@ -968,21 +1854,40 @@ class PAKManager:
                 self.switch_language()
                 input(f"\n{Fore.YELLOW}{self.config.get_text('general.continue_prompt')}{Style.RESET_ALL}")
             elif choice == '0':
-                self.stop_monitoring()
+                self.shutdown()
                 print(f"\n{Fore.GREEN}{EMOJI['SUCCESS']} {self.config.get_text('general.exit_thanks')}{Style.RESET_ALL}")
                 break
             else:
                 print(f"{Fore.RED}{EMOJI['ERROR']} {self.config.get_text('menu.invalid_choice')}{Style.RESET_ALL}")
                 time.sleep(1)
 
+def _create_cli_manager():
+    """为命令行模式创建管理器，并输出启动计时（仅 --profile-startup）"""
+    pak_manager = PAKManager()
+    STARTUP_PROFILER.report()
+    return pak_manager
+
 def main():
-    """主函数"""
+    """主函数（带参数时以无人值守的命令行模式运行）"""
+    if getattr(sys, 'frozen', False):
+        # 打包后的程序作为存档备份进程池的子进程启动时，交给 multiprocessing 处理
+        import multiprocessing
+        multiprocessing.freeze_support()
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        STARTUP_PROFILER.enabled = True
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:], _create_cli_manager))
+    
+    # 初始化colorama（仅交互模式）
+    init()
     pak_manager = None
     try:
         pak_manager = PAKManager()
         pak_manager.show_main_menu()
     except KeyboardInterrupt:
         if pak_manager:
+            pak_manager.shutdown()
             print(f"\n\n{Fore.YELLOW}{EMOJI['INFO']} {pak_manager.config.get_text('general.program_exit')}{Style.RESET_ALL}")
         else:
             print(f"\n\n{Fore.YELLOW}{EMOJI['INFO']} 程序已退出{Style.RESET_ALL}")
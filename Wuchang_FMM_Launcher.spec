@@ -16,7 +16,7 @@ version_info = {
 }
 
 a = Analysis(
-    ['Wuchang_FMM_Launcher.py', 'common_operations.py'],
+    ['Wuchang_FMM_Launcher.py', 'common_operations.py', 'pak_hasher.py', 'fingerprint_cache.py', 'link_worker_pool.py', 'write_quiescence.py', 'event_coalescer.py', 'link_registry_store.py', 'dir_snapshot_store.py', 'copy_engine.py', 'mod_store.py', 'retry_policy.py', 'launcher_cli.py', 'startup_profiler.py', 'pak_metrics.py', 'pak_logging.py', 'save_backup.py', 'save_watcher.py', 'game_discovery.py', 'path_resolver.py', 'adaptive_observer.py'],
     pathex=[],
     binaries=[],
     datas=[('src/GameInfo.bin', 'src')],
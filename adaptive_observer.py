@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应监控模块 - Adaptive Observer Module
+为每个监控目录选择原生通知或快照轮询；网络文件系统（SMB/NFS/部分 FUSE）上的原生通知不可靠，自动改用轮询
+Picks native notifications or snapshot polling for each watched directory; native notifications are not
+trustworthy on network filesystems (SMB/NFS/some FUSE mounts), so those fall back to polling
+
+轮询只比较 stat 结果（大小、修改时间），有变化时缩短间隔，空闲时按指数退避；
+原生监控的目录定期做一次健康检查，发现漏掉的事件时补发，auto 模式下改为轮询。
+Polling only compares stat results (size, mtime); the interval shortens while changes arrive and backs
+off exponentially when idle. Natively watched directories get a periodic health check that replays
+missed events and, in auto mode, moves the directory to polling.
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import namedtuple
+
+BACKEND_AUTO = "auto"
+BACKEND_NATIVE = "native"
+BACKEND_POLLING = "polling"
+BACKENDS = (BACKEND_AUTO, BACKEND_NATIVE, BACKEND_POLLING)
+
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_MAX_INTERVAL = 8.0
+DEFAULT_HEALTH_INTERVAL = 60.0
+# 健康检查等待在途原生事件到达的时间 - Time the health check waits for in-flight native events
+HEALTH_GRACE = 1.0
+
+# 原生通知不可靠的文件系统类型（Linux /proc/self/mountinfo） - Filesystem types with unreliable notifications
+NETWORK_FS_TYPES = frozenset({
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "9p", "ceph", "glusterfs", "lustre",
+    "davfs", "fuse.sshfs", "fuse.rclone", "fuse.s3fs", "fuse.gcsfuse", "fuse.davfs2", "fuse.glusterfs"
+})
+
+# 与 watchdog 事件兼容的轮询事件 - Polling event compatible with watchdog events
+PollEvent = namedtuple("PollEvent", ["event_type", "src_path", "is_directory", "dest_path"], defaults=("",))
+
+
+def _mount_type_linux(path):
+    """返回路径所在挂载点的文件系统类型 - Filesystem type of the mount containing path"""
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    try:
+        with open("/proc/self/mountinfo", "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields = line.split()
+                if " - " not in line or len(fields) < 5:
+                    continue
+                # 挂载点中的空格等字符以八进制转义 - Spaces etc. in mount points are octal-escaped
+                mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4])
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fs_type = mount_point, line.split(" - ", 1)[1].split()[0]
+    except OSError:
+        return None
+    return fs_type
+
+
+def is_network_filesystem(path):
+    """判断路径是否位于网络或 FUSE 文件系统上（无法判断时返回 False） - Whether path is on a network/FUSE filesystem (False when unknown)"""
+    if not path:
+        return False
+    if os.name == 'nt':
+        if path.startswith(("\\\\", "//")):
+            return True
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            root = os.path.splitdrive(os.path.abspath(path))[0] + "\\"
+            return ctypes.windll.kernel32.GetDriveTypeW(root) == DRIVE_REMOTE
+        except (OSError, AttributeError):
+            return False
+    if sys.platform.startswith('linux'):
+        fs_type = _mount_type_linux(path)
+        return fs_type is not None and fs_type in NETWORK_FS_TYPES
+    return False
+
+
+def _key(path):
+    return os.path.normcase(os.path.normpath(os.fsdecode(path)))
+
+
+class StatSnapshot:
+    """只基于 stat 的目录快照 - Stat-only directory snapshot"""
+
+    def __init__(self, path, recursive=False):
+        self.path = path
+        self.recursive = recursive
+
+    def capture(self):
+        """路径 -> (是否目录, 大小, 修改时间) - Path -> (is_dir, size, mtime_ns)"""
+        state = {}
+        pending = [self.path]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue  # 扫描期间被删除 - Removed during the scan
+                        state[entry.path] = (is_dir, st.st_size, st.st_mtime_ns)
+                        if is_dir and self.recursive:
+                            pending.append(entry.path)
+            except OSError:
+                continue
+        return state
+
+    @staticmethod
+    def diff(previous, current):
+        """比较两次快照，按删除、创建、修改的顺序返回事件 - Diff two snapshots; events in deleted, created, modified order"""
+        deleted = [PollEvent("deleted", path, previous[path][0]) for path in previous.keys() - current.keys()]
+        created = [PollEvent("created", path, current[path][0]) for path in current.keys() - previous.keys()]
+        # 目录的修改时间随目录项变化，只报告文件修改 - Directory mtimes follow their entries; only file changes are reported
+        modified = [PollEvent("modified", path, False) for path in previous.keys() & current.keys()
+                    if not current[path][0] and previous[path] != current[path]]
+        return sorted(deleted) + sorted(created) + sorted(modified)
+
+
+def _dispatch(handler, events):
+    for event in events:
+        try:
+            handler.dispatch(event)
+        except Exception:
+            # 处理器错误不中断监控 - Handler errors do not stop monitoring
+            pass
+
+
+class AdaptivePollingObserver:
+    """间隔自适应的快照轮询 Observer（接口与 watchdog Observer 相同） - Snapshot-polling observer with an adaptive interval (watchdog Observer interface)"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        self.min_interval = max(0.05, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.interval = self.min_interval
+        self._watches = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    def schedule(self, handler, path, recursive=False):
+        snapshot = StatSnapshot(path, recursive)
+        watch = [handler, snapshot, snapshot.capture()]
+        with self._lock:
+            self._watches.append(watch)
+        return watch
+
+    def unschedule(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pak-polling-observer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """轮询一次所有目录，返回发出的事件数 - Poll every watch once; returns the number of events dispatched"""
+        with self._lock:
+            watches = list(self._watches)
+        changes = 0
+        for watch in watches:
+            handler, snapshot, previous = watch
+            current = snapshot.capture()
+            events = snapshot.diff(previous, current)
+            watch[2] = current
+            _dispatch(handler, events)
+            changes += len(events)
+        self.polls += 1
+        return changes
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            changes = self.poll()
+            # 有变化时回到最短间隔，空闲时指数退避 - Back to the shortest interval on change, exponential back-off when idle
+            self.interval = self.min_interval if changes else min(self.max_interval, self.interval * 2)
+
+
+class _AuditedWatch:
+    """记录原生事件到达时间的处理器包装 - Handler wrapper recording when native events arrive"""
+
+    def __init__(self, handler, path, recursive):
+        self.handler = handler
+        self.path = path
+        self.recursive = recursive
+        self.backend = BACKEND_NATIVE
+        self.native_watch = None
+        self.snapshot = StatSnapshot(path, recursive)
+        self.state = {}
+        self.checked_at = 0.0
+        # 路径 -> 最后一次事件的时间 - Path -> time of its last event
+        self._last_seen = {}
+        self._lock = threading.Lock()
+
+    def dispatch(self, event):
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[_key(event.src_path)] = now
+            if getattr(event, "dest_path", ""):
+                self._last_seen[_key(event.dest_path)] = now
+        self.handler.dispatch(event)
+
+    def last_seen(self, path):
+        with self._lock:
+            return self._last_seen.get(_key(path), -1.0)
+
+    def prune(self, before):
+        """丢弃早于 before 的事件记录 - Drop event records older than before"""
+        with self._lock:
+            self._last_seen = {path: seen for path, seen in self._last_seen.items() if seen >= before}
+
+    def reset(self):
+        self.state = self.snapshot.capture()
+        self.checked_at = time.monotonic()
+
+
+class ObserverSet:
+    """按目录选择后端的 Observer 组合，带原生后端健康检查 - Observer group choosing a backend per directory, with a native health check
+
+    on_backend(path, backend, reason) 在选择或切换后端时调用；on_missed(path, count, moved) 在发现漏掉的事件时调用。
+    on_backend(path, backend, reason) is called when a backend is chosen or changed; on_missed(path, count, moved)
+    when missed events are found.
+    """
+
+    def __init__(self, backend=BACKEND_AUTO, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 health_interval=DEFAULT_HEALTH_INTERVAL, on_backend=None, on_missed=None):
+        self.backend = backend if backend in BACKENDS else BACKEND_AUTO
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.health_interval = max(0.0, float(health_interval))
+        self.on_backend = on_backend
+        self.on_missed = on_missed
+        self.native = None
+        self.polling = None
+        self._watches = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        self._started = False
+        self.missed_events = 0
+
+    def schedule(self, handler, path, recursive=False):
+        """按配置和文件系统类型选择后端并开始监控目录，返回使用的后端 - Watch a directory on the backend chosen by config and filesystem; returns the backend"""
+        backend, reason = self.backend, "config"
+        if backend == BACKEND_AUTO:
+            backend, reason = (BACKEND_POLLING, "network") if is_network_filesystem(path) else (BACKEND_NATIVE, "local")
+        watch = _AuditedWatch(handler, path, recursive)
+        if backend == BACKEND_NATIVE:
+            try:
+                self._schedule_native(watch)
+            except OSError:
+                # 例如 inotify 监控数达到上限 - e.g. the inotify watch limit was reached
+                if self.backend != BACKEND_AUTO:
+                    raise
+                backend, reason = BACKEND_POLLING, "native_failed"
+        if backend == BACKEND_POLLING:
+            self._schedule_polling(watch)
+        with self._lock:
+            self._watches.append(watch)
+        if self.on_backend:
+            self.on_backend(path, backend, reason)
+        return backend
+
+    def _schedule_native(self, watch):
+        if self.native is None:
+            from watchdog.observers import Observer
+            self.native = Observer()
+            if self._started:
+                self.native.start()
+        if self.health_interval:
+            watch.reset()
+        watch.native_watch = self.native.schedule(watch, watch.path, recursive=watch.recursive)
+        watch.backend = BACKEND_NATIVE
+
+    def _schedule_polling(self, watch):
+        if self.polling is None:
+            self.polling = AdaptivePollingObserver(self.min_interval, self.max_interval)
+            if self._started:
+                self.polling.start()
+        self.polling.schedule(watch.handler, watch.path, watch.recursive)
+        watch.backend = BACKEND_POLLING
+
+    def start(self):
+        self._started = True
+        self._stop.clear()
+        for observer in (self.native, self.polling):
+            if observer is not None:
+                observer.start()
+        if self.health_interval:
+            self._health_thread = threading.Thread(target=self._health_loop, name="pak-observer-health", daemon=True)
+            self._health_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        # 先结束健康检查，避免停止期间再切换后端 - End the health check first so no backend switch happens while stopping
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+        for observer in (self.native, self.polling):
+            if observer is not None:
+                observer.stop()
+
+    def join(self, timeout=None):
+        for observer in (self.native, self.polling):
+            if observer is not None:
+                observer.join(timeout)
+
+    def poll_interval(self):
+        """当前轮询间隔（秒），未使用轮询时返回 None - Current polling interval (s); None when nothing is polled"""
+        return self.polling.interval if self.polling is not None else None
+
+    def backend_counts(self):
+        """各后端监控的目录数 - Number of directories per backend"""
+        with self._lock:
+            watches = list(self._watches)
+        return {(backend,): sum(1 for watch in watches if watch.backend == backend)
+                for backend in (BACKEND_NATIVE, BACKEND_POLLING)}
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def check_health(self):
+        """比较原生监控目录的快照和收到的事件，补发漏掉的事件，返回漏掉的事件数 - Compare native watches' snapshots with the events received; replay and count missed events"""
+        with self._lock:
+            watches = [watch for watch in self._watches if watch.backend == BACKEND_NATIVE]
+        if not watches:
+            return 0
+        captured = [(watch, watch.snapshot.capture(), time.monotonic()) for watch in watches]
+        # 等待快照之前发生的变化对应的原生事件到达 - Let native events for changes before the capture arrive
+        if self._stop.wait(HEALTH_GRACE):
+            return 0
+        total = 0
+        for watch, current, captured_at in captured:
+            since = watch.checked_at - HEALTH_GRACE
+            missed = [event for event in StatSnapshot.diff(watch.state, current)
+                      if watch.last_seen(event.src_path) < since]
+            watch.state, watch.checked_at = current, captured_at
+            # 只保留下一次检查需要的记录 - Keep only the records the next check needs
+            watch.prune(captured_at - HEALTH_GRACE)
+            if not missed:
+                continue
+            total += len(missed)
+            self.missed_events += len(missed)
+            moved = self.backend == BACKEND_AUTO
+            if moved:
+                # 原生通知已不可信，先改为轮询再补发事件 - Native notifications can no longer be trusted; switch to polling before replaying
+                try:
+                    self.native.unschedule(watch.native_watch)
+                except (KeyError, OSError):
+                    pass  # 原生监控已失效 - The native watch is already gone
+                watch.native_watch = None
+                self._schedule_polling(watch)
+                if self.on_backend:
+                    self.on_backend(watch.path, BACKEND_POLLING, "missed_events")
+            _dispatch(watch.handler, missed)
+            if self.on_missed:
+                self.on_missed(watch.path, len(missed), moved)
+        return total
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动器基准测试 - Launcher Benchmark Suite
+在临时目录中生成模拟游戏目录，直接驱动 PAKManager 和 PAKFileHandler，测量：
+Builds a synthetic game directory in a temp dir and drives PAKManager and PAKFileHandler directly to measure:
+
+- 文件创建到链接完成的端到端延迟 - end-to-end latency from file creation to linked
+- 哈希吞吐量 - hash throughput
+- 每次注册表写入的开销（json / sqlite） - registry write cost per operation (json / sqlite)
+- 各链接方式的启动扫描耗时 - startup scan time for each link method
+
+结果写为 JSON，便于在版本之间比较。无需安装游戏，可在普通 Linux 机器上运行。
+Results are written as JSON for comparison between versions. No game install needed; runs on a plain Linux box.
+
+用法 - Usage:
+    python benchmarks/bench_launcher.py --pak-count 50 --pak-size 4M --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+ALL_METHODS = ("hardlink", "symlink", "copy", "reflink", "smart")
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text):
+    """解析 4M、512K 之类的大小 - Parse sizes such as 4M or 512K"""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def summarize(samples):
+    """延迟样本的统计摘要（毫秒） - Summary statistics of latency samples (milliseconds)"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+class SyntheticGame:
+    """临时目录中的模拟游戏安装 - Synthetic game install inside a temp dir"""
+
+    def __init__(self, root, pak_size, seed):
+        self.root = root
+        self.game_dir = os.path.join(root, "game")
+        self.appdata = os.path.join(root, "appdata")
+        self.pak_size = pak_size
+        # 所有文件共用一个随机块，文件头不同保证内容唯一 - One shared random block; distinct headers keep content unique
+        self.block = random.Random(seed).randbytes(min(pak_size, 1024 * 1024)) if pak_size else b""
+        os.makedirs(self.game_dir, exist_ok=True)
+        os.makedirs(os.path.join(self.appdata, "WuchangFMMSupported"), exist_ok=True)
+
+    def configure(self, **settings):
+        """写入启动器配置并指向临时 APPDATA - Write the launcher config and point APPDATA at the temp dir"""
+        config = {"game_directory": self.game_dir, "target_directory": "mods", "auto_start_modmanager": False}
+        config.update(settings)
+        with open(os.path.join(self.appdata, "WuchangFMMSupported", "pak_manager_config.json"), "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        os.environ["APPDATA"] = self.appdata
+
+    def pak_path(self, index):
+        return os.path.join(self.game_dir, f"bench_{index:05d}.pak")
+
+    def target_path(self, index):
+        return os.path.join(self.game_dir, "mods", f"bench_{index:05d}.pak")
+
+    def write_pak(self, index):
+        """写入一个 PAK 文件 - Write one PAK file"""
+        header = f"PAK{index:08d}".encode()
+        with open(self.pak_path(index), "wb") as f:
+            f.write(header)
+            remaining = self.pak_size - len(header)
+            while remaining > 0:
+                chunk = self.block[:remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """屏蔽启动器的控制台输出 - Silence the launcher's console output"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def new_manager():
+    """在当前 APPDATA 下创建全新的 PAKManager - Create a fresh PAKManager for the current APPDATA"""
+    from Wuchang_FMM_Launcher import PAKManager
+    return PAKManager()
+
+
+def bench_hash(args, root):
+    """哈希吞吐量（冷缓存） - Hash throughput with a cold cache"""
+    from pak_hasher import FileHasher
+    game = SyntheticGame(os.path.join(root, "hash"), args.pak_size, args.seed)
+    for i in range(args.hash_files):
+        game.write_pak(i)
+    results = {}
+    for algorithm in args.hash_algorithms:
+        hasher = FileHasher(algorithm)
+        total_bytes = 0
+        start = time.perf_counter()
+        for i in range(args.hash_files):
+            total_bytes += hasher.hash_file(game.pak_path(i)).size
+        elapsed = time.perf_counter() - start
+        results[algorithm] = {
+            "files": args.hash_files,
+            "bytes": total_bytes,
+            "seconds": elapsed,
+            "mb_per_s": total_bytes / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+        }
+    return results
+
+
+def bench_registry(args, root):
+    """每次注册表写入和最终落盘的开销 - Cost per registry write and of the final flush"""
+    from link_registry_store import open_link_registry, BACKEND_JSON, BACKEND_SQLITE
+    results = {}
+    for backend in (BACKEND_JSON, BACKEND_SQLITE):
+        directory = os.path.join(root, f"registry_{backend}")
+        os.makedirs(directory, exist_ok=True)
+        registry = open_link_registry(os.path.join(directory, "pak_links_registry.json"), backend)
+        samples = []
+        for i in range(args.registry_ops):
+            entry = {
+                "target": f"/game/mods/bench_{i:05d}.pak",
+                "method": "hardlink",
+                "created_time": datetime.now().isoformat(),
+                "file_hash": f"{i:064x}",
+                "hash_algorithm": "blake2b"
+            }
+            start = time.perf_counter()
+            registry[f"/game/bench_{i:05d}.pak"] = entry
+            samples.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        registry.flush()
+        flush_seconds = time.perf_counter() - start
+        registry.close()
+        results[backend] = {"write": summarize(samples), "flush_ms": flush_seconds * 1000}
+    return results
+
+
+def bench_scan(args, root, method):
+    """启动扫描：首次（全部创建）和再次（全部已是最新） - Startup scan: cold (create all) and warm (all up to date)"""
+    game = SyntheticGame(os.path.join(root, f"scan_{method}"), args.pak_size, args.seed)
+    for i in range(args.pak_count):
+        game.write_pak(i)
+    game.configure(link_method=method, worker_count=args.workers)
+
+    with quiet(not args.verbose):
+        manager = new_manager()
+        start = time.perf_counter()
+        manager.scan_existing_pak_files()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        manager.scan_existing_pak_files()
+        warm = time.perf_counter() - start
+        manager.shutdown()
+
+        # 重新启动进程时的扫描（注册表与指纹缓存从磁盘加载） - Scan after a restart (registry and cache load from disk)
+        manager = new_manager()
+        start = time.perf_counter()
+        manager.scan_existing_pak_files()
+        restart = time.perf_counter() - start
+        manager.shutdown()
+
+    linked = sum(1 for i in range(args.pak_count) if os.path.lexists(game.target_path(i)))
+    return {"cold_s": cold, "warm_s": warm, "restart_s": restart, "linked": linked, "failed": args.pak_count - linked}
+
+
+def bench_event_latency(args, root, method):
+    """通过真实的文件监控测量文件创建到链接完成的延迟 - Latency from file creation to linked through the real watcher"""
+    game = SyntheticGame(os.path.join(root, f"events_{method}"), args.pak_size, args.seed)
+    game.configure(link_method=method, worker_count=args.workers)
+    samples = []
+    failed = 0
+    with quiet(not args.verbose):
+        manager = new_manager()
+        if not manager.start_monitoring(interactive=False, launch_fmm=False):
+            raise RuntimeError("monitoring did not start")
+        try:
+            for i in range(args.event_count):
+                start = time.perf_counter()
+                game.write_pak(i)
+                target = game.target_path(i)
+                deadline = start + args.event_timeout
+                while not os.path.lexists(target) and time.perf_counter() < deadline:
+                    time.sleep(0.0005)
+                if os.path.lexists(target):
+                    samples.append(time.perf_counter() - start)
+                else:
+                    failed += 1
+                    if not samples:
+                        # 首个文件就失败说明该方式在此文件系统上不可用 - A first failure means the method is unusable here
+                        break
+        finally:
+            manager.shutdown()
+    result = summarize(samples)
+    result["failed"] = failed
+    return result
+
+
+def git_revision():
+    """当前代码版本（非 git 仓库时为 None） - Current code revision (None outside a git checkout)"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="启动器基准测试 - Launcher benchmark suite")
+    parser.add_argument("--pak-count", type=int, default=50, help="扫描测试的 PAK 数量 - PAKs in the scan benchmark")
+    parser.add_argument("--pak-size", type=parse_size, default=parse_size("4M"), help="每个 PAK 的大小 - Size of each PAK")
+    parser.add_argument("--event-count", type=int, default=20, help="延迟测试的文件数 - Files in the latency benchmark")
+    parser.add_argument("--event-timeout", type=float, default=30.0, help="单个文件的等待上限（秒） - Per-file wait limit (s)")
+    parser.add_argument("--hash-files", type=int, default=10, help="哈希测试的文件数 - Files in the hash benchmark")
+    parser.add_argument("--hash-algorithms", nargs="+", default=["blake2b", "sha256", "md5"])
+    parser.add_argument("--registry-ops", type=int, default=2000, help="注册表写入次数 - Registry writes")
+    parser.add_argument("--methods", nargs="+", default=list(ALL_METHODS), choices=ALL_METHODS)
+    parser.add_argument("--workers", type=int, default=4, help="工作线程数 - Worker threads")
+    parser.add_argument("--seed", type=int, default=1234, help="随机数据种子 - Random data seed")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["hash", "registry", "scan", "events"])
+    parser.add_argument("--output", help="JSON 结果文件（默认输出到标准输出） - JSON result file (stdout by default)")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录 - Keep the temp directory")
+    parser.add_argument("--verbose", action="store_true", help="显示启动器输出 - Show the launcher's output")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    root = tempfile.mkdtemp(prefix="wuchang_bench_")
+    original_appdata = os.environ.get("APPDATA")
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "keep", "verbose")}
+        }
+    }
+    try:
+        if "hash" not in args.skip:
+            report["hash"] = bench_hash(args, root)
+        if "registry" not in args.skip:
+            report["registry"] = bench_registry(args, root)
+        methods = {}
+        for method in args.methods:
+            result = {}
+            try:
+                if "scan" not in args.skip:
+                    result["scan"] = bench_scan(args, root, method)
+                if "events" not in args.skip:
+                    result["events"] = bench_event_latency(args, root, method)
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            methods[method] = result
+            print(f"{method}: done", file=sys.stderr)
+        report["methods"] = methods
+    finally:
+        if original_appdata is None:
+            os.environ.pop("APPDATA", None)
+        else:
+            os.environ["APPDATA"] = original_appdata
+        if args.keep:
+            print(f"temp directory kept: {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,10 +11,15 @@ import sys
 import subprocess
 import platform
 import time
-import zipfile
-from datetime import datetime
+import glob
 from pathlib import Path
 
+from pak_hasher import format_size
+from save_backup import SaveBackupStore
+from save_watcher import IGNORED_TOP_DIRS, lower_process_io_priority
+from game_discovery import GameDiscovery
+from path_resolver import PathResolver
+
 class CommonOperations:
     def __init__(self, config_manager=None):
         self.config_manager = config_manager
@@ -29,6 +34,12 @@ class CommonOperations:
         # 获取系统路径 - Get system paths
         self.localappdata = os.path.expandvars("%LOCALAPPDATA%")
         
+        # 与启动器共用路径解析器，路径只计算一次 - Share the launcher's path resolver so paths are computed once
+        self.paths = getattr(config_manager, "paths", None)
+        if self.paths is None:
+            config = config_manager.config if config_manager is not None else {}
+            self.paths = PathResolver(config, self.localappdata)
+        
     def get_translations(self, language="en"):
         """获取翻译文本 - Get translation texts"""
         translations = {
@@ -55,8 +66,19 @@ class CommonOperations:
                 "config_path": "configuration file path",
                 "backup_creating": "📦 Creating backup...",
                 "backup_success": "✅ Backup created successfully: {}",
+                "backup_stats": "📊 {files} files, {changed} changed, {stored} newly stored, {elapsed:.2f}s",
                 "backup_failed": "❌ Backup failed: {}",
-                "backup_dir_not_found": "❌ Save directory not found."
+                "backup_dir_not_found": "❌ Save directory not found.",
+                "restore_save": "♻️ Restore Game Save",
+                "no_backups": "❌ No backups found.",
+                "restore_select": "Select a backup to restore (Enter to cancel): ",
+                "restore_confirm": "⚠️ Files in {} will be overwritten. Type y to continue: ",
+                "restoring": "♻️ Restoring backup...",
+                "restore_success": "✅ Restored {} files ({} already matched, {} files not in the backup moved to the backup store).",
+                "restore_failed": "❌ Restore failed: {}",
+                "compare_backups": "🔍 Compare Backups",
+                "compare_select": "Select two backups to compare, e.g. 2 1 (Enter to cancel): ",
+                "compare_result": "➕ {added} added, ➖ {removed} removed, ✏️ {modified} modified"
             },
             "zh_cn": {
                 "menu_title": "📁 常用操作",
@@ -81,8 +103,19 @@ class CommonOperations:
                 "config_path": "配置文件路径",
                 "backup_creating": "📦 正在创建备份...",
                 "backup_success": "✅ 备份创建成功：{}",
+                "backup_stats": "📊 共 {files} 个文件，{changed} 个有变化，新存储 {stored}，耗时 {elapsed:.2f} 秒",
                 "backup_failed": "❌ 备份失败：{}",
-                "backup_dir_not_found": "❌ 未找到存档目录。"
+                "backup_dir_not_found": "❌ 未找到存档目录。",
+                "restore_save": "♻️ 恢复游戏存档",
+                "no_backups": "❌ 没有找到备份。",
+                "restore_select": "请选择要恢复的备份（直接回车取消）：",
+                "restore_confirm": "⚠️ {} 中的文件将被覆盖，输入 y 继续：",
+                "restoring": "♻️ 正在恢复备份...",
+                "restore_success": "✅ 已恢复 {} 个文件（{} 个文件已一致，{} 个备份中没有的文件已移到备份库）。",
+                "restore_failed": "❌ 恢复失败：{}",
+                "compare_backups": "🔍 比较备份",
+                "compare_select": "请选择要比较的两个备份，例如 2 1（直接回车取消）：",
+                "compare_result": "➕ 新增 {added} 个，➖ 删除 {removed} 个，✏️ 修改 {modified} 个"
             }
         }
         return translations.get(language, translations["en"])
@@ -116,12 +149,12 @@ class CommonOperations:
         """获取游戏目录 - Get game directory"""
         # 直接从配置文件中获取游戏目录 - Get game directory directly from config
         if self.config_manager:
-            game_dir = self.config_manager.config.get('game_directory', '')
+            game_dir = self.paths.game_directory
             if game_dir and os.path.exists(game_dir):
                 return game_dir
         
-        # 如果配置中没有或路径无效，返回None - Return None if not in config or invalid
-        return None
+        # 配置中没有或路径无效时自动检测 - Auto-detect when not in config or invalid
+        return self._auto_detect_game_directory()
     
     def _is_valid_game_directory(self, directory):
         """验证是否为有效的游戏目录 - Validate if it's a valid game directory"""
@@ -142,108 +175,45 @@ class CommonOperations:
         return False
     
     def _auto_detect_game_directory(self):
-        """自动检测游戏目录 - Auto-detect game directory"""
-        # Steam 常见路径 - Common Steam paths
-        steam_paths = [
-            "C:\\Program Files (x86)\\Steam\\steamapps\\common\\WUCHANG Fallen Feathers",
-            "D:\\Steam\\steamapps\\common\\WUCHANG Fallen Feathers",
-            "E:\\Steam\\steamapps\\common\\WUCHANG Fallen Feathers",
-            "F:\\Steam\\steamapps\\common\\WUCHANG Fallen Feathers"
-        ]
-        
-        # Epic Games 常见路径 - Common Epic Games paths
-        epic_paths = [
-            "C:\\Program Files\\Epic Games\\WUCHANG Fallen Feathers",
-            "D:\\Epic Games\\WUCHANG Fallen Feathers",
-            "E:\\Epic Games\\WUCHANG Fallen Feathers",
-            "F:\\Epic Games\\WUCHANG Fallen Feathers"
-        ]
-        
-        # Xbox Game Pass 路径 - Xbox Game Pass paths
-        xbox_paths = [
-            os.path.join(self.localappdata, "Packages", "505GAMESS.P.A.WuchangPCGP_*")
-        ]
-        
-        all_paths = steam_paths + epic_paths + xbox_paths
+        """自动检测游戏目录（读取 Steam / Epic 清单） - Auto-detect game directory (from Steam / Epic manifests)"""
+        for install in self.discover_game_installs():
+            if self._is_valid_game_directory(install.path):
+                return install.path
         
-        for path in all_paths:
-            if "*" in path:
-                # 处理通配符路径 - Handle wildcard paths
-                import glob
-                matching_paths = glob.glob(path)
-                for matching_path in matching_paths:
-                    if self._is_valid_game_directory(matching_path):
-                        return matching_path
-            else:
-                if self._is_valid_game_directory(path):
-                    return path
+        # Xbox Game Pass 没有可读取的清单 - Xbox Game Pass has no readable manifest
+        for path in glob.glob(os.path.join(self.localappdata, "Packages", "505GAMESS.P.A.WuchangPCGP_*")):
+            if self._is_valid_game_directory(path):
+                return path
         
         return None
     
+    def discover_game_installs(self, refresh=False):
+        """列出所有检测到的游戏安装（结果缓存在配置目录） - List every detected install (cached in the config dir)"""
+        cache_file = None
+        if self.config_manager is not None:
+            cache_file = os.path.join(self.config_manager.config_dir, "game_discovery_cache.json")
+        return GameDiscovery(cache_file).discover(refresh)
+    
     def get_mod_directory(self):
-        """获取模组目录 - Get mod directory"""
-        # 从配置中获取游戏目录和目标目录 - Get game directory and target directory from config
-        if not self.config_manager:
-            return None
-            
-        game_dir = self.config_manager.config.get('game_directory', '')
-        target_dir = self.config_manager.config.get('target_directory', '')
-        
-        if not game_dir or not target_dir:
-            return None
-            
-        # 组合完整的模组目录路径 - Combine full mod directory path
-        mod_dir = os.path.join(game_dir, target_dir)
-        
-        # 如果目录不存在，尝试创建 - If directory doesn't exist, try to create it
-        if not os.path.exists(mod_dir):
-            try:
-                os.makedirs(mod_dir, exist_ok=True)
-            except:
-                pass
-                
-        return mod_dir if os.path.exists(mod_dir) else None
+        """获取模组目录（不存在时尝试创建） - Get mod directory (created if missing)"""
+        return self.paths.mod_directory()
     
     def get_config_directory(self):
-        """获取游戏配置目录 - Get game config directory"""
-        # Windows 配置路径 - Windows config path
-        config_dir = os.path.join(self.localappdata, self.EPIC_CODE_NAME, "Saved", "Config", "Windows")
-        
-        # Xbox 配置路径 - Xbox config path
-        xbox_config_dir = os.path.join(self.localappdata, self.EPIC_CODE_NAME, "Saved", "Config", "WinGDK")
-        
-        # 优先返回存在的目录 - Return existing directory first
-        if os.path.exists(config_dir):
-            return config_dir
-        elif os.path.exists(xbox_config_dir):
-            return xbox_config_dir
-        else:
-            # 返回默认路径，即使不存在 - Return default path even if it doesn't exist
-            return config_dir
+        """获取游戏设置目录 - Get game config directory"""
+        return self.paths.config_directory()
+    
+    def get_save_directories(self):
+        """获取所有存在的存档目录（Windows 的 Saved 和 Xbox 的 wgs） - Get every existing save directory (Windows Saved and Xbox wgs)"""
+        return self.paths.save_directories()
     
     def get_save_directory(self):
         """获取游戏存档目录 - Get game save directory"""
-        # Windows 存档路径 - Windows save path
-        save_dir = os.path.join(self.localappdata, self.EPIC_CODE_NAME, "Saved")
-        
-        # Xbox 存档路径 - Xbox save path
-        xbox_save_base = os.path.join(self.localappdata, "Packages")
-        xbox_save_pattern = "505GAMESS.P.A.WuchangPCGP_*"
-        
         # 优先返回存在的目录 - Return existing directory first
-        if os.path.exists(save_dir):
-            return save_dir
-        else:
-            # 查找 Xbox 存档目录 - Find Xbox save directory
-            import glob
-            xbox_dirs = glob.glob(os.path.join(xbox_save_base, xbox_save_pattern))
-            for xbox_dir in xbox_dirs:
-                xbox_save_dir = os.path.join(xbox_dir, "SystemAppData", "wgs")
-                if os.path.exists(xbox_save_dir):
-                    return xbox_save_dir
-            
-            # 返回默认路径，即使不存在 - Return default path even if it doesn't exist
-            return save_dir
+        directories = self.get_save_directories()
+        if directories:
+            return directories[0]
+        # 返回默认路径，即使不存在 - Return default path even if it doesn't exist
+        return os.path.join(self.localappdata, self.EPIC_CODE_NAME, "Saved")
     
     def show_menu(self, language="en"):
         """显示常用操作菜单 - Show common operations menu"""
@@ -258,6 +228,8 @@ class CommonOperations:
             print(f"3. {t['open_config_dir']}")
             print(f"4. {t['open_save_dir']}")
             print(f"5. {t['backup_save']}")
+            print(f"6. {t['restore_save']}")
+            print(f"7. {t['compare_backups']}")
             print(f"0. {t['back_to_main']}")
             print("="*50)
             
@@ -276,6 +248,10 @@ class CommonOperations:
                     self._handle_open_save_directory(t)
                 elif choice == "5":
                     self._handle_backup_save_directory(t)
+                elif choice == "6":
+                    self._handle_restore_save_backup(t)
+                elif choice == "7":
+                    self._handle_compare_save_backups(t)
                 else:
                     print(t["invalid_choice"])
                     input(t["press_enter"])
@@ -350,6 +326,62 @@ class CommonOperations:
         # 清屏准备重新显示菜单 - Clear screen to redisplay menu
         os.system('cls' if os.name == 'nt' else 'clear')
     
+    def get_backup_directory(self):
+        """获取存档备份库目录（位于配置目录，不在存档目录内） - Get the save backup store directory (in the config dir, outside the saves)"""
+        if self.config_manager is not None:
+            return os.path.join(self.config_manager.config_dir, "save_backups")
+        return os.path.join(os.getenv('APPDATA', os.path.expanduser("~")), "WuchangFMMSupported", "save_backups")
+    
+    def get_backup_store(self, background=False):
+        """打开存档备份库；background 为真时压缩子进程以低 I/O 优先级运行 - Open the save backup store; with background, compression workers run at low I/O priority"""
+        workers = 0
+        if self.config_manager is not None:
+            workers = self.config_manager.config.get('backup_workers', 0)
+        return SaveBackupStore(self.get_backup_directory(), workers=workers,
+                               worker_initializer=lower_process_io_priority if background else None)
+    
+    @staticmethod
+    def _is_legacy_backup(relpath):
+        """旧版本写在存档目录中的 zip 备份 - Zip backups that older versions wrote into the save directory"""
+        return "/" not in relpath and relpath.startswith('Wuchang_Game_Saved-') and relpath.endswith('.zip')
+    
+    @classmethod
+    def _is_kept_on_restore(cls, relpath):
+        """恢复时保留不动的多余文件：旧版 zip 备份以及日志、崩溃报告和浏览器缓存
+        Extra files a restore leaves alone: legacy zip backups plus logs, crash reports and web caches
+        """
+        return cls._is_legacy_backup(relpath) or relpath.split("/", 1)[0].lower().startswith(IGNORED_TOP_DIRS)
+    
+    def backup_save_directory(self, save_dir=None, background=False):
+        """增量快照存档目录并按保留策略清理旧快照，返回 BackupResult（非交互，失败时抛出异常）
+        Snapshot the save directory incrementally, prune by the retention policy and return a BackupResult (non-interactive; raises on failure)
+        """
+        save_dir = save_dir or self.get_save_directory()
+        if not save_dir or not os.path.exists(save_dir):
+            raise FileNotFoundError(save_dir)
+        store = self.get_backup_store(background)
+        result = store.backup(save_dir, skip=self._is_legacy_backup)
+        self.prune_save_backups(store)
+        return result
+    
+    def prune_save_backups(self, store=None):
+        """按配置的保留策略删除旧快照，返回删除的快照编号 - Delete old snapshots by the configured retention policy; returns the deleted ids"""
+        config = self.config_manager.config if self.config_manager is not None else {}
+        store = store or self.get_backup_store()
+        return store.prune(config.get('backup_keep_last', 0), config.get('backup_keep_daily', 0),
+                           config.get('backup_keep_weekly', 0))
+    
+    def restore_save_backup(self, backup_id, save_dir=None, keep_extra=False):
+        """恢复一次快照（只写入不同的文件，快照中没有的存档移到备份库），返回 RestoreResult；save_dir 为空时写回快照时的目录
+        Restore a snapshot, writing only files that differ and moving saves absent from it into the backup store, and return
+        a RestoreResult; writes back to the original directory when save_dir is empty. keep_extra leaves extra files in place
+        """
+        return self.get_backup_store().restore(backup_id, save_dir, skip=self._is_kept_on_restore, keep_extra=keep_extra)
+    
+    def diff_save_backups(self, old_id, new_id):
+        """比较两个快照，返回 SnapshotDiff - Compare two snapshots and return a SnapshotDiff"""
+        return self.get_backup_store().diff(old_id, new_id)
+    
     def _handle_backup_save_directory(self, t):
         """处理备份存档目录 - Handle backing up save directory"""
         save_dir = self.get_save_directory()
@@ -362,26 +394,10 @@ class CommonOperations:
         
         try:
             print(t["backup_creating"])
-            
-            # 生成备份文件名 - Generate backup filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            backup_filename = f"Wuchang_Game_Saved-{timestamp}.zip"
-            backup_path = os.path.join(save_dir, backup_filename)
-            
-            # 创建zip文件 - Create zip file
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(save_dir):
-                    for file in files:
-                        # 跳过已存在的备份文件 - Skip existing backup files
-                        if file.endswith('.zip') and file.startswith('Wuchang_Game_Saved-'):
-                            continue
-                        
-                        file_path = os.path.join(root, file)
-                        # 计算相对路径 - Calculate relative path
-                        arcname = os.path.relpath(file_path, save_dir)
-                        zipf.write(file_path, arcname)
-            
-            print(t["backup_success"].format(backup_path))
+            result = self.backup_save_directory(save_dir)
+            print(t["backup_success"].format(result.backup_id))
+            print(t["backup_stats"].format(files=result.files, changed=result.changed,
+                                           stored=format_size(result.stored_bytes), elapsed=result.elapsed))
             
         except Exception as e:
             print(t["backup_failed"].format(str(e)))
@@ -390,6 +406,61 @@ class CommonOperations:
         # 清屏准备重新显示菜单 - Clear screen to redisplay menu
         os.system('cls' if os.name == 'nt' else 'clear')
 
+    
+    def _handle_restore_save_backup(self, t):
+        """处理恢复存档备份 - Handle restoring a save backup"""
+        recent = self._print_recent_backups(t)
+        if recent:
+            choice = input(t["restore_select"]).strip()
+            if choice.isdigit() and 1 <= int(choice) <= len(recent):
+                manifest = recent[int(choice) - 1]
+                if input(t["restore_confirm"].format(manifest["source"])).strip().lower() == "y":
+                    try:
+                        print(t["restoring"])
+                        result = self.restore_save_backup(manifest["id"])
+                        print(t["restore_success"].format(result.written, result.unchanged, result.displaced))
+                    except Exception as e:
+                        print(t["restore_failed"].format(str(e)))
+        
+        input(t["press_enter"])
+        # 清屏准备重新显示菜单 - Clear screen to redisplay menu
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+    
+    def _print_recent_backups(self, t, limit=20):
+        """列出最近的快照（最新的在最前），返回列出的清单 - List the most recent snapshots, newest first; returns the listed manifests"""
+        try:
+            backups = self.get_backup_store().list_backups()
+        except OSError as e:
+            backups = []
+            print(t["restore_failed"].format(str(e)))
+        if not backups:
+            print(t["no_backups"])
+            return []
+        recent = list(reversed(backups))[:limit]
+        for index, manifest in enumerate(recent, 1):
+            stats = manifest.get("stats", {})
+            print(f"{index}. {manifest['id']}  ({stats.get('files', len(manifest['files']))} files)")
+        return recent
+    
+    def _handle_compare_save_backups(self, t):
+        """处理比较两个存档备份 - Handle comparing two save backups"""
+        recent = self._print_recent_backups(t)
+        if len(recent) >= 2:
+            choices = input(t["compare_select"]).split()
+            if len(choices) == 2 and all(c.isdigit() and 1 <= int(c) <= len(recent) for c in choices):
+                # 编号大的更旧 - Higher numbers are older
+                old, new = sorted((recent[int(c) - 1] for c in choices), key=lambda m: m["id"])
+                diff = self.diff_save_backups(old["id"], new["id"])
+                for prefix, paths in (("+", diff.added), ("-", diff.removed), ("~", diff.modified)):
+                    for path in paths:
+                        print(f"  {prefix} {path}")
+                print(t["compare_result"].format(added=len(diff.added), removed=len(diff.removed), modified=len(diff.modified)))
+        
+        input(t["press_enter"])
+        # 清屏准备重新显示菜单 - Clear screen to redisplay menu
+        os.system('cls' if os.name == 'nt' else 'clear')
+
 
 def main():
     """测试函数 - Test function"""
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件复制引擎模块 - File Copy Engine Module
+依次尝试写时复制克隆（FICLONE/reflink）、copy_file_range、sendfile 和大缓冲区分块复制
+Tries a copy-on-write clone (FICLONE/reflink), copy_file_range, sendfile and then a large-buffer
+chunked copy, in that order
+
+数据先写入临时文件，完成后原子重命名为目标文件，中断时不会留下截断的目标文件。
+Data goes to a temporary sibling first and is atomically renamed over the target on completion,
+so an interrupted copy never leaves a truncated target behind.
+"""
+
+import os
+import sys
+import errno
+import shutil
+import threading
+import time
+from collections import namedtuple
+
+# 复制方式 - Copy methods
+METHOD_REFLINK = "reflink"
+METHOD_COPY_FILE_RANGE = "copy_file_range"
+METHOD_SENDFILE = "sendfile"
+METHOD_CHUNKED = "chunked"
+
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+# 进度回调的最小间隔（秒） - Minimum interval between progress callbacks (seconds)
+DEFAULT_PROGRESS_INTERVAL = 1.0
+# 内核复制单次调用的最大字节数 - Largest byte count per in-kernel copy call
+KERNEL_COPY_BLOCK = 1024 * 1024 * 1024
+
+# Linux FICLONE ioctl 请求码 - Linux FICLONE ioctl request code
+FICLONE = 0x40049409
+
+# 这些错误表示快速路径不可用，应降级到下一种方式 - These errors mean a fast path is unavailable; fall back
+_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), getattr(errno, "ETXTBSY", errno.EINVAL),
+    errno.EPERM, errno.ENOTTY
+}
+
+CopyResult = namedtuple("CopyResult", ["method", "size", "elapsed", "throughput"])
+
+
+def temp_sibling(target):
+    """生成与目标同目录的临时文件名 - Build a temporary name next to the target"""
+    directory, name = os.path.split(target)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+class _Progress:
+    """节流的进度报告 - Throttled progress reporting"""
+
+    def __init__(self, callback, total, interval):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def update(self, copied):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            elapsed = now - self.start
+            self.callback(copied, self.total, copied / elapsed if elapsed > 0 else 0.0)
+
+
+class CopyEngine:
+    """带内核快速路径的文件复制引擎 - File copy engine with in-kernel fast paths"""
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, progress_interval=DEFAULT_PROGRESS_INTERVAL):
+        self.buffer_size = max(64 * 1024, int(buffer_size))
+        self.progress_interval = progress_interval
+
+    def copy(self, source, target, progress=None):
+        """复制文件并原子替换目标 - Copy a file and atomically replace the target
+
+        progress(已复制字节, 总字节, 字节/秒) 在复制过程中被周期性调用。
+        progress(copied_bytes, total_bytes, bytes_per_second) is called periodically during the copy.
+        """
+        return self._copy(source, target, progress, clone_only=False)
+
+    def clone(self, source, target):
+        """仅尝试写时复制克隆，不支持时抛出 OSError - Only attempt a copy-on-write clone; raises OSError if unsupported"""
+        return self._copy(source, target, None, clone_only=True)
+
+    def _copy(self, source, target, progress, clone_only):
+        temp = temp_sibling(target)
+        start = time.perf_counter()
+        try:
+            with open(source, 'rb') as src, open(temp, 'wb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                method = self._copy_data(src.fileno(), dst.fileno(), size, progress, clone_only)
+            shutil.copystat(source, temp)
+            os.replace(temp, target)
+        except BaseException:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise
+
+        elapsed = time.perf_counter() - start
+        return CopyResult(method, size, elapsed, size / elapsed if elapsed > 0 else 0.0)
+
+    def _copy_data(self, src_fd, dst_fd, size, progress, clone_only):
+        """按优先级复制数据，返回实际使用的方式 - Copy the data in priority order and return the method used"""
+        if self._try_reflink(src_fd, dst_fd):
+            return METHOD_REFLINK
+        if clone_only:
+            raise OSError(errno.EOPNOTSUPP, "copy-on-write clone is not supported here")
+
+        tracker = _Progress(progress, size, self.progress_interval)
+        offset = 0
+        method = METHOD_CHUNKED
+        for candidate, copier in ((METHOD_COPY_FILE_RANGE, self._copy_file_range), (METHOD_SENDFILE, self._sendfile)):
+            if offset >= size:
+                break
+            try:
+                offset = copier(src_fd, dst_fd, offset, size, tracker)
+                method = candidate
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+        if offset < size:
+            # 快速路径中途失败时从当前位置继续 - Continue from where a fast path stopped
+            self._copy_chunked(src_fd, dst_fd, offset, tracker)
+            method = METHOD_CHUNKED
+        return method
+
+    @staticmethod
+    def _try_reflink(src_fd, dst_fd):
+        """尝试 FICLONE 克隆（Btrfs、XFS 等） - Try a FICLONE clone (Btrfs, XFS, ...)"""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            import fcntl
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return True
+        except (ImportError, OSError):
+            return False
+
+    @staticmethod
+    def _copy_file_range(src_fd, dst_fd, offset, size, tracker):
+        """使用 copy_file_range 在内核中复制 - Copy in-kernel with copy_file_range"""
+        if not hasattr(os, "copy_file_range"):
+            raise OSError(errno.ENOSYS, "copy_file_range is not available")
+        while offset < size:
+            copied = os.copy_file_range(src_fd, dst_fd, min(KERNEL_COPY_BLOCK, size - offset), offset, offset)
+            if copied == 0:
+                break
+            offset += copied
+            tracker.update(offset)
+        return offset
+
+    @staticmethod
+    def _sendfile(src_fd, dst_fd, offset, size, tracker):
+        """使用 sendfile 在内核中复制 - Copy in-kernel with sendfile"""
+        if not hasattr(os, "sendfile") or not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "sendfile to a file is not available")
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(KERNEL_COPY_BLOCK, size - offset))
+            if sent == 0:
+                break
+            offset += sent
+            tracker.update(offset)
+        return offset
+
+    def _copy_chunked(self, src_fd, dst_fd, offset, tracker):
+        """使用大缓冲区分块复制 - Chunked copy through a large buffer"""
+        os.lseek(src_fd, offset, os.SEEK_SET)
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        with open(src_fd, 'rb', buffering=0, closefd=False) as src, open(dst_fd, 'wb', buffering=0, closefd=False) as dst:
+            while True:
+                read = src.readinto(buffer)
+                if not read:
+                    break
+                written = 0
+                while written < read:
+                    written += dst.write(view[written:read])
+                offset += read
+                tracker.update(offset)
+        return offset
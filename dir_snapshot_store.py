@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录快照存储模块 - Directory Snapshot Store Module
+停止监控时持久化监控目录的精简快照（路径、大小、修改时间、inode），下次启动时只重放离线期间的净变化
+Persists a compact snapshot of the watched directory (path, size, mtime, inode) when monitoring stops,
+so the next start only replays the net changes made while the launcher was not running
+
+快照的捕获和比较基于 watchdog.utils.dirsnapshot。
+Capturing and diffing are built on watchdog.utils.dirsnapshot, which is imported on first use.
+"""
+
+import os
+import json
+from collections import namedtuple
+
+SNAPSHOT_VERSION = 1
+
+# 离线变化：需要重新链接的文件和需要清理的文件 - Offline changes: files to (re)link and files to clean up
+OfflineChanges = namedtuple("OfflineChanges", ["link", "remove"])
+
+
+class _SnapshotEntry:
+    """快照中的目录项，供自定义 listdir 使用 - Directory entry stand-in for the custom listdir"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _stat_from_record(record):
+    """由持久化记录重建 stat 结果 - Rebuild a stat result from a persisted record"""
+    mode, ino, dev, size, mtime = record
+    return os.stat_result((mode, ino, dev, 1, 0, 0, size, mtime, mtime, mtime))
+
+
+class DirectorySnapshotStore:
+    """监控目录快照的持久化存储 - Persistent store for the watched directory's snapshot"""
+
+    def __init__(self, snapshot_file, suffix=".pak"):
+        self.snapshot_file = snapshot_file
+        self.suffix = suffix.lower()
+
+    def _listdir(self, path):
+        """只列出关注的文件类型 - List only the file type of interest"""
+        return [entry for entry in os.scandir(path) if entry.name.lower().endswith(self.suffix)]
+
+    def capture(self, directory):
+        """捕获目录当前状态 - Capture the directory's current state"""
+        from watchdog.utils.dirsnapshot import DirectorySnapshot
+        return DirectorySnapshot(directory, recursive=False, listdir=self._listdir)
+
+    def save(self, directory, snapshot, context=None):
+        """原子写入快照 - Atomically write the snapshot"""
+        entries = {}
+        for path in snapshot.paths:
+            st = snapshot.stat_info(path)
+            entries[path] = [st.st_mode, st.st_ino, st.st_dev, st.st_size, st.st_mtime]
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "directory": directory,
+            "context": context or {},
+            "entries": entries
+        }
+
+        temp_file = f"{self.snapshot_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_file, self.snapshot_file)
+        except OSError:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+
+    def load(self, directory, context=None):
+        """加载快照；目录或上下文不一致时返回 None - Load the snapshot, or None when the directory or context differs"""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (data.get("version") != SNAPSHOT_VERSION or data.get("directory") != directory
+                or data.get("context", {}) != (context or {})):
+            return None
+        entries = data.get("entries", {})
+        if directory not in entries:
+            return None
+
+        from watchdog.utils.dirsnapshot import DirectorySnapshot
+
+        def stat(path):
+            record = entries.get(path)
+            if record is None:
+                raise FileNotFoundError(path)
+            return _stat_from_record(record)
+
+        def listdir(path):
+            return [_SnapshotEntry(os.path.basename(p)) for p in entries if p != directory]
+
+        return DirectorySnapshot(directory, recursive=False, stat=stat, listdir=listdir)
+
+    def invalidate(self):
+        """删除快照，崩溃后不会使用过期快照 - Remove the snapshot so a crash never leaves a stale one behind"""
+        try:
+            os.remove(self.snapshot_file)
+        except OSError:
+            pass
+
+    @staticmethod
+    def diff(previous, current):
+        """计算离线期间的净变化 - Compute the net changes made while offline"""
+        from watchdog.utils.dirsnapshot import DirectorySnapshotDiff
+        changes = DirectorySnapshotDiff(previous, current)
+        link = set(changes.files_created)
+        link.update(path for path in changes.files_modified if path in current.paths)
+        remove = set(changes.files_deleted)
+        for src, dest in changes.files_moved:
+            link.add(dest)
+            if src not in current.paths:
+                remove.add(src)
+        return OfflineChanges(sorted(link), sorted(remove - link))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件合并模块 - Event Coalescing Module
+将同一文件在时间窗口内的创建/删除事件合并为最终效果，避免 FMM 部署时反复删除和重建链接
+Reduces each file's create/delete events within a time window to their net effect, so FMM deploy
+bursts do not delete and relink the same target over and over
+"""
+
+import os
+import time
+import threading
+
+# 默认合并窗口（秒） - Default coalescing window (seconds)
+DEFAULT_COALESCE_WINDOW = 0.1
+
+# 合并后的动作 - Net actions
+ACTION_CREATED = "created"
+ACTION_REMOVED = "removed"
+ACTION_REPLACED = "replaced"
+ACTION_NOOP = "noop"
+
+# 原始事件类型 - Raw event kinds
+EVENT_CREATED = "created"
+EVENT_DELETED = "deleted"
+
+
+class _PendingPath:
+    """窗口内单个文件的事件累积 - Events accumulated for one path within the window"""
+
+    def __init__(self, path, kind, now):
+        self.path = path
+        self.first_kind = kind
+        self.last_kind = kind
+        self.last_time = now
+        self.count = 1
+
+
+def net_action(first_kind, last_kind):
+    """由首个和最后一个事件推导最终动作 - Derive the net action from the first and last events"""
+    existed_before = first_kind == EVENT_DELETED
+    exists_after = last_kind == EVENT_CREATED
+    if existed_before and exists_after:
+        return ACTION_REPLACED
+    if existed_before:
+        return ACTION_REMOVED
+    if exists_after:
+        return ACTION_CREATED
+    return ACTION_NOOP
+
+
+class EventCoalescer:
+    """按路径去抖的事件合并器 - Per-path debouncing event coalescer"""
+
+    def __init__(self, on_action, window=DEFAULT_COALESCE_WINDOW, name="pak-coalescer"):
+        self.on_action = on_action
+        self.window = max(0.0, float(window))
+        self.name = name
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # 统计计数 - Counters
+        self.events_in = 0
+        self.actions_out = {ACTION_CREATED: 0, ACTION_REMOVED: 0, ACTION_REPLACED: 0, ACTION_NOOP: 0}
+
+    def start(self):
+        """启动合并线程 - Start the flush thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._flush_loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止合并线程，并立即输出所有待处理事件 - Stop the flush thread and emit everything still pending"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        self._emit(self._take_due(force=True))
+
+    def add(self, path, kind):
+        """记录一个原始事件 - Record a raw event"""
+        key = os.path.normcase(path)
+        now = time.monotonic()
+        with self._cond:
+            self.events_in += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _PendingPath(path, kind, now)
+            else:
+                pending.last_kind = kind
+                pending.last_time = now
+                pending.count += 1
+            self._cond.notify_all()
+
+    def pending_count(self):
+        """窗口内尚未输出的路径数 - Number of paths still inside their window"""
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        """返回输入事件数与输出动作数 - Return events in versus actions out"""
+        with self._cond:
+            actions = dict(self.actions_out)
+            return {
+                "events_in": self.events_in,
+                "actions_out": sum(v for k, v in actions.items() if k != ACTION_NOOP),
+                "by_action": actions
+            }
+
+    def _flush_loop(self):
+        """等待窗口到期并输出动作 - Wait for windows to expire and emit actions"""
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    earliest = min(p.last_time for p in self._pending.values()) + self.window
+                    delay = earliest - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+            self._emit(self._take_due())
+
+    def _take_due(self, force=False):
+        """取出窗口已到期的路径 - Take the paths whose window has expired"""
+        now = time.monotonic()
+        with self._cond:
+            due = [key for key, p in self._pending.items() if force or now - p.last_time >= self.window]
+            return [self._pending.pop(key) for key in due]
+
+    def _emit(self, batch):
+        """输出合并后的动作 - Emit the coalesced actions"""
+        for pending in batch:
+            action = net_action(pending.first_kind, pending.last_kind)
+            with self._cond:
+                self.actions_out[action] += 1
+            if action != ACTION_NOOP:
+                self.on_action(pending.path, action)
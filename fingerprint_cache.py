@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件指纹缓存模块 - File Fingerprint Cache Module
+以 (设备, inode, 大小, mtime_ns) 为键持久化文件哈希，未变化的文件无需重新读取
+Persists file hashes keyed on (device, inode, size, mtime_ns) so unchanged files are never re-read
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+# 缓存条目上限 - Upper bound on cached entries
+DEFAULT_MAX_ENTRIES = 4096
+# 每个条目记录的其他名称（硬链接）上限 - Upper bound on the other names (hardlinks) recorded per entry
+MAX_ALIASES = 8
+
+
+class FingerprintCache:
+    """持久化文件指纹缓存 - Persistent file fingerprint cache"""
+
+    def __init__(self, cache_file, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 串行化文件写入，多个工作线程同时保存时不会互相覆盖临时文件 - Serializes file writes so concurrent saves never clobber each other's temp file
+        self._write_lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+
+        # 命中统计 - Hit/miss counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.load()
+
+    @staticmethod
+    def make_key(st, algorithm):
+        """由 stat 结果生成缓存键 - Build the cache key from a stat result"""
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{algorithm}"
+
+    def load(self):
+        """加载缓存文件 - Load the cache file"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = data.get("entries", {})
+            if isinstance(entries, dict):
+                self._entries = entries
+        except (OSError, ValueError):
+            # 缓存损坏时直接丢弃，下次访问会重新计算 - A corrupt cache is dropped and rebuilt on demand
+            self._entries = {}
+
+    def save(self):
+        """原子写入缓存文件（没有新条目或淘汰时不写） - Atomically write the cache file (skipped when nothing was added or evicted)"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {"entries": {key: dict(entry) for key, entry in self._entries.items()}}
+                self._dirty = False
+
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            temp_file = None
+            try:
+                fd, temp_file = tempfile.mkstemp(prefix=os.path.basename(self.cache_file) + ".", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_file, self.cache_file)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                if temp_file is not None:
+                    try:
+                        os.remove(temp_file)
+                    except OSError:
+                        pass
+                raise
+
+    def lookup(self, filepath, algorithm, st=None):
+        """查询未变化文件的已缓存哈希 - Return the cached hash for an unchanged file, or None"""
+        if st is None:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                return None
+
+        key = self.make_key(st, algorithm)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # 只更新内存中的使用时间，随下一次保存写出，命中本身不触发写入
+            # last_used is refreshed in memory and written with the next save; a hit alone causes no write
+            entry["last_used"] = time.time()
+            aliases = entry.get("aliases", [])
+            if filepath != entry.get("path") and filepath not in aliases and len(aliases) < MAX_ALIASES:
+                # 同一 inode 的其他名称（硬链接、重命名）另外记录，原路径保持不变，任一名称存在时条目都不会被清除
+                # Another name for the same inode (hardlink, rename) is recorded separately and the original path is kept;
+                # the entry survives while any of its names still exists
+                entry["aliases"] = aliases + [filepath]
+                self._dirty = True
+            return entry["hash"]
+
+    def store(self, filepath, algorithm, hexdigest, st):
+        """记录文件哈希 - Record a file hash"""
+        key = self.make_key(st, algorithm)
+        with self._lock:
+            self._entries[key] = {
+                "path": filepath,
+                "hash": hexdigest,
+                "last_used": time.time()
+            }
+            self._dirty = True
+            self._enforce_limit()
+
+    def get_or_compute(self, filepath, hasher):
+        """返回缓存哈希，未命中时计算并缓存 - Return the cached hash, computing and caching it on a miss
+
+        返回 (哈希值, 哈希结果或None)；命中时第二项为 None。读取失败时抛出 OSError。
+        Returns (hexdigest, HashResult or None); the second item is None on a hit. Raises OSError on failure.
+        """
+        st = os.stat(filepath)
+        cached = self.lookup(filepath, hasher.algorithm, st)
+        if cached is not None:
+            return cached, None
+
+        result = hasher.hash_file(filepath)
+        # 哈希期间文件被修改则不缓存 - Do not cache when the file changed while it was being hashed
+        after = os.stat(filepath)
+        if self.make_key(after, hasher.algorithm) == self.make_key(st, hasher.algorithm):
+            self.store(filepath, hasher.algorithm, result.hexdigest, st)
+        return result.hexdigest, result
+
+    def evict_stale(self):
+        """清除文件已删除或已变化的条目 - Evict entries whose file is gone or has changed"""
+        with self._lock:
+            snapshot = list(self._entries.items())
+
+        stale = []
+        for key, entry in snapshot:
+            if not any(self._is_alive(path, key) for path in [entry.get("path", "")] + entry.get("aliases", [])):
+                stale.append(key)
+
+        with self._lock:
+            for key in stale:
+                if self._entries.pop(key, None) is not None:
+                    self.evictions += 1
+                    self._dirty = True
+        return len(stale)
+
+    def _is_alive(self, path, key):
+        """路径是否仍是缓存键对应的未变化文件 - Whether the path is still the unchanged file the key describes"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return self.make_key(st, key.rsplit(":", 1)[-1]) == key
+
+    def _enforce_limit(self):
+        """超过上限时淘汰最久未使用的条目 - Drop least recently used entries beyond the limit"""
+        overflow = len(self._entries) - self.max_entries
+        if overflow <= 0:
+            return
+        oldest = sorted(self._entries.items(), key=lambda item: item[1].get("last_used", 0))[:overflow]
+        for key, _ in oldest:
+            del self._entries[key]
+            self.evictions += 1
+
+    def stats(self):
+        """返回缓存统计 - Return cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏安装检测模块 - Game Install Discovery Module
+读取 Steam 的 libraryfolders.vdf / appmanifest_*.acf 和 Epic 的 .item 清单，一次找出所有安装位置
+Reads Steam libraryfolders.vdf / appmanifest_*.acf and Epic .item manifests to find every install in one pass
+
+结果连同所读清单的修改时间一起缓存，清单未变化时只读取缓存文件。
+Results are cached together with the mtimes of the manifests they came from; while those are unchanged
+only the cache file is read.
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+from collections import namedtuple
+
+# 明末：渊虚之羽 - Wuchang: Fallen Feathers
+STEAM_APP_ID = "2277560"
+STEAM_INSTALL_DIR = "WUCHANG Fallen Feathers"
+EPIC_MATCH = ("wuchang",)
+CACHE_VERSION = 1
+
+# 检测到的安装位置 - A discovered install
+GameInstall = namedtuple("GameInstall", ["store", "path", "manifest"])
+
+_VDF_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])|//[^\n]*|([^\s{}"]+)')
+_VDF_ESCAPES = {"\\\\": "\\", '\\"': '"', "\\n": "\n", "\\t": "\t"}
+
+
+def parse_vdf(text):
+    """解析 Valve KeyValues 文本，键统一为小写 - Parse Valve KeyValues text; keys are lower-cased"""
+    root = {}
+    stack = [root]
+    key = None
+    for match in _VDF_TOKEN.finditer(text):
+        quoted, brace, bare = match.groups()
+        if brace == "{":
+            child = {}
+            if key is not None:
+                stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif brace == "}":
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif quoted is not None or bare is not None:
+            value = re.sub(r'\\[\\"nt]', lambda m: _VDF_ESCAPES[m.group(0)], quoted) if quoted is not None else bare
+            if key is None:
+                key = value.lower()
+            else:
+                stack[-1][key] = value
+                key = None
+    return root
+
+
+def default_steam_roots():
+    """Steam 的安装目录（注册表和常见位置） - Steam install roots (registry and usual locations)"""
+    roots = []
+    if os.name == 'nt':
+        try:
+            import winreg
+            for hive, subkey, name in ((winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam", "SteamPath"),
+                                       (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Valve\Steam", "InstallPath"),
+                                       (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Valve\Steam", "InstallPath")):
+                try:
+                    with winreg.OpenKey(hive, subkey) as key:
+                        roots.append(os.path.normpath(winreg.QueryValueEx(key, name)[0]))
+                except OSError:
+                    continue
+        except ImportError:
+            pass
+        roots.append(os.path.join(os.getenv("ProgramFiles(x86)", "C:\\Program Files (x86)"), "Steam"))
+    else:
+        home = os.path.expanduser("~")
+        roots.extend([os.path.join(home, ".steam", "steam"),
+                      os.path.join(home, ".local", "share", "Steam"),
+                      os.path.join(home, ".var", "app", "com.valvesoftware.Steam", ".local", "share", "Steam")])
+        if sys.platform == "darwin":
+            roots.append(os.path.join(home, "Library", "Application Support", "Steam"))
+    return roots
+
+
+def default_epic_manifest_dirs():
+    """Epic 启动器清单目录 - Epic Games Launcher manifest directories"""
+    if os.name == 'nt':
+        program_data = os.getenv("PROGRAMDATA", "C:\\ProgramData")
+        return [os.path.join(program_data, "Epic", "EpicGamesLauncher", "Data", "Manifests")]
+    return []
+
+
+class GameDiscovery:
+    """游戏安装检测（带缓存） - Cached game install discovery
+
+    steam_roots / epic_manifest_dirs 可指定为测试用的清单目录树。
+    steam_roots / epic_manifest_dirs can point at fixture manifest trees for testing.
+    """
+
+    def __init__(self, cache_file=None, steam_roots=None, epic_manifest_dirs=None):
+        self.cache_file = cache_file
+        self.steam_roots = default_steam_roots() if steam_roots is None else list(steam_roots)
+        self.epic_manifest_dirs = default_epic_manifest_dirs() if epic_manifest_dirs is None else list(epic_manifest_dirs)
+
+    def discover(self, refresh=False):
+        """返回所有安装位置；清单未变化时直接使用缓存 - Return every install, from the cache while the manifests are unchanged"""
+        if not refresh:
+            cached = self._load_cache()
+            if cached is not None:
+                return cached
+        # 记录读取过的每个清单（不存在的记为 None），任何一个变化都会使缓存失效
+        # Every manifest consulted (None when absent); a change to any of them invalidates the cache
+        inputs = {}
+        installs = self._discover_steam(inputs) + self._discover_epic(inputs)
+        # 同一目录只保留一次 - Keep each directory once
+        unique, seen = [], set()
+        for install in installs:
+            key = os.path.normcase(os.path.normpath(install.path))
+            if key not in seen:
+                seen.add(key)
+                unique.append(install)
+        self._save_cache(inputs, unique)
+        return unique
+
+    def _discover_steam(self, inputs):
+        installs = []
+        libraries = []
+        for root in self.steam_roots:
+            for vdf_path in (os.path.join(root, "steamapps", "libraryfolders.vdf"),
+                             os.path.join(root, "config", "libraryfolders.vdf")):
+                data = self._read_vdf(vdf_path, inputs)
+                folders = data.get("libraryfolders", {}) if data else {}
+                for key, value in folders.items():
+                    if isinstance(value, dict) and "path" in value:
+                        # 新格式：{"path": ..., "apps": {...}} - New format
+                        libraries.append(value["path"])
+                    elif isinstance(value, str) and key.isdigit():
+                        # 旧格式："1" "D:\\SteamLibrary" - Old format
+                        libraries.append(value)
+            # Steam 目录本身也是一个库 - The Steam root is a library itself
+            libraries.append(root)
+
+        seen = set()
+        for library in libraries:
+            key = os.path.normcase(os.path.normpath(library))
+            if key in seen:
+                continue
+            seen.add(key)
+            steamapps = os.path.join(library, "steamapps")
+            manifest_path = os.path.join(steamapps, f"appmanifest_{STEAM_APP_ID}.acf")
+            data = self._read_vdf(manifest_path, inputs)
+            install_dir = (data or {}).get("appstate", {}).get("installdir") or STEAM_INSTALL_DIR
+            game_path = os.path.join(steamapps, "common", install_dir)
+            if data is not None and os.path.isdir(game_path):
+                installs.append(GameInstall("steam", game_path, manifest_path))
+            elif data is None and os.path.isdir(os.path.join(steamapps, "common", STEAM_INSTALL_DIR)):
+                # 清单缺失但默认目录存在（例如手动复制的安装） - No manifest, but the default folder exists (e.g. a copied install)
+                inputs[os.path.join(steamapps, "common")] = self._mtime(os.path.join(steamapps, "common"))
+                installs.append(GameInstall("steam", os.path.join(steamapps, "common", STEAM_INSTALL_DIR), None))
+        return installs
+
+    def _discover_epic(self, inputs):
+        installs = []
+        for manifest_dir in self.epic_manifest_dirs:
+            # 目录的修改时间在清单增删时变化 - The directory mtime changes when manifests are added or removed
+            inputs[manifest_dir] = self._mtime(manifest_dir)
+            for item_path in sorted(glob.glob(os.path.join(manifest_dir, "*.item"))):
+                try:
+                    with open(item_path, "r", encoding="utf-8") as f:
+                        item = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                names = " ".join(str(item.get(field, "")) for field in ("DisplayName", "AppName", "LaunchExecutable")).lower()
+                location = item.get("InstallLocation", "")
+                if location and any(word in names for word in EPIC_MATCH):
+                    inputs[item_path] = self._mtime(item_path)
+                    if os.path.isdir(location):
+                        installs.append(GameInstall("epic", os.path.normpath(location), item_path))
+        return installs
+
+    def _read_vdf(self, path, inputs):
+        """读取 VDF 文件并记录其修改时间，不存在时返回 None - Read a VDF file and record its mtime; None when absent"""
+        inputs[path] = self._mtime(path)
+        if inputs[path] is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return parse_vdf(f.read())
+        except OSError:
+            return None
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_cache(self):
+        """读取缓存；任何记录的清单变化时返回 None - Load the cache; None when any recorded manifest has changed"""
+        if not self.cache_file:
+            return None
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (cache.get("version") != CACHE_VERSION
+                or cache.get("steam_roots") != self.steam_roots
+                or cache.get("epic_manifest_dirs") != self.epic_manifest_dirs):
+            return None
+        for path, mtime in cache.get("inputs", {}).items():
+            if self._mtime(path) != mtime:
+                return None
+        return [GameInstall(*install) for install in cache.get("installs", [])]
+
+    def _save_cache(self, inputs, installs):
+        if not self.cache_file:
+            return
+        cache = {
+            "version": CACHE_VERSION,
+            "steam_roots": self.steam_roots,
+            "epic_manifest_dirs": self.epic_manifest_dirs,
+            "inputs": inputs,
+            "installs": [list(install) for install in installs]
+        }
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行模块 - Command Line Module
+无人值守运行启动器：monitor、scan、verify、backup、restore、diff、status 子命令，不显示标志和菜单
+Runs the launcher unattended through the monitor, scan, verify, backup, restore, diff and status subcommands,
+without the logo or the interactive menu
+
+监控时主线程阻塞在事件上而不是轮询；SIGTERM/SIGINT 触发正常停止。
+While monitoring, the main thread blocks on an event instead of polling; SIGTERM/SIGINT trigger a clean stop.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+
+# 退出码 - Exit codes
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+
+def install_stop_handlers(stop_event):
+    """收到终止信号时设置停止事件并打断主线程的等待 - Set the stop event on termination signals and break the main thread's wait"""
+
+    def handler(signum, frame):
+        if stop_event.is_set():
+            return
+        stop_event.set()
+        raise KeyboardInterrupt
+
+    for name in ("SIGTERM", "SIGINT", "SIGHUP", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
+
+
+def wait_for_stop(stop_event):
+    """阻塞直到停止事件被设置，空闲时不唤醒 - Block until the stop event is set, with no idle wakeups"""
+    while not stop_event.is_set():
+        if os.name == 'nt':
+            # Windows 上 Event.wait 无法被 Ctrl+C 打断，time.sleep 可以 - On Windows only time.sleep is interruptible by Ctrl+C
+            time.sleep(3600)
+        else:
+            stop_event.wait()
+
+
+def pid_alive(pid):
+    """检查进程是否存在 - Check whether a process exists"""
+    if not pid:
+        return False
+    if os.name == 'nt':
+        # Windows 上 os.kill(pid, 0) 会结束进程，改用 OpenProcess - os.kill(pid, 0) terminates on Windows; use OpenProcess
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def build_parser():
+    """构建命令行解析器 - Build the argument parser"""
+    # 只在命令行模式下导入 - Only imported in command-line mode
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="Wuchang_FMM_Launcher",
+        description="明末：渊虚之羽 FMM 启动器（无人值守模式） - Wuchang FMM Launcher (headless mode)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    monitor = subparsers.add_parser("monitor", help="监控PAK文件直到收到终止信号 - Monitor PAK files until terminated")
+    monitor.add_argument("--no-fmm", action="store_true", help="不启动 Fluffy Mod Manager - Do not launch Fluffy Mod Manager")
+
+    subparsers.add_parser("scan", help="对账一次现有PAK文件后退出 - Reconcile existing PAK files once and exit")
+
+    verify = subparsers.add_parser("verify", help="校验已登记的链接 - Verify registered links")
+    verify.add_argument("--repair", action="store_true", help="发现问题时重新对账 - Reconcile when problems are found")
+    verify.add_argument("--json", action="store_true", help="输出 JSON - Print JSON")
+
+    backup = subparsers.add_parser("backup", help="备份游戏存档 - Back up the game saves")
+    backup.add_argument("--save-dir", help="存档目录（默认自动检测） - Save directory (auto-detected by default)")
+    backup.add_argument("--list", action="store_true", help="列出已有备份 - List existing backups")
+    backup.add_argument("--prune", action="store_true", help="只按保留策略清理旧备份 - Only prune old backups by the retention policy")
+
+    restore = subparsers.add_parser("restore", help="恢复存档备份 - Restore a save backup")
+    restore.add_argument("backup_id", help="备份编号（见 backup --list） - Backup id (see backup --list)")
+    restore.add_argument("--save-dir", help="恢复到的目录（默认为备份时的目录） - Directory to restore into (the original by default)")
+    restore.add_argument("--keep-extra", action="store_true",
+                         help="保留备份中没有的文件 - Keep files that are not in the backup")
+
+    diff = subparsers.add_parser("diff", help="比较两个存档备份 - Compare two save backups")
+    diff.add_argument("old_id", help="较旧的备份编号 - Older backup id")
+    diff.add_argument("new_id", help="较新的备份编号 - Newer backup id")
+    diff.add_argument("--json", action="store_true", help="输出 JSON - Print JSON")
+
+    status = subparsers.add_parser("status", help="显示监控状态 - Show the monitor status")
+    status.add_argument("--json", action="store_true", help="输出 JSON - Print JSON")
+    return parser
+
+
+def run_cli(argv, manager_factory):
+    """执行子命令并返回退出码 - Run a subcommand and return the exit code
+
+    manager_factory 创建 PAKManager，避免本模块导入主程序。
+    manager_factory builds the PAKManager so this module never imports the main program.
+    """
+    args = build_parser().parse_args(argv)
+    manager = manager_factory()
+    if args.command == "status":
+        # 只读取状态文件，不写出注册表 - Only reads the status file and never writes the registry
+        return _cmd_status(manager, args)
+
+    if args.command in ("monitor", "scan", "verify") and _daemon_running(manager):
+        # 注册表只允许一个进程写入 - Only one process may write the registry
+        print("another launcher instance is monitoring; stop it first", file=sys.stderr)
+        return EXIT_USAGE
+    handler = {
+        "monitor": _cmd_monitor,
+        "scan": _cmd_scan,
+        "verify": _cmd_verify,
+        "backup": _cmd_backup,
+        "restore": _cmd_restore,
+        "diff": _cmd_diff
+    }[args.command]
+    try:
+        return handler(manager, args)
+    finally:
+        if args.command != "monitor":
+            manager.shutdown()
+
+
+def _daemon_running(manager):
+    """是否有其他进程正在监控 - Whether another process is monitoring"""
+    status = manager.read_status()
+    pid = status.get("pid")
+    return status.get("state") == "running" and pid != os.getpid() and pid_alive(pid)
+
+
+def _cmd_monitor(manager, args):
+    install_stop_handlers(manager.stop_event)
+    try:
+        if not manager.start_monitoring(interactive=False, launch_fmm=not args.no_fmm):
+            return EXIT_FAILURE
+        wait_for_stop(manager.stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.shutdown()
+    return EXIT_OK
+
+
+def _cmd_scan(manager, args):
+    manager.scan_existing_pak_files()
+    return EXIT_OK
+
+
+def _cmd_verify(manager, args):
+    problems = manager.verify_links()
+    if args.json:
+        print(json.dumps([{"source": source, "target": target, "problem": problem}
+                          for source, target, problem in problems], ensure_ascii=False, indent=2))
+    else:
+        for source, target, problem in problems:
+            print(f"{problem}\t{source}\t{target}")
+    if problems and args.repair:
+        manager.scan_existing_pak_files()
+        problems = manager.verify_links()
+    return EXIT_FAILURE if problems else EXIT_OK
+
+
+def _cmd_backup(manager, args):
+    if args.list:
+        for backup in manager.common_ops.get_backup_store().list_backups():
+            print(f"{backup['id']}\t{backup['stats']['files']}\t{backup['source']}")
+        return EXIT_OK
+    if args.prune:
+        for backup_id in manager.common_ops.prune_save_backups():
+            print(backup_id)
+        return EXIT_OK
+    try:
+        result = manager.common_ops.backup_save_directory(args.save_dir)
+    except Exception as e:
+        print(f"backup failed: {e}", file=sys.stderr)
+        return EXIT_FAILURE
+    print(result.backup_id)
+    print(f"files={result.files} changed={result.changed} stored_bytes={result.stored_bytes} elapsed={result.elapsed:.3f}s",
+          file=sys.stderr)
+    return EXIT_OK
+
+
+def _cmd_restore(manager, args):
+    try:
+        result = manager.common_ops.restore_save_backup(args.backup_id, args.save_dir, keep_extra=args.keep_extra)
+    except Exception as e:
+        print(f"restore failed: {e}", file=sys.stderr)
+        return EXIT_FAILURE
+    print(f"written={result.written} unchanged={result.unchanged} displaced={result.displaced}")
+    return EXIT_OK
+
+
+def _cmd_diff(manager, args):
+    try:
+        diff = manager.common_ops.diff_save_backups(args.old_id, args.new_id)
+    except (OSError, ValueError) as e:
+        print(f"diff failed: {e}", file=sys.stderr)
+        return EXIT_FAILURE
+    if args.json:
+        print(json.dumps(diff._asdict(), ensure_ascii=False, indent=2))
+    else:
+        for prefix, paths in (("+", diff.added), ("-", diff.removed), ("~", diff.modified)):
+            for path in paths:
+                print(f"{prefix}\t{path}")
+    return EXIT_OK
+
+
+def _cmd_status(manager, args):
+    status = manager.read_status()
+    status["running"] = status.get("state") == "running" and pid_alive(status.get("pid"))
+    if args.json:
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+    else:
+        for key in sorted(status):
+            print(f"{key}: {status[key]}")
+    return EXIT_OK if status["running"] else EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    from Wuchang_FMM_Launcher import PAKManager
+    sys.exit(run_cli(sys.argv[1:], PAKManager))
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接注册表存储模块 - Link Registry Store Module
+提供两种接口相同的注册表后端 - Provides two registry backends behind the same interface:
+
+- json: 每次操作只向追加日志写入一条记录，由后台去抖压缩生成原子快照；崩溃后通过重放日志恢复
+        Each operation appends one journal record; a debounced background compaction writes an atomic
+        snapshot, and after a crash the store recovers by replaying the journal
+- sqlite: 按源路径、目标路径、哈希和创建时间建立索引，适合数万条记录
+          Indexed by source, target, hash and creation time for registries with tens of thousands of entries
+"""
+
+import os
+import json
+import time
+import threading
+from collections.abc import MutableMapping
+
+# 注册表后端名称 - Registry backend names
+BACKEND_JSON = "json"
+BACKEND_SQLITE = "sqlite"
+
+# 最后一次写入后多久压缩（秒） - Delay after the last write before compacting (seconds)
+DEFAULT_COMPACT_DELAY = 2.0
+# 日志记录数达到该值时立即压缩 - Compact right away once the journal holds this many records
+DEFAULT_COMPACT_RECORDS = 1000
+
+
+class LinkRegistryStore(MutableMapping):
+    """基于追加日志的链接注册表 - Journaled link registry
+
+    以源文件绝对路径为键，行为与普通字典一致。read_only 为真时只加载快照和日志，不打开日志、不压缩、不改动任何文件。
+    Keyed by absolute source path and behaves like a plain dict. With read_only the snapshot and journals are
+    only loaded: no journal is opened, nothing is compacted and no file is touched.
+    """
+
+    def __init__(self, registry_file, compact_delay=DEFAULT_COMPACT_DELAY, compact_records=DEFAULT_COMPACT_RECORDS,
+                 read_only=False):
+        self.registry_file = registry_file
+        self.journal_file = f"{registry_file}.journal"
+        self.compacting_file = f"{registry_file}.journal.compacting"
+        self.compact_delay = compact_delay
+        self.compact_records = compact_records
+        self.read_only = read_only
+
+        self._data = {}
+        self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        self._compact_lock = threading.Lock()
+        self._journal = None
+        self._journal_records = 0
+        self._last_write = 0.0
+        self._thread = None
+        self._closed = False
+
+        # 加载过程中的恢复信息，供调用方提示 - Recovery notes from loading, for the caller to report
+        self.recovery_notes = []
+        self.replayed_records = 0
+
+        self._load()
+        if not read_only:
+            self._open_journal()
+
+    # ---- 字典接口 - Mapping interface ----
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._append({"op": "put", "key": key, "value": value})
+            self._data[key] = value
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._data:
+                raise KeyError(key)
+            self._append({"op": "del", "key": key})
+            del self._data[key]
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._data))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def items(self):
+        """返回条目快照，迭代期间可被其他线程修改 - Return a snapshot of the items, safe against concurrent writes"""
+        with self._lock:
+            return list(self._data.items())
+
+    # ---- 查询 - Lookups ----
+
+    def find_by_target(self, target):
+        """按目标路径查找条目 - Find entries by target path"""
+        return [(k, v) for k, v in self.items() if v.get("target") == target]
+
+    def find_by_hash(self, file_hash):
+        """按内容哈希查找条目 - Find entries by content hash"""
+        return [(k, v) for k, v in self.items() if file_hash and v.get("file_hash") == file_hash]
+
+    def items_in_directory(self, directory):
+        """列出源文件位于指定目录的条目 - List entries whose source lives in the given directory"""
+        directory = os.path.normcase(os.path.normpath(directory))
+        return [(k, v) for k, v in self.items() if os.path.normcase(os.path.dirname(k)) == directory]
+
+    # ---- 持久化 - Persistence ----
+
+    def flush(self):
+        """立即写出快照并清空日志 - Write a snapshot now and empty the journal"""
+        self._compact()
+
+    def close(self):
+        """写出最终快照并停止后台线程 - Write a final snapshot and stop the background thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._compact()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    def _load(self):
+        """加载快照并重放日志 - Load the snapshot and replay the journals"""
+        if os.path.exists(self.registry_file):
+            try:
+                with open(self.registry_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except (OSError, ValueError) as e:
+                # 保留损坏的快照以便排查，依靠日志恢复 - Keep the damaged snapshot for inspection and rely on the journal
+                corrupt_file = f"{self.registry_file}.corrupt-{int(time.time())}"
+                try:
+                    if self.read_only:
+                        raise OSError("read-only")
+                    os.replace(self.registry_file, corrupt_file)
+                except OSError:
+                    corrupt_file = self.registry_file
+                self.recovery_notes.append(f"snapshot unreadable ({e}), moved to {corrupt_file}")
+
+        # 先重放压缩中断时留下的旧日志 - Replay the journal left by an interrupted compaction first
+        for journal in (self.compacting_file, self.journal_file):
+            self.replayed_records += self._replay(journal)
+
+    def _replay(self, journal):
+        """重放一个日志文件，忽略末尾不完整的记录 - Replay one journal, ignoring a torn final record"""
+        if not os.path.exists(journal):
+            return 0
+        count = 0
+        with open(journal, 'r', encoding='utf-8', errors='replace') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    if record["op"] == "put":
+                        self._data[record["key"]] = record["value"]
+                    elif record["op"] == "del":
+                        self._data.pop(record["key"], None)
+                    count += 1
+                except (ValueError, KeyError, TypeError):
+                    self.recovery_notes.append(f"skipped damaged journal record {os.path.basename(journal)}:{line_no}")
+        return count
+
+    def _open_journal(self):
+        """打开追加日志 - Open the journal for appending"""
+        # 崩溃留下的半条记录之后另起一行 - Start a fresh line after a record torn by a crash
+        torn = False
+        if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        with self._lock:
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            if torn:
+                self._journal.write("\n")
+            self._journal_records = self.replayed_records
+            if self._journal_records:
+                # 恢复出的记录尽快写入快照 - Fold recovered records into a snapshot soon
+                self._schedule_compaction()
+
+    def _append(self, record):
+        """追加一条日志记录（需持有锁） - Append one journal record (lock held)"""
+        if self._journal is None:
+            raise ValueError("link registry store is read-only" if self.read_only else "link registry store is closed")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._journal_records += 1
+        self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        """安排去抖压缩（需持有锁） - Schedule a debounced compaction (lock held)"""
+        self._last_write = time.monotonic()
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._compaction_loop, name="registry-compactor", daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _compaction_loop(self):
+        """后台压缩线程 - Background compaction thread"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._journal_records == 0:
+                        self._cond.wait()
+                        continue
+                    if self._journal_records >= self.compact_records:
+                        break
+                    delay = self._last_write + self.compact_delay - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+            try:
+                self._compact()
+            except OSError:
+                # 压缩失败时日志仍然完整，稍后重试 - The journal is still intact on failure; retry later
+                with self._cond:
+                    self._journal_records += 1
+                    self._last_write = time.monotonic()
+
+    def _compact(self):
+        """将当前内容写为原子快照并轮换日志 - Write the current contents as an atomic snapshot and rotate the journal"""
+        with self._compact_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """压缩的实际步骤（持有压缩锁） - The compaction itself (compaction lock held)"""
+        with self._lock:
+            if self._journal is None:
+                return
+            if (self._journal_records == 0 and os.path.exists(self.registry_file)
+                    and not os.path.exists(self.compacting_file)):
+                return
+            data = dict(self._data)
+            # 轮换日志：快照写完前旧日志保留，保证崩溃可恢复 - Rotate: the old journal stays until the snapshot lands
+            self._journal.close()
+            if not os.path.exists(self.compacting_file):
+                os.replace(self.journal_file, self.compacting_file)
+            else:
+                # 上次压缩未完成，把新记录并入旧日志 - A previous compaction was interrupted; merge into its journal
+                with open(self.journal_file, 'r', encoding='utf-8') as src, \
+                        open(self.compacting_file, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_file)
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal_records = 0
+
+        temp_file = f"{self.registry_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.registry_file)
+        except OSError:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+        os.remove(self.compacting_file)
+
+
+class SQLiteLinkRegistryStore(MutableMapping):
+    """基于 SQLite 的链接注册表 - SQLite-backed link registry
+
+    与 LinkRegistryStore 接口相同，每次操作是一个独立的小事务。
+    Same interface as LinkRegistryStore; every operation is its own small transaction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS links (
+            source TEXT PRIMARY KEY,
+            source_dir TEXT NOT NULL,
+            target TEXT,
+            file_hash TEXT,
+            created_time TEXT,
+            entry TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_links_source_dir ON links(source_dir);
+        CREATE INDEX IF NOT EXISTS idx_links_target ON links(target);
+        CREATE INDEX IF NOT EXISTS idx_links_hash ON links(file_hash);
+        CREATE INDEX IF NOT EXISTS idx_links_created ON links(created_time);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        # 仅 SQLite 后端需要，启动时不导入 - Only the SQLite backend needs it; not imported at startup
+        import sqlite3
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self.recovery_notes = []
+
+    @staticmethod
+    def _source_dir(source):
+        return os.path.normcase(os.path.normpath(os.path.dirname(source)))
+
+    # ---- 字典接口 - Mapping interface ----
+
+    def __getitem__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM links WHERE source = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO links (source, source_dir, target, file_hash, created_time, entry) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self._source_dir(key), value.get("target"), value.get("file_hash"),
+                 value.get("created_time"), json.dumps(value, ensure_ascii=False))
+            )
+
+    def __delitem__(self, key):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM links WHERE source = ?", (key,))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT source FROM links ORDER BY created_time").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM links WHERE source = ?", (key,)).fetchone() is not None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        with self._lock:
+            try:
+                value = self[key]
+            except KeyError:
+                if default:
+                    return default[0]
+                raise
+            del self[key]
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM links")
+
+    def items(self):
+        """按创建时间返回所有条目 - Return all entries ordered by creation time"""
+        return self._query("SELECT source, entry FROM links ORDER BY created_time")
+
+    # ---- 查询 - Lookups ----
+
+    def find_by_target(self, target):
+        """按目标路径查找条目 - Find entries by target path"""
+        return self._query("SELECT source, entry FROM links WHERE target = ?", (target,))
+
+    def find_by_hash(self, file_hash):
+        """按内容哈希查找条目 - Find entries by content hash"""
+        if not file_hash:
+            return []
+        return self._query("SELECT source, entry FROM links WHERE file_hash = ?", (file_hash,))
+
+    def items_in_directory(self, directory):
+        """列出源文件位于指定目录的条目 - List entries whose source lives in the given directory"""
+        source_dir = os.path.normcase(os.path.normpath(directory))
+        return self._query("SELECT source, entry FROM links WHERE source_dir = ? ORDER BY created_time", (source_dir,))
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(source, json.loads(entry)) for source, entry in rows]
+
+    # ---- 迁移与持久化 - Migration and persistence ----
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_entries(self, entries):
+        """在单个事务中批量导入条目 - Bulk-import entries in one transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for key, value in entries:
+                    self[key] = value
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def flush(self):
+        """将 WAL 合并回数据库文件 - Checkpoint the WAL into the database file"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        """关闭数据库连接 - Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.close()
+                self._conn = None
+
+
+def open_link_registry(registry_file, backend=BACKEND_JSON):
+    """按配置打开注册表后端 - Open the configured registry backend
+
+    首次使用 SQLite 后端时，会一次性迁移现有 JSON 注册表（含未压缩的日志）；JSON 快照和日志以只读方式加载，保留不动。
+    The first time the SQLite backend is used, the existing JSON registry (journals included) is migrated
+    once; the JSON snapshot and journals are loaded read-only and left untouched.
+    """
+    if backend != BACKEND_SQLITE:
+        return LinkRegistryStore(registry_file)
+
+    db_file = f"{os.path.splitext(registry_file)[0]}.db"
+    store = SQLiteLinkRegistryStore(db_file)
+    if store.get_meta("migrated_from_json") is None:
+        has_json = any(os.path.exists(path) for path in (
+            registry_file, f"{registry_file}.journal", f"{registry_file}.journal.compacting"))
+        if has_json:
+            legacy = LinkRegistryStore(registry_file, read_only=True)
+            entries = legacy.items()
+            store.recovery_notes.extend(legacy.recovery_notes)
+            store.import_entries(entries)
+            store.recovery_notes.append(f"migrated {len(entries)} entries from {os.path.basename(registry_file)}")
+        store.set_meta("migrated_from_json", time.strftime("%Y-%m-%dT%H:%M:%S"))
+    return store
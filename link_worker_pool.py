@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接工作线程池模块 - Link Worker Pool Module
+将就绪检查、哈希和链接从文件监控线程转移到有界的工作线程池中执行
+Moves readiness checks, hashing and linking off the file-watcher thread onto a bounded worker pool
+
+同一路径的任务按提交顺序串行执行，不同路径的任务并行执行。
+Jobs sharing a key (the file path) run one at a time in submission order; different keys run in parallel.
+
+任务返回 RetryLater 时由定时线程在到期后重新入队，期间该路径的后续任务继续排队，工作线程不会休眠。
+A job returning RetryLater is re-queued by a timer thread when due; later jobs for the same path keep
+waiting behind it and no worker thread sleeps.
+"""
+
+import os
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+from retry_policy import RetryLater
+
+# 默认线程数和队列容量 - Default worker count and queue capacity
+DEFAULT_WORKER_COUNT = min(8, (os.cpu_count() or 2) + 2)
+DEFAULT_QUEUE_SIZE = 256
+
+
+class LinkWorkerPool:
+    """按路径保序的有界工作线程池 - Bounded worker pool with per-path ordering"""
+
+    def __init__(self, worker_count=DEFAULT_WORKER_COUNT, queue_size=DEFAULT_QUEUE_SIZE, name="pak-worker"):
+        self.worker_count = max(1, int(worker_count))
+        self.queue_size = max(1, int(queue_size))
+        self.name = name
+
+        # 待执行任务总数上限，满时阻塞提交方 - Caps outstanding jobs; submitters block when full
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._run_queue = queue.Queue()
+        # 每个键的等待队列，键存在即表示该路径有任务在执行 - Per-key backlog; a present key means a job is in flight
+        self._lanes = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._threads = []
+        self._running = False
+        # 等待重试的任务（到期时间, 序号, 任务） - Jobs waiting to retry (due time, sequence, job)
+        self._timers = []
+        self._timer_seq = itertools.count()
+        self._timer_cond = threading.Condition()
+        self._timer_thread = None
+
+    def start(self):
+        """启动工作线程 - Start the worker threads"""
+        if self._running:
+            return
+        # 线程池启动时才导入 concurrent.futures - concurrent.futures is only imported once a pool starts
+        from concurrent.futures import Future
+        self._future_type = Future
+        self._running = True
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker_loop, name=f"{self.name}-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._timer_thread = threading.Thread(target=self._timer_loop, name=f"{self.name}-timer", daemon=True)
+        self._timer_thread.start()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """提交任务，返回 Future - Submit a job and return its Future
+
+        同一 key 的任务保证按提交顺序依次执行。
+        Jobs with the same key are guaranteed to run one after another in submission order.
+        """
+        if not self._running:
+            raise RuntimeError("worker pool is not running")
+
+        future = self._future_type()
+        job = (os.path.normcase(key), fn, args, kwargs, future)
+        self._slots.acquire()
+
+        with self._lock:
+            self._outstanding += 1
+            lane = self._lanes.get(job[0])
+            if lane is not None:
+                # 该路径已有任务在执行，排在其后 - A job for this path is in flight; queue behind it
+                lane.append(job)
+                return future
+            self._lanes[job[0]] = deque()
+
+        self._run_queue.put(job)
+        return future
+
+    def pending(self):
+        """尚未完成的任务数 - Number of jobs not yet finished"""
+        with self._lock:
+            return self._outstanding
+
+    def wait_idle(self, timeout=None):
+        """等待所有已提交任务完成 - Wait until every submitted job has finished"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def shutdown(self, wait=True):
+        """停止线程池；wait 为真时先执行完已提交任务 - Stop the pool, draining submitted jobs first when wait is true"""
+        if not self._running:
+            return
+        if wait:
+            self.wait_idle()
+        self._running = False
+        for _ in self._threads:
+            self._run_queue.put(None)
+        with self._timer_cond:
+            self._timer_cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            self._timer_thread.join()
+        self._threads = []
+        self._timer_thread = None
+
+    def deferred(self):
+        """等待重试的任务数 - Number of jobs waiting for a retry"""
+        with self._timer_cond:
+            return len(self._timers)
+
+    def _worker_loop(self):
+        """工作线程主循环 - Worker thread main loop"""
+        while True:
+            job = self._run_queue.get()
+            if job is None:
+                break
+            # 同一路径的后续任务直接在本线程继续执行，保证顺序 - Follow-up jobs for the same path run here to keep order
+            while job is not None:
+                if not self._run_job(job):
+                    # 任务等待重试，路径保持占用 - The job awaits a retry; its path stays occupied
+                    break
+                job = self._next_in_lane(job[0])
+
+    def _run_job(self, job):
+        """执行单个任务，任务延后重试时返回 False - Run a single job; returns False when it was deferred for a retry"""
+        key, fn, args, kwargs, future = job
+        if future.running() or future.set_running_or_notify_cancel():
+            try:
+                result = fn(*args, **kwargs)
+                if isinstance(result, RetryLater):
+                    self._defer((key, result.fn, result.args, result.kwargs, future), result.delay)
+                    return False
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._slots.release()
+        with self._lock:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._idle.notify_all()
+        return True
+
+    def _defer(self, job, delay):
+        """安排任务在 delay 秒后重新入队 - Schedule a job to be re-queued after delay seconds"""
+        with self._timer_cond:
+            heapq.heappush(self._timers, (time.monotonic() + max(0.0, delay), next(self._timer_seq), job))
+            self._timer_cond.notify_all()
+
+    def _timer_loop(self):
+        """到期的重试任务重新进入运行队列 - Move due retries back onto the run queue"""
+        with self._timer_cond:
+            while self._running:
+                if not self._timers:
+                    self._timer_cond.wait()
+                    continue
+                delay = self._timers[0][0] - time.monotonic()
+                if delay > 0:
+                    self._timer_cond.wait(delay)
+                    continue
+                _, _, job = heapq.heappop(self._timers)
+                self._run_queue.put(job)
+
+    def _next_in_lane(self, key):
+        """取出同一路径的下一个任务 - Pop the next job queued for the same path"""
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane:
+                return lane.popleft()
+            self._lanes.pop(key, None)
+            return None
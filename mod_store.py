@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址模组存储模块 - Content-Addressed Mod Store Module
+按内容哈希保存 PAK 文件，内容相同的模组只存一份；~mods 中的目标文件由存储对象生成
+Stores PAK files by content hash so byte-identical mods are kept once; targets in ~mods are
+materialized from the stored objects
+
+每个对象记录引用它的目标路径，最后一个引用释放时对象被回收。引用变化只向日志追加一条记录，
+日志达到一定长度或关闭存储时才写出完整的引用表。
+Each object records the target paths that reference it and is collected when the last one is released.
+Reference changes only append a journal record; the full reference table is written once the journal
+grows long enough or the store is closed.
+"""
+
+import os
+import json
+import threading
+
+# 日志记录数达到该值时写出引用表 - Write the reference table once the journal holds this many records
+DEFAULT_COMPACT_RECORDS = 1000
+
+
+class ContentStore:
+    """带引用计数的内容寻址存储 - Content-addressed store with reference counting"""
+
+    def __init__(self, root_dir, copy_engine, compact_records=DEFAULT_COMPACT_RECORDS):
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, "objects")
+        self.refs_file = os.path.join(root_dir, "refs.json")
+        self.journal_file = os.path.join(root_dir, "refs.journal")
+        self.copy_engine = copy_engine
+        self.compact_records = compact_records
+        self._lock = threading.RLock()
+        # 哈希 -> 目标路径集合，以及反向索引 - hash -> set of target paths, plus the reverse index
+        self._refs = {}
+        self._target_index = {}
+        self._journal = None
+        self._journal_records = 0
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._load_refs()
+        self._open_journal()
+
+    def object_path(self, file_hash):
+        """对象在存储中的路径 - Path of an object inside the store"""
+        return os.path.join(self.objects_dir, file_hash[:2], file_hash)
+
+    def has_object(self, file_hash):
+        return os.path.exists(self.object_path(file_hash))
+
+    def acquire(self, source, file_hash, target):
+        """为目标引用内容对象，内容尚未存储时导入源文件 - Reference the object for a target, importing the source if it is not stored yet
+
+        引用在导入前登记，导入期间对象不会被并发回收。返回 (对象路径, 是否新导入)。
+        The reference is registered before importing so the object cannot be collected concurrently.
+        Returns (object_path, newly_ingested).
+        """
+        obj = self.object_path(file_hash)
+        self.add_ref(file_hash, target)
+        with self._lock:
+            if os.path.exists(obj):
+                return obj, False
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+        try:
+            # 复制引擎先尝试写时复制，并通过临时文件原子落盘 - The copy engine tries reflink first and lands atomically
+            self.copy_engine.copy(source, obj)
+        except BaseException:
+            self.release(target)
+            raise
+        return obj, True
+
+    def add_ref(self, file_hash, target):
+        """记录目标对对象的引用，返回被替换掉的旧哈希 - Record a target's reference and return the hash it replaced"""
+        key = os.path.normcase(target)
+        with self._lock:
+            previous = self._target_index.get(key)
+            if previous == file_hash:
+                return None
+            if previous is not None:
+                self._drop_ref(previous, key)
+            self._refs.setdefault(file_hash, set()).add(key)
+            self._target_index[key] = file_hash
+            self._append({"op": "add", "hash": file_hash, "target": key})
+        if previous is not None:
+            self._collect(previous)
+        return previous
+
+    def release(self, target):
+        """释放目标的引用，最后一个引用释放时回收对象 - Release a target's reference and collect the object when it was the last"""
+        key = os.path.normcase(target)
+        with self._lock:
+            file_hash = self._target_index.get(key)
+            if file_hash is None:
+                return False
+            self._drop_ref(file_hash, key)
+            self._append({"op": "drop", "target": key})
+        return self._collect(file_hash)
+
+    def gc(self):
+        """回收所有无引用的对象，返回回收数量 - Collect every unreferenced object and return how many were removed"""
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if self._collect(name):
+                    removed += 1
+        return removed
+
+    def stats(self):
+        """存储统计 - Store statistics"""
+        objects = 0
+        total_bytes = 0
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                objects += 1
+                try:
+                    total_bytes += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        with self._lock:
+            references = sum(len(targets) for targets in self._refs.values())
+        return {"objects": objects, "bytes": total_bytes, "references": references}
+
+    def _drop_ref(self, file_hash, key):
+        """移除一条引用（需持有锁） - Remove one reference (lock held)"""
+        targets = self._refs.get(file_hash)
+        if targets is not None:
+            targets.discard(key)
+            if not targets:
+                del self._refs[file_hash]
+        self._target_index.pop(key, None)
+
+    def _collect(self, file_hash):
+        """对象无引用时删除 - Delete the object if nothing references it"""
+        with self._lock:
+            if file_hash in self._refs:
+                return False
+            obj = self.object_path(file_hash)
+            try:
+                os.remove(obj)
+                return True
+            except FileNotFoundError:
+                return False
+            except OSError:
+                # 对象仍被占用时留给下次回收 - Leave objects still in use for a later collection
+                return False
+
+    def flush(self):
+        """写出完整引用表并清空日志 - Write the full reference table and empty the journal"""
+        with self._lock:
+            if self._journal is not None and self._journal_records:
+                self._save_refs()
+
+    def close(self):
+        """写出引用表并关闭日志 - Write the reference table and close the journal"""
+        with self._lock:
+            self.flush()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _load_refs(self):
+        """加载引用表并重放日志 - Load the reference table and replay the journal"""
+        data = {}
+        if os.path.exists(self.refs_file):
+            try:
+                with open(self.refs_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        for file_hash, targets in data.items():
+            self._refs[file_hash] = set(targets)
+            for target in targets:
+                self._target_index[target] = file_hash
+        self._journal_records = self._replay()
+
+    def _replay(self):
+        """按顺序重放日志，忽略不完整的记录；重复重放结果相同 - Replay the journal in order, skipping torn records; replaying twice is harmless"""
+        if not os.path.exists(self.journal_file):
+            return 0
+        count = 0
+        with open(self.journal_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    key = record["target"]
+                    previous = self._target_index.get(key)
+                    if previous is not None:
+                        self._drop_ref(previous, key)
+                    if record["op"] == "add":
+                        self._refs.setdefault(record["hash"], set()).add(key)
+                        self._target_index[key] = record["hash"]
+                    count += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return count
+
+    def _open_journal(self):
+        """打开新日志，恢复出的记录先写入引用表 - Open a fresh journal; recovered records are folded into the table first"""
+        with self._lock:
+            if self._journal_records:
+                self._save_refs()
+            else:
+                # 没有有效记录，丢弃可能残留的半条记录 - Nothing valid to keep; drop any torn record
+                self._journal = open(self.journal_file, 'w', encoding='utf-8')
+
+    def _append(self, record):
+        """追加一条日志记录，日志过长时写出引用表（需持有锁） - Append a journal record and compact when it grows long (lock held)"""
+        if self._journal is None:
+            # 关闭后的修改直接写入引用表 - Changes after close go straight to the table
+            self._save_refs(reopen=False)
+            return
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._journal_records += 1
+        if self._journal_records >= self.compact_records:
+            self._save_refs()
+
+    def _save_refs(self, reopen=True):
+        """原子写入引用表后清空日志（需持有锁）；先写表再清日志，中途崩溃时重放日志结果不变
+        Atomically write the reference table, then empty the journal (lock held); the table lands before the
+        journal is cleared, so replaying after a crash gives the same result
+        """
+        data = {file_hash: sorted(targets) for file_hash, targets in self._refs.items()}
+        temp_file = f"{self.refs_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.refs_file)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if reopen:
+            self._journal = open(self.journal_file, 'w', encoding='utf-8')
+        else:
+            try:
+                os.remove(self.journal_file)
+            except FileNotFoundError:
+                pass
+        self._journal_records = 0
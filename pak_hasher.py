@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PAK文件哈希模块 - PAK File Hashing Module
+以固定大小的分块流式计算文件哈希，内存占用与文件大小无关
+Streams files through the hash in fixed-size chunks so peak memory stays flat regardless of file size
+"""
+
+import hashlib
+import time
+from collections import namedtuple
+
+# 默认哈希算法和分块大小 - Default hash algorithm and chunk size
+DEFAULT_HASH_ALGORITHM = "blake2b"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+
+# 哈希结果 - Hash result
+HashResult = namedtuple("HashResult", ["hexdigest", "algorithm", "size", "elapsed", "throughput"])
+
+
+def format_size(num_bytes):
+    """格式化字节数 - Format a byte count for display"""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_throughput(bytes_per_second):
+    """格式化吞吐量 - Format a throughput value for display"""
+    return f"{format_size(bytes_per_second)}/s"
+
+
+class FileHasher:
+    """流式文件哈希器 - Streaming file hasher"""
+
+    def __init__(self, algorithm=DEFAULT_HASH_ALGORITHM, chunk_size=DEFAULT_CHUNK_SIZE):
+        # 提前校验算法名称，避免每个文件都失败 - Validate the algorithm up front instead of failing per file
+        hashlib.new(algorithm)
+        self.algorithm = algorithm
+        self.chunk_size = max(int(chunk_size), MIN_CHUNK_SIZE)
+
+    def hash_file(self, filepath):
+        """分块计算文件哈希 - Hash a file chunk by chunk
+
+        每次调用使用独立缓冲区，可在多个线程中同时调用。读取失败时抛出 OSError。
+        Each call owns its buffer so it is safe to call from several threads. Raises OSError on read failure.
+        """
+        digest = hashlib.new(self.algorithm)
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        total = 0
+        start = time.perf_counter()
+
+        with open(filepath, 'rb', buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+                total += read
+
+        elapsed = time.perf_counter() - start
+        throughput = total / elapsed if elapsed > 0 else 0.0
+        return HashResult(digest.hexdigest(), self.algorithm, total, elapsed, throughput)
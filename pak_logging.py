@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志模块 - Logging Module
+监控和链接的诊断信息经由队列异步输出到控制台和按大小轮转的日志文件
+Monitoring and linking diagnostics go through a queue to the console and to a size-rotated log file
+
+记录日志的线程（watchdog、工作线程）只把记录放入队列，磁盘和控制台输出由单独的监听线程完成。
+Logging threads (watchdog, workers) only enqueue records; a separate listener thread does the disk and console I/O.
+"""
+
+import re
+import sys
+import atexit
+import queue
+import logging
+import logging.handlers
+
+LOGGER_NAME = "wuchang_fmm"
+DEFAULT_LOG_LEVEL = "INFO"
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 3
+
+# 控制台颜色码，写入文件前去除 - Console colour codes, stripped before writing to the file
+_ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+def parse_level(level):
+    """将配置中的级别名称转换为 logging 级别，无效时使用 INFO - Turn a configured level name into a logging level, INFO when invalid"""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    return value if isinstance(value, int) else logging.INFO
+
+
+class PlainFormatter(logging.Formatter):
+    """去除颜色码和前导空行的文件格式 - File format without colour codes or leading blank lines"""
+
+    def formatMessage(self, record):
+        record.message = _ANSI_PATTERN.sub("", record.message).strip("\n")
+        return super().formatMessage(record)
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """始终写入当前 sys.stdout（colorama 可能在之后替换它） - Always writes to the current sys.stdout (colorama may replace it later)"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class LogPipeline:
+    """队列日志管线：QueueHandler 负责入队，QueueListener 负责输出 - Queue logging pipeline: QueueHandler enqueues, QueueListener writes"""
+
+    def __init__(self, log_file, level=DEFAULT_LOG_LEVEL, max_bytes=DEFAULT_LOG_MAX_BYTES,
+                 backup_count=DEFAULT_LOG_BACKUP_COUNT, console=True, name=LOGGER_NAME):
+        self.log_file = log_file
+        self.level = parse_level(level)
+        self.max_bytes = max(0, int(max_bytes))
+        self.backup_count = max(0, int(backup_count))
+        self.console = console
+        self.logger = logging.getLogger(name)
+        self._queue = queue.Queue()
+        self._queue_handler = None
+        self._listener = None
+
+    def start(self):
+        """创建输出端并开始监听队列 - Create the sinks and start draining the queue"""
+        if self._listener is not None:
+            return self.logger
+        handlers = []
+        if self.console:
+            console = ConsoleHandler()
+            console.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(console)
+        if self.log_file:
+            # delay=True：第一条记录写出时才打开文件 - delay=True: the file is opened on the first record
+            file_handler = logging.handlers.RotatingFileHandler(
+                self.log_file, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8", delay=True)
+            file_handler.setFormatter(PlainFormatter("%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"))
+            handlers.append(file_handler)
+
+        self._queue_handler = logging.handlers.QueueHandler(self._queue)
+        self.logger.setLevel(self.level)
+        self.logger.addHandler(self._queue_handler)
+        # 不再传给根记录器，避免重复输出 - Do not propagate to the root logger, which would print twice
+        self.logger.propagate = False
+        self._listener = logging.handlers.QueueListener(self._queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self.stop)
+        return self.logger
+
+    def set_level(self, level):
+        """修改日志级别 - Change the log level"""
+        self.level = parse_level(level)
+        self.logger.setLevel(self.level)
+
+    def flush(self):
+        """等待队列中的记录全部输出（菜单显示前调用，保持输出顺序） - Wait until queued records are written (call before menus to keep output in order)"""
+        if self._listener is not None:
+            self._queue.join()
+
+    def stop(self):
+        """输出剩余记录并关闭文件 - Write the remaining records and close the file"""
+        listener = self._listener
+        if listener is None:
+            return
+        self._listener = None
+        listener.stop()
+        self.logger.removeHandler(self._queue_handler)
+        for handler in listener.handlers:
+            handler.close()
+        atexit.unregister(self.stop)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标模块 - Runtime Metrics Module
+为监控热路径提供计数器和直方图，以 Prometheus 文本格式通过本地 HTTP 端点或定期写入的文本文件导出
+Counters and histograms for the monitor's hot paths, exported in the Prometheus text format through
+a localhost HTTP endpoint or a periodically written textfile
+
+HTTP 端点只绑定 127.0.0.1；文本文件原子写入，可供 node_exporter 的 textfile collector 读取。
+The HTTP endpoint only binds 127.0.0.1; the textfile is written atomically for node_exporter's textfile collector.
+"""
+
+import os
+import math
+import threading
+
+# 默认直方图桶（秒），覆盖毫秒级链接到分钟级的大文件写入等待 - Default buckets (s), from ms links to minute-long waits
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+DEFAULT_TEXTFILE_INTERVAL = 15.0
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    """Prometheus 数值格式 - Prometheus number formatting"""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """带标签的指标基类 - Base class for labelled metrics"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    """单调递增计数器 - Monotonic counter"""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """累积桶直方图 - Cumulative-bucket histogram"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数..., 总和, 总数] - [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def _render_samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{plain} {state[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """导出时通过回调取值的指标（队列深度、外部统计） - Metric read through a callback at export time (queue depth, external stats)"""
+
+    def __init__(self, name, help_text, callback, labelnames=(), kind="gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def _render_samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items()) if value is not None]
+
+
+class MetricsRegistry:
+    """指标注册表 - Metric registry"""
+
+    def __init__(self, prefix="wuchang_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self.prefix + name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self.prefix + name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name, help_text, callback, labelnames=()):
+        return self._register(CallbackMetric(self.prefix + name, help_text, callback, labelnames, "gauge"))
+
+    def counter_callback(self, name, help_text, callback, labelnames=()):
+        return self._register(CallbackMetric(self.prefix + name, help_text, callback, labelnames, "counter"))
+
+    def render(self):
+        """生成 Prometheus 文本格式 - Produce the Prometheus text format"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHTTPServer:
+    """本地 /metrics 端点 - Localhost /metrics endpoint"""
+
+    def __init__(self, registry, port, host="127.0.0.1"):
+        self.registry = registry
+        self.port = int(port)
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        # 仅在启用时导入 http.server - http.server is only imported when enabled
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 不向控制台输出访问日志 - No access log on the console
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="pak-metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+class MetricsTextfileWriter:
+    """定期原子写入指标文本文件 - Periodically and atomically write the metrics textfile"""
+
+    def __init__(self, registry, path, interval=DEFAULT_TEXTFILE_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = max(1.0, float(interval))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pak-metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            # 停止时写出最终值 - Write the final values on stop
+            self.write()
+
+    def write(self):
+        temp_file = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(self.registry.render())
+            os.replace(temp_file, self.path)
+        except OSError:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
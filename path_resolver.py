@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路径解析模块 - Path Resolver Module
+游戏、目标（~mods）、游戏设置和存档目录只计算一次，并与计算时使用的配置值一起保存
+Game, target (~mods), game config and save directories are computed once and stored with the
+config values they were derived from
+
+保存配置时调用 refresh()，只有依赖的配置值发生变化的路径才会重新计算；
+不存在的设置和存档目录不缓存，下次调用时重新探测（游戏首次运行后才会创建它们）。
+Call refresh() when the config is saved; only paths whose config values changed are recomputed.
+Missing config and save directories are not cached and are probed again on the next call
+(the game only creates them on its first run).
+"""
+
+import os
+
+EPIC_CODE_NAME = "Project_Plague"
+XBOX_PACKAGE_PATTERN = "505GAMESS.P.A.WuchangPCGP_*"
+
+# 每个路径依赖的配置项 - Config keys each path depends on
+PATH_KEYS = {
+    "game_directory": ("game_directory",),
+    "target_directory": ("game_directory", "target_directory"),
+    "mod_directory": ("game_directory", "target_directory"),
+    "config_directory": (),
+    "save_directories": (),
+}
+
+
+class PathResolver:
+    """带缓存的路径解析器 - Memoizing path resolver"""
+
+    def __init__(self, config, localappdata=None):
+        self.config = config
+        self.localappdata = localappdata or os.path.expandvars("%LOCALAPPDATA%")
+        # 名称 -> (依赖的配置值, 路径) - Name -> (config values it depends on, path)
+        self._cache = {}
+
+    def _inputs(self, name):
+        return tuple(self.config.get(key, '') for key in PATH_KEYS[name])
+
+    def _resolve(self, name, compute, keep=None):
+        """返回缓存的路径，没有时计算；keep 判断结果是否可以缓存 - Return the cached path or compute it; keep decides whether a result is cached"""
+        entry = self._cache.get(name)
+        if entry is not None:
+            return entry[1]
+        inputs = self._inputs(name)
+        value = compute(*inputs)
+        if keep is None or keep(value):
+            self._cache[name] = (inputs, value)
+        return value
+
+    def refresh(self):
+        """丢弃依赖的配置值已变化的路径，返回丢弃的名称 - Drop paths whose config values changed; returns the dropped names"""
+        stale = [name for name, (inputs, _) in self._cache.items() if inputs != self._inputs(name)]
+        for name in stale:
+            del self._cache[name]
+        return stale
+
+    def invalidate(self, *names):
+        """丢弃指定路径，不指定时全部丢弃 - Drop the given paths, or all of them"""
+        if not names:
+            self._cache.clear()
+        for name in names:
+            self._cache.pop(name, None)
+
+    @property
+    def game_directory(self):
+        """被监控的游戏根目录 - The monitored game root directory"""
+        return self._resolve("game_directory", lambda game_dir: game_dir)
+
+    @property
+    def target_directory(self):
+        """链接目标目录（游戏目录 + target_directory） - Link target directory (game directory + target_directory)"""
+        return self._resolve("target_directory", os.path.join)
+
+    def mod_directory(self):
+        """已存在的模组目录（不存在时尝试创建），失败时返回 None - Existing mod directory (created if missing), None on failure"""
+        def compute(game_dir, target_dir):
+            if not game_dir or not target_dir:
+                return None
+            mod_dir = os.path.join(game_dir, target_dir)
+            try:
+                os.makedirs(mod_dir, exist_ok=True)
+            except OSError:
+                pass
+            return mod_dir if os.path.isdir(mod_dir) else None
+        return self._resolve("mod_directory", compute, keep=bool)
+
+    def config_directory(self):
+        """游戏设置目录（Windows 或 Xbox 的 WinGDK），都不存在时返回默认路径 - Game config directory (Windows or Xbox WinGDK); the default path when neither exists"""
+        def compute():
+            saved = os.path.join(self.localappdata, EPIC_CODE_NAME, "Saved", "Config")
+            for platform_dir in ("Windows", "WinGDK"):
+                config_dir = os.path.join(saved, platform_dir)
+                if os.path.exists(config_dir):
+                    return config_dir, True
+            return os.path.join(saved, "Windows"), False
+        return self._resolve("config_directory", compute, keep=lambda value: value[1])[0]
+
+    def save_directories(self):
+        """所有存在的存档目录（Windows 的 Saved 和 Xbox 的 wgs） - Every existing save directory (Windows Saved and Xbox wgs)"""
+        def compute():
+            import glob
+            directories = []
+            save_dir = os.path.join(self.localappdata, EPIC_CODE_NAME, "Saved")
+            if os.path.exists(save_dir):
+                directories.append(save_dir)
+            for xbox_dir in glob.glob(os.path.join(self.localappdata, "Packages", XBOX_PACKAGE_PATTERN)):
+                xbox_save_dir = os.path.join(xbox_dir, "SystemAppData", "wgs")
+                if os.path.exists(xbox_save_dir):
+                    directories.append(xbox_save_dir)
+            return tuple(directories)
+        return list(self._resolve("save_directories", compute, keep=bool))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试策略模块 - Retry Policy Module
+为文件系统操作提供指数退避、随机抖动、总时限和按错误码分类的重试策略
+Exponential backoff, jitter, deadline budgets and per-errno classification for filesystem operations
+
+操作失败且可重试时返回 RetryLater，由工作线程池在到期后继续执行，等待期间不占用工作线程。
+A retryable failure returns RetryLater; the worker pool resumes the operation when it is due,
+so no worker thread sleeps while waiting.
+"""
+
+import errno
+import random
+import threading
+import time
+
+# 默认退避参数（秒） - Default backoff parameters (seconds)
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_DELAY = 0.05
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_DEADLINE = 15.0
+DEFAULT_MULTIPLIER = 2.0
+DEFAULT_JITTER = 0.5
+
+# 文件被占用类错误才值得重试 - Only "file is busy" errors are worth retrying
+RETRYABLE_ERRNOS = frozenset({errno.EBUSY, errno.EAGAIN, getattr(errno, "ETXTBSY", errno.EBUSY)})
+# Windows: 共享冲突、锁冲突、文件被内存映射 - Windows: sharing violation, lock violation, user-mapped file
+RETRYABLE_WINERRORS = frozenset({32, 33, 1224})
+
+
+class RetryLater:
+    """请求稍后继续执行的返回值 - Return value asking for the operation to continue later"""
+
+    __slots__ = ("delay", "fn", "args", "kwargs")
+
+    def __init__(self, delay, fn, *args, **kwargs):
+        self.delay = delay
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def resume(self):
+        """执行后续操作 - Run the continuation"""
+        return self.fn(*self.args, **self.kwargs)
+
+
+def run_inline(fn, *args, **kwargs):
+    """在当前线程执行操作，需要重试时就地等待（无线程池时使用） - Run in the calling thread, sleeping for retries (no pool)"""
+    result = fn(*args, **kwargs)
+    while isinstance(result, RetryLater):
+        time.sleep(result.delay)
+        result = result.resume()
+    return result
+
+
+class RetryStats:
+    """按操作统计的重试计数 - Per-operation retry counters"""
+
+    FIELDS = ("attempts", "retries", "recovered", "exhausted", "fatal")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record(self, operation, field):
+        with self._lock:
+            counters = self._counters.setdefault(operation, dict.fromkeys(self.FIELDS, 0))
+            counters[field] += 1
+
+    def snapshot(self):
+        """返回计数副本 - Return a copy of the counters"""
+        with self._lock:
+            return {operation: dict(counters) for operation, counters in self._counters.items()}
+
+    def totals(self):
+        """所有操作的合计 - Totals across every operation"""
+        totals = dict.fromkeys(self.FIELDS, 0)
+        for counters in self.snapshot().values():
+            for field, value in counters.items():
+                totals[field] += value
+        return totals
+
+
+class RetryPolicy:
+    """指数退避重试策略 - Exponential backoff retry policy"""
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 deadline=DEFAULT_DEADLINE, multiplier=DEFAULT_MULTIPLIER, jitter=DEFAULT_JITTER,
+                 retryable_errnos=RETRYABLE_ERRNOS, retryable_winerrors=RETRYABLE_WINERRORS, stats=None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self.deadline = max(0.0, float(deadline))
+        self.multiplier = max(1.0, float(multiplier))
+        self.jitter = min(1.0, max(0.0, float(jitter)))
+        self.retryable_errnos = frozenset(retryable_errnos)
+        self.retryable_winerrors = frozenset(retryable_winerrors)
+        self.stats = stats if stats is not None else RetryStats()
+
+    def is_retryable(self, error):
+        """判断错误是否为暂时性的文件占用 - Whether the error is a transient "file in use" condition"""
+        if not isinstance(error, OSError):
+            return False
+        winerror = getattr(error, "winerror", None)
+        if winerror is not None:
+            return winerror in self.retryable_winerrors
+        return error.errno in self.retryable_errnos
+
+    def backoff(self, attempt):
+        """第 attempt 次失败后的等待时间（带抖动） - Delay after the given failed attempt, with jitter"""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        # 抖动避免多个文件同时重试 - Jitter keeps many files from retrying in lockstep
+        return delay * (1.0 - self.jitter * random.random())
+
+    def begin(self, operation):
+        """开始一次受策略约束的操作 - Start one operation governed by this policy"""
+        return RetryAttempt(self, operation)
+
+
+class RetryAttempt:
+    """单个操作的重试状态 - Retry state of a single operation"""
+
+    def __init__(self, policy, operation):
+        self.policy = policy
+        self.operation = operation
+        self.attempt = 1
+        self.started = time.monotonic()
+        policy.stats.record(operation, "attempts")
+
+    def succeeded(self):
+        """记录成功 - Record a success"""
+        if self.attempt > 1:
+            self.policy.stats.record(self.operation, "recovered")
+
+    def next_delay(self, error):
+        """失败后决定是否重试：返回等待秒数，放弃时返回 None - Decide whether to retry: seconds to wait, or None to give up"""
+        policy = self.policy
+        if not policy.is_retryable(error):
+            # 不可恢复的错误立即失败 - Fail fast on errors that cannot clear up
+            policy.stats.record(self.operation, "fatal")
+            return None
+
+        delay = policy.backoff(self.attempt)
+        elapsed = time.monotonic() - self.started
+        if self.attempt >= policy.max_attempts or elapsed + delay > policy.deadline:
+            policy.stats.record(self.operation, "exhausted")
+            return None
+
+        self.attempt += 1
+        policy.stats.record(self.operation, "retries")
+        policy.stats.record(self.operation, "attempts")
+        return delay
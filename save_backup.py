@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存档快照模块 - Save Snapshot Module
+存档目录的内容寻址快照库：文件按固定大小分块，块按哈希去重保存，只存储上次快照后变化的内容，压缩在进程池中并行执行
+Content-addressed snapshot store for the save directory: files are split into fixed-size chunks that
+are deduplicated by hash, only content changed since the last snapshot is stored, and compression runs
+on a process pool
+
+每个快照写出一个清单；支持保留策略（最近 N 个、每日、每周）、只写入不同文件的恢复和两个快照之间的比较。
+Each snapshot writes a manifest; the store supports retention (last N, daily, weekly), restores that only
+write differing files, and diffs between any two snapshots.
+"""
+
+import os
+import json
+import time
+import zlib
+import shutil
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+from itertools import repeat
+
+from pak_hasher import DEFAULT_HASH_ALGORITHM
+
+# 分块大小：存档通常原地改写，固定分块即可让未改动的区域去重 - Saves are mostly rewritten in place, so fixed chunks dedupe the untouched regions
+CHUNK_SIZE = 256 * 1024
+# 变化的数据少于此值时在当前进程压缩，启动进程池不划算 - Below this much changed data, compress in-process
+PROCESS_POOL_MIN_BYTES = 4 * 1024 * 1024
+COMPRESS_LEVEL = 6
+READ_SIZE = 1024 * 1024
+# 压缩后仍大于原大小的此比例时按原样保存 - Store a chunk raw when compression saves less than this
+COMPRESS_MIN_RATIO = 0.9
+# 清理时不删除此时间内写入或复用的块，避免与并发的快照冲突 - GC spares chunks written or reused this recently, so concurrent snapshots stay safe
+GC_GRACE_SECONDS = 3600
+
+# 已压缩格式不再压缩 - Already compressed formats are stored as-is
+PRECOMPRESSED_EXTENSIONS = frozenset({
+    ".zip", ".7z", ".rar", ".gz", ".bz2", ".xz", ".zst", ".lz4",
+    ".png", ".jpg", ".jpeg", ".webp", ".ogg", ".mp3", ".mp4", ".pak", ".ucas", ".utoc"
+})
+COMPRESSED_SUFFIX = ".z"
+MANIFEST_VERSION = 2
+
+# 快照结果 - Snapshot result
+BackupResult = namedtuple("BackupResult", ["backup_id", "manifest_path", "files", "changed", "stored_bytes", "elapsed"])
+# 恢复结果；displaced 为移出目标目录的多余文件数 - Restore result; displaced counts extra files moved out of the destination
+RestoreResult = namedtuple("RestoreResult", ["written", "unchanged", "displaced"])
+# 快照差异（均为相对路径列表） - Snapshot difference (lists of relative paths)
+SnapshotDiff = namedtuple("SnapshotDiff", ["added", "removed", "modified"])
+
+
+def object_relpath(hexdigest, compressed):
+    """块在对象目录中的相对路径（使用 / 分隔） - Chunk path relative to the objects directory, with / separators"""
+    return f"{hexdigest[:2]}/{hexdigest}{COMPRESSED_SUFFIX if compressed else ''}"
+
+
+def find_object(objects_dir, hexdigest):
+    """返回已存在块的相对路径，不存在时返回 None - Relative path of an existing chunk, or None"""
+    for compressed in (True, False):
+        relpath = object_relpath(hexdigest, compressed)
+        if os.path.exists(os.path.join(objects_dir, relpath)):
+            return relpath
+    return None
+
+
+def store_chunk(objects_dir, data, algorithm, allow_compress=True):
+    """保存一个块（内容已存在时只刷新修改时间），返回 (相对路径, 新存储字节数)
+    Store one chunk (only its mtime is refreshed when the content exists); returns (relpath, bytes stored)
+    """
+    hexdigest = hashlib.new(algorithm, data).hexdigest()
+    existing = find_object(objects_dir, hexdigest)
+    if existing:
+        try:
+            # 标记为刚被引用，清理时不会删除 - Mark as just referenced so garbage collection leaves it alone
+            os.utime(os.path.join(objects_dir, existing))
+            return existing, 0
+        except FileNotFoundError:
+            pass
+
+    payload, compressed = data, False
+    if allow_compress:
+        packed = zlib.compress(data, COMPRESS_LEVEL)
+        if len(packed) < len(data) * COMPRESS_MIN_RATIO:
+            payload, compressed = packed, True
+    relpath = object_relpath(hexdigest, compressed)
+    object_path = os.path.join(objects_dir, relpath)
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    # 多个进程可能同时写入相同内容，临时名称各不相同，最后原子替换 - Workers may store the same content; unique temp names and an atomic replace
+    temp_path = f"{object_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, object_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return relpath, len(payload)
+
+
+def ingest_file(path, objects_dir, algorithm=DEFAULT_HASH_ALGORITHM):
+    """分块保存文件，返回 (文件哈希, 块列表, 大小, 新存储字节数)；文件已被删除时返回 None
+    Store a file chunk by chunk; returns (file hash, chunk list, size, bytes stored), or None when the file has disappeared
+
+    在进程池的子进程中运行，因此是模块级函数。
+    Runs in process pool workers, hence a module-level function.
+    """
+    allow_compress = os.path.splitext(path)[1].lower() not in PRECOMPRESSED_EXTENSIONS
+    digest = hashlib.new(algorithm)
+    chunks = []
+    size = stored = 0
+    try:
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+                relpath, written = store_chunk(objects_dir, data, algorithm, allow_compress)
+                chunks.append(relpath)
+                size += len(data)
+                stored += written
+    except FileNotFoundError:
+        # 游戏可能在遍历后删除或轮换存档 - The game may delete or rotate saves after the walk
+        return None
+    return digest.hexdigest(), chunks, size, stored
+
+
+def entry_chunks(entry):
+    """清单条目引用的块（兼容保存整文件对象的旧清单） - Chunks a manifest entry references (old manifests hold one whole-file object)"""
+    return entry.get("chunks") or [entry["object"]]
+
+
+class SaveBackupStore:
+    """存档快照库 - Save snapshot store"""
+
+    def __init__(self, root, algorithm=DEFAULT_HASH_ALGORITHM, workers=0, worker_initializer=None):
+        self.root = root
+        self.algorithm = algorithm
+        # 进程池子进程的初始化函数（例如降低 I/O 优先级） - Initializer for process pool workers (e.g. lowering I/O priority)
+        self.worker_initializer = worker_initializer
+        # 0 表示按 CPU 数量 - 0 means one per CPU
+        self.workers = int(workers) or (os.cpu_count() or 1)
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def backup_ids(self):
+        """按时间顺序返回所有快照编号（编号本身按时间排序） - Every snapshot id in chronological order (ids sort by time)"""
+        return sorted(name[:-5] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+
+    def list_backups(self):
+        """按时间顺序返回所有快照清单 - Return every snapshot manifest in chronological order"""
+        manifests = []
+        for backup_id in self.backup_ids():
+            try:
+                manifests.append(self.load_manifest(backup_id))
+            except (OSError, ValueError):
+                # 损坏或正在写入的清单 - Damaged or half-written manifest
+                continue
+        return manifests
+
+    def load_manifest(self, backup_id):
+        """读取一个快照清单 - Load one snapshot manifest"""
+        with open(self._manifest_path(backup_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def latest(self, source_dir=None):
+        """最近一次快照（可按来源目录筛选），只读取需要的清单 - Most recent snapshot, optionally for one source directory; loads only what it needs"""
+        for backup_id in reversed(self.backup_ids()):
+            try:
+                manifest = self.load_manifest(backup_id)
+            except (OSError, ValueError):
+                continue
+            if source_dir is None or os.path.normcase(manifest["source"]) == os.path.normcase(os.path.abspath(source_dir)):
+                return manifest
+        return None
+
+    def backup(self, source_dir, skip=None):
+        """增量快照 source_dir，skip(相对路径) 为真的文件不备份 - Snapshot source_dir incrementally; files where skip(relpath) is true are left out"""
+        started = datetime.now()
+        began = time.perf_counter()
+        source_dir = os.path.abspath(source_dir)
+        previous = self.latest(source_dir)
+        known = {entry["path"]: entry for entry in previous["files"]} if previous else {}
+
+        files, pending = [], []
+        for path, relpath, st in self._walk(source_dir, skip):
+            entry = known.get(relpath)
+            if (entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                    and all(os.path.exists(os.path.join(self.objects_dir, chunk)) for chunk in entry_chunks(entry))):
+                # 大小和修改时间未变，直接沿用上次的块，不读取文件 - Same size and mtime: reuse the previous chunks without reading
+                files.append(dict(entry))
+            else:
+                pending.append((path, relpath, st))
+
+        stored_bytes = 0
+        for (path, relpath, st), ingested in zip(pending, self._ingest([p[0] for p in pending])):
+            if ingested is None:
+                continue
+            hexdigest, chunks, size, stored = ingested
+            files.append({"path": relpath, "size": size, "mtime_ns": st.st_mtime_ns, "hash": hexdigest, "chunks": chunks})
+            stored_bytes += stored
+        files.sort(key=lambda entry: entry["path"])
+
+        backup_id = self._new_backup_id(started)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "id": backup_id,
+            "created": started.isoformat(),
+            "source": source_dir,
+            "algorithm": self.algorithm,
+            "files": files,
+            "stats": {"files": len(files), "changed": len(pending), "stored_bytes": stored_bytes}
+        }
+        manifest_path = self._manifest_path(backup_id)
+        self._write_json(manifest_path, manifest)
+        return BackupResult(backup_id, manifest_path, len(files), len(pending), stored_bytes, time.perf_counter() - began)
+
+    def restore(self, backup_id, destination=None, skip=None, keep_extra=False):
+        """恢复快照到 destination（默认原目录），只写入与快照不同的文件
+        Restore a snapshot into destination (the original directory by default), writing only files that differ
+
+        快照中没有的文件移到快照库的 displaced 目录，恢复后的目录与快照一致；skip(相对路径) 为真的文件
+        （与备份时相同的跳过规则）保留不动，keep_extra 为真时不移动任何多余文件。
+        Files absent from the snapshot are moved into the store's displaced directory so the result matches
+        the snapshot; files where skip(relpath) is true (the backup's skip rules) stay put, and keep_extra
+        leaves every extra file in place.
+        """
+        manifest = self.load_manifest(backup_id)
+        destination = destination or manifest["source"]
+        algorithm = manifest.get("algorithm", self.algorithm)
+        written = unchanged = 0
+        for entry in manifest["files"]:
+            target = os.path.join(destination, *entry["path"].split("/"))
+            if self._matches(target, entry, algorithm):
+                unchanged += 1
+                continue
+            self._restore_file(entry, target, algorithm)
+            written += 1
+        displaced = 0 if keep_extra else self._displace_extra(backup_id, manifest, destination, skip)
+        return RestoreResult(written, unchanged, displaced)
+
+    def diff(self, old_id, new_id):
+        """比较两个快照（只读取清单） - Compare two snapshots (manifests only)"""
+        old = {entry["path"]: entry["hash"] for entry in self.load_manifest(old_id)["files"]}
+        new = {entry["path"]: entry["hash"] for entry in self.load_manifest(new_id)["files"]}
+        return SnapshotDiff(
+            sorted(path for path in new if path not in old),
+            sorted(path for path in old if path not in new),
+            sorted(path for path in new if path in old and new[path] != old[path])
+        )
+
+    def prune(self, keep_last=0, keep_daily=0, keep_weekly=0):
+        """按保留策略删除快照并回收不再引用的块，返回删除的快照编号；规则全为 0 时不删除
+        Delete snapshots outside the retention policy and collect unreferenced chunks; returns the deleted ids.
+        Nothing is deleted when every rule is 0.
+
+        策略按来源目录分别应用（Saved 和 wgs 共用一个备份库），读取失败的清单不会被删除。
+        The policy applies to each source directory separately (Saved and wgs share one store);
+        manifests that cannot be read are never deleted.
+        """
+        if not (keep_last or keep_daily or keep_weekly):
+            return []
+        by_source = {}
+        for manifest in self.list_backups():
+            by_source.setdefault(os.path.normcase(manifest["source"]), []).append(manifest["id"])
+        removed = []
+        for ids in by_source.values():
+            keep = self.retained(ids, keep_last, keep_daily, keep_weekly)
+            removed.extend(backup_id for backup_id in ids if backup_id not in keep)
+        removed.sort()
+        for backup_id in removed:
+            try:
+                os.remove(self._manifest_path(backup_id))
+            except FileNotFoundError:
+                pass
+        if removed:
+            self.collect_garbage()
+        return removed
+
+    @staticmethod
+    def retained(ids, keep_last=0, keep_daily=0, keep_weekly=0):
+        """保留策略选中的快照编号：最近 N 个，加上最近若干天/周里每天/每周最新的一个；最新的快照总是保留
+        Ids the policy keeps: the newest N, plus the newest of each of the most recent days / ISO weeks;
+        the newest snapshot is always kept
+        """
+        newest_first = sorted(ids, reverse=True)
+        keep = set(newest_first[:max(1, keep_last)])
+        for count, period in ((keep_daily, "%Y%m%d"), (keep_weekly, "%G-W%V")):
+            seen = set()
+            for backup_id in newest_first:
+                if len(seen) >= count:
+                    break
+                try:
+                    key = datetime.strptime(backup_id[:15], "%Y%m%d_%H%M%S").strftime(period)
+                except ValueError:
+                    continue
+                if key not in seen:
+                    seen.add(key)
+                    keep.add(backup_id)
+        return keep
+
+    def collect_garbage(self):
+        """删除没有被任何清单引用的块，返回释放的字节数 - Delete chunks no manifest references; returns the bytes freed"""
+        referenced = set()
+        for manifest in self.list_backups():
+            for entry in manifest["files"]:
+                referenced.update(entry_chunks(entry))
+        cutoff = time.time() - GC_GRACE_SECONDS
+        freed = 0
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if f"{prefix}/{name}" in referenced:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                    if st.st_mtime >= cutoff:
+                        continue
+                    os.remove(path)
+                    freed += st.st_size
+                except OSError:
+                    continue
+        return freed
+
+    def _matches(self, target, entry, algorithm):
+        """目标文件是否已与快照中的文件相同 - Whether the target file already equals the snapshot's file"""
+        try:
+            st = os.stat(target)
+        except OSError:
+            return False
+        if st.st_size != entry["size"]:
+            return False
+        if st.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        # 只有修改时间不同时比较内容 - Compare content when only the mtime differs
+        digest = hashlib.new(algorithm)
+        try:
+            with open(target, "rb") as f:
+                while True:
+                    data = f.read(READ_SIZE)
+                    if not data:
+                        break
+                    digest.update(data)
+        except OSError:
+            return False
+        return digest.hexdigest() == entry["hash"]
+
+    def _restore_file(self, entry, target, algorithm):
+        """由块拼接恢复单个文件（写入临时文件并校验哈希后原子替换） - Rebuild one file from its chunks (temp file, hash check, atomic replace)"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest = hashlib.new(algorithm)
+        temp_path = f"{target}.{os.getpid()}.restore.tmp"
+        try:
+            with open(temp_path, "wb") as dst:
+                for chunk in entry_chunks(entry):
+                    with open(os.path.join(self.objects_dir, chunk), "rb") as src:
+                        data = src.read()
+                    if chunk.endswith(COMPRESSED_SUFFIX):
+                        data = zlib.decompress(data)
+                    digest.update(data)
+                    dst.write(data)
+            if digest.hexdigest() != entry["hash"]:
+                raise ValueError(f"snapshot data is damaged: {entry['path']}")
+            os.replace(temp_path, target)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        os.utime(target, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+    def _displace_extra(self, backup_id, manifest, destination, skip):
+        """把快照中没有的文件移出目标目录，返回移动的文件数 - Move files absent from the snapshot out of the destination; returns the count"""
+        listed = {os.path.normcase(entry["path"]) for entry in manifest["files"]}
+        extra = [(path, relpath) for path, relpath, _ in self._walk(destination, skip)
+                 if os.path.normcase(relpath) not in listed]
+        if not extra:
+            return 0
+        # 移到快照库而不是直接删除，误恢复时仍可找回 - Moved into the store rather than deleted, so a mistaken restore can be undone
+        displaced_dir = os.path.join(self.root, "displaced", f"{backup_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        parents = set()
+        for path, relpath in extra:
+            target = os.path.join(displaced_dir, *relpath.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+            parents.add(os.path.dirname(path))
+        # 清理因此变空的目录（不包括目标目录本身） - Remove directories left empty (never the destination itself)
+        root = os.path.normcase(os.path.abspath(destination))
+        for directory in sorted(parents, key=len, reverse=True):
+            while os.path.normcase(os.path.abspath(directory)) != root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+        return len(extra)
+
+    def _walk(self, source_dir, skip):
+        """遍历来源目录（跳过位于其中的快照库） - Walk the source directory, skipping the store if it lives inside"""
+        store_root = os.path.normcase(os.path.abspath(self.root))
+        for root, dirs, names in os.walk(source_dir):
+            dirs[:] = [d for d in dirs if os.path.normcase(os.path.abspath(os.path.join(root, d))) != store_root]
+            for name in names:
+                path = os.path.join(root, name)
+                relpath = os.path.relpath(path, source_dir).replace(os.sep, "/")
+                if skip and skip(relpath):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, relpath, st
+
+    def _ingest(self, paths):
+        """存入变化的文件；数据量足够大时使用进程池 - Store the changed files, on a process pool when there is enough data"""
+        if not paths:
+            return []
+        total = 0
+        for path in paths:
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        workers = min(self.workers, len(paths))
+        if workers > 1 and total >= PROCESS_POOL_MIN_BYTES:
+            # 只在需要时导入，启动器启动时不加载 multiprocessing - Imported on demand so startup does not load multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=self.worker_initializer) as pool:
+                return list(pool.map(ingest_file, paths, repeat(self.objects_dir), repeat(self.algorithm),
+                                     chunksize=max(1, len(paths) // (workers * 4))))
+        return [ingest_file(path, self.objects_dir, self.algorithm) for path in paths]
+
+    def _new_backup_id(self, created):
+        """生成唯一的快照编号（精确到微秒，冲突时追加序号） - Unique snapshot id (microseconds, with a suffix on collision)"""
+        base = created.strftime("%Y%m%d_%H%M%S_%f")
+        backup_id, counter = base, 1
+        while os.path.exists(self._manifest_path(backup_id)):
+            backup_id = f"{base}_{counter}"
+            counter += 1
+        return backup_id
+
+    def _manifest_path(self, backup_id):
+        return os.path.join(self.manifests_dir, f"{backup_id}.json")
+
+    @staticmethod
+    def _write_json(path, data):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
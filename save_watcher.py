@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存档监控模块 - Save Watcher Module
+监控存档目录，存档文件在静默窗口内不再变化后自动创建快照；备份线程以低 I/O 优先级运行，不与游戏写入争抢磁盘
+Watches the save directories and takes a snapshot once the save files have been quiet for a settle
+window; the backup thread runs at low I/O priority so it never competes with the game's own writes
+
+事件处理器挂在启动器已有的 watchdog Observer 上，不另外启动进程。
+The event handler is scheduled on the launcher's existing watchdog Observer; no extra process is started.
+"""
+
+import os
+import sys
+import time
+import threading
+
+DEFAULT_SETTLE = 60.0
+
+# 触发备份的事件类型；读取文件产生的 opened/closed_no_write 会被忽略（否则备份自身会再次触发备份）
+# Event types that trigger a backup; opened/closed_no_write come from reads (including the backup itself) and are ignored
+TRIGGER_EVENTS = frozenset({"created", "modified", "deleted", "moved", "closed"})
+# 游戏运行时不断写入、与存档无关的目录 - Directories the game writes constantly that are not saves
+IGNORED_TOP_DIRS = ("logs", "crashes", "webcache")
+
+
+def lower_io_priority(whole_process=False):
+    """将当前线程（whole_process 为真时为整个进程）的 I/O 优先级降到最低，成功时返回 True
+    Drop the calling thread's (with whole_process, the whole process's) I/O priority; returns True on success
+    """
+    try:
+        import ctypes
+        if os.name == 'nt':
+            kernel32 = ctypes.windll.kernel32
+            if whole_process:
+                # PROCESS_MODE_BACKGROUND_BEGIN：子进程不会继承线程级的后台模式 - Child processes do not inherit the thread-level mode
+                return bool(kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x00100000))
+            # THREAD_MODE_BACKGROUND_BEGIN 同时降低 I/O 和内存优先级 - Lowers both I/O and memory priority
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 0x00010000))
+        if sys.platform.startswith('linux'):
+            import platform
+            # ioprio_set 的系统调用号 - ioprio_set syscall numbers
+            syscall_numbers = {"x86_64": 251, "aarch64": 30, "i386": 289, "i686": 289}
+            number = syscall_numbers.get(platform.machine())
+            if number is None:
+                return False
+            IOPRIO_WHO_PROCESS, IOPRIO_CLASS_IDLE, IOPRIO_CLASS_SHIFT = 1, 3, 13
+            libc = ctypes.CDLL(None, use_errno=True)
+            # IOPRIO_WHO_PROCESS 传入线程 ID 时只影响该线程，之后创建的线程继承创建者的优先级
+            # IOPRIO_WHO_PROCESS with a thread id affects only that thread; threads created later inherit their creator's priority
+            thread_ids = [threading.get_native_id()]
+            if whole_process:
+                # 逐个设置已存在的线程 - Set every thread that already exists
+                try:
+                    thread_ids = [int(tid) for tid in os.listdir('/proc/self/task')]
+                except OSError:
+                    pass
+            results = [libc.syscall(number, IOPRIO_WHO_PROCESS, tid, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+                       for tid in thread_ids]
+            return all(results)
+        if sys.platform == 'darwin':
+            IOPOL_TYPE_DISK, IOPOL_SCOPE_PROCESS, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE = 0, 0, 1, 3
+            libc = ctypes.CDLL(None)
+            scope = IOPOL_SCOPE_PROCESS if whole_process else IOPOL_SCOPE_THREAD
+            return libc.setiopolicy_np(IOPOL_TYPE_DISK, scope, IOPOL_THROTTLE) == 0
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+def lower_process_io_priority():
+    """进程池初始化函数：降低备份子进程的 I/O 优先级 - Process pool initializer that lowers a backup worker's I/O priority"""
+    return lower_io_priority(whole_process=True)
+
+
+class SaveBackupScheduler:
+    """存档静默后执行备份的调度器 - Runs a backup once a save directory has gone quiet"""
+
+    def __init__(self, run_backup, settle=DEFAULT_SETTLE, name="save-backup"):
+        self.run_backup = run_backup
+        self.settle = max(1.0, float(settle))
+        self.name = name
+        self._cond = threading.Condition()
+        # 目录 -> 最后一次事件时间 - Directory -> time of its last event
+        self._pending = {}
+        self._running = False
+        self._flush_on_stop = False
+        self._thread = None
+        self.backups = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def notify(self, source_dir):
+        """记录一次变化，重新开始该目录的静默窗口 - Record a change and restart the directory's settle window"""
+        with self._cond:
+            self._pending[source_dir] = time.monotonic()
+            self._cond.notify()
+
+    def pending_count(self):
+        """等待备份的目录数 - Number of directories waiting for a backup"""
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self, flush=True):
+        """停止调度；flush 为真时先在调度线程（低 I/O 优先级）中备份仍在等待的目录
+        Stop; with flush, directories still waiting are backed up first, on the low-priority scheduler thread
+        """
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._flush_on_stop = flush
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self):
+        lower_io_priority()
+        while True:
+            with self._cond:
+                due = self._wait_for_due()
+                if due is None:
+                    return
+            for source_dir in due:
+                self._run(source_dir)
+
+    def _wait_for_due(self):
+        """等待至少一个目录静默（持有锁调用）；停止时返回需要补做的目录或 None - Wait until a directory has settled (lock held); on stop, the directories to flush or None"""
+        while self._running:
+            now = time.monotonic()
+            due = [d for d, last in self._pending.items() if now - last >= self.settle]
+            if due:
+                for source_dir in due:
+                    del self._pending[source_dir]
+                return due
+            if self._pending:
+                self._cond.wait(min(last for last in self._pending.values()) + self.settle - now)
+            else:
+                self._cond.wait()
+        # 停止时交出仍在等待的目录，下一轮循环结束线程 - On stop, hand over the directories still waiting; the next round ends the thread
+        remaining, self._pending = list(self._pending), {}
+        if self._flush_on_stop and remaining:
+            self._flush_on_stop = False
+            return remaining
+        return None
+
+    def _run(self, source_dir):
+        try:
+            self.run_backup(source_dir)
+            self.backups += 1
+        except Exception:
+            # 失败由回调自行报告，调度继续 - The callback reports failures; scheduling carries on
+            pass
+
+
+class SaveDirectoryHandler:
+    """存档目录事件处理器（实现 watchdog 的 dispatch 接口） - Save directory event handler (implements watchdog's dispatch)"""
+
+    def __init__(self, scheduler, source_dir):
+        self.scheduler = scheduler
+        self.source_dir = source_dir
+
+    def dispatch(self, event):
+        if event.is_directory or event.event_type not in TRIGGER_EVENTS:
+            return
+        paths = [event.src_path]
+        if getattr(event, "dest_path", ""):
+            paths.append(event.dest_path)
+        if any(not self._ignored(path) for path in paths):
+            self.scheduler.notify(self.source_dir)
+
+    def _ignored(self, path):
+        """日志、崩溃报告、浏览器缓存和临时文件不触发备份 - Logs, crash reports, web caches and temp files do not trigger backups"""
+        relpath = os.path.relpath(os.fsdecode(path), self.source_dir)
+        top = relpath.split(os.sep, 1)[0].lower()
+        return top.startswith(IGNORED_TOP_DIRS) or relpath.endswith(".tmp")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动计时模块 - Startup Profiling Module
+记录启动各阶段（导入、配置、管理器、首屏）的耗时，使用 --profile-startup 时输出分阶段明细
+Records how long each startup phase (imports, config, manager, first screen) takes and prints a
+phase-by-phase breakdown when --profile-startup is given
+
+本模块应最先导入，计时起点为其导入时刻。
+Import this module first; timing starts when it is imported.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """启动阶段计时器 - Startup phase timer"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.enabled = False
+        self.reported = False
+        # (阶段, 本阶段耗时, 累计耗时) - (phase, phase duration, elapsed since start)
+        self.phases = []
+        # 阶段内单独计时的部分 - Sections timed inside phases
+        self.sections = {}
+
+    def mark(self, phase):
+        """结束当前阶段 - Close the current phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.start))
+        self.last = now
+
+    @contextmanager
+    def section(self, name):
+        """累计某一部分的耗时（例如按需加载的翻译） - Accumulate the time spent in one part (e.g. lazily loaded translations)"""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - began
+
+    def report(self, final_phase=None, stream=None):
+        """输出一次分阶段明细（未启用时不输出） - Print the breakdown once (nothing when disabled)"""
+        if self.reported:
+            return
+        self.reported = True
+        if final_phase:
+            self.mark(final_phase)
+        if not self.enabled:
+            return
+        stream = stream or sys.stderr
+        print("startup profile:", file=stream)
+        for phase, duration, elapsed in self.phases:
+            print(f"  {phase:<16} {duration * 1000:8.1f} ms  (total {elapsed * 1000:8.1f} ms)", file=stream)
+        for name, duration in sorted(self.sections.items()):
+            print(f"  - {name:<14} {duration * 1000:8.1f} ms", file=stream)
+
+
+# 进程内共享的计时器 - Process-wide profiler
+STARTUP_PROFILER = StartupProfiler()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏安装检测测试 - Game Install Discovery Tests
+使用 tests/fixtures/game_discovery 中的小型 Steam / Epic 清单目录树，不需要安装游戏或启动器
+Uses the small Steam / Epic manifest trees in tests/fixtures/game_discovery; no game or launcher install needed
+
+清单中的 {ROOT} 在复制到临时目录时替换为该目录的路径。
+{ROOT} in the manifests is replaced with the temp directory's path when the tree is copied there.
+
+用法 - Usage:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from game_discovery import GameDiscovery, GameInstall, STEAM_APP_ID, STEAM_INSTALL_DIR, parse_vdf
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "game_discovery")
+
+
+class FixtureTreeTestCase(unittest.TestCase):
+    """把清单目录树复制到临时目录 - Copies the manifest tree into a temp directory"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="game_discovery_")
+        self.root = os.path.join(self.temp_dir, "tree")
+        shutil.copytree(FIXTURE_DIR, self.root)
+        # 正斜杠在 VDF 和 JSON 中都不需要转义 - Forward slashes need no escaping in VDF or JSON
+        root = self.root.replace("\\", "/")
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith((".vdf", ".acf", ".item")):
+                    path = os.path.join(directory, name)
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(text.replace("{ROOT}", root))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def discovery(self, steam=True, epic=True, cache_file=None):
+        return GameDiscovery(cache_file,
+                             steam_roots=[self.path("steam")] if steam else [],
+                             epic_manifest_dirs=[self.path("epic", "Manifests")] if epic else [])
+
+    @staticmethod
+    def normalized(installs):
+        return [(install.store, os.path.normcase(os.path.normpath(install.path))) for install in installs]
+
+
+class ParseVdfTests(unittest.TestCase):
+
+    def test_nested_sections_and_lowercase_keys(self):
+        data = parse_vdf('"AppState"\n{\n\t"appid"\t"1"\n\t"InstallDir"\t"Game"\n\t"Depots" { "2" { "size" "10" } }\n}\n')
+        self.assertEqual(data, {"appstate": {"appid": "1", "installdir": "Game", "depots": {"2": {"size": "10"}}}})
+
+    def test_escapes_comments_and_bare_tokens(self):
+        data = parse_vdf('// header comment\n"root"\n{\n\t"path"\t"D:\\\\Steam \\"Library\\""\n\tflag 1\n}\n')
+        self.assertEqual(data, {"root": {"path": 'D:\\Steam "Library"', "flag": "1"}})
+
+    def test_unbalanced_braces_do_not_raise(self):
+        self.assertEqual(parse_vdf('"a" { "b" "c" } } }'), {"a": {"b": "c"}})
+        self.assertEqual(parse_vdf('"a" { "b" "c"'), {"a": {"b": "c"}})
+
+
+class SteamDiscoveryTests(FixtureTreeTestCase):
+
+    def test_finds_install_in_secondary_library(self):
+        installs = self.discovery(epic=False).discover()
+        self.assertEqual(self.normalized(installs),
+                         self.normalized([GameInstall("steam", self.path("library", "steamapps", "common", STEAM_INSTALL_DIR), None)]))
+        self.assertEqual(installs[0].manifest, self.path("library", "steamapps", f"appmanifest_{STEAM_APP_ID}.acf"))
+
+    def test_old_library_format(self):
+        root = self.root.replace("\\", "/")
+        with open(self.path("steam", "steamapps", "libraryfolders.vdf"), "w", encoding="utf-8") as f:
+            f.write(f'"LibraryFolders"\n{{\n\t"TimeNextStatsReport"\t"1700000000"\n\t"1"\t"{root}/library"\n}}\n')
+        installs = self.discovery(epic=False).discover()
+        self.assertEqual([install.store for install in installs], ["steam"])
+        self.assertEqual(os.path.normpath(installs[0].path), self.path("library", "steamapps", "common", STEAM_INSTALL_DIR))
+
+    def test_install_dir_comes_from_the_manifest(self):
+        os.rename(self.path("library", "steamapps", "common", STEAM_INSTALL_DIR), self.path("library", "steamapps", "common", "Wuchang"))
+        manifest = self.path("library", "steamapps", f"appmanifest_{STEAM_APP_ID}.acf")
+        with open(manifest, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(text.replace(f'"installdir"\t\t"{STEAM_INSTALL_DIR}"', '"installdir"\t\t"Wuchang"'))
+        installs = self.discovery(epic=False).discover()
+        self.assertEqual(os.path.normpath(installs[0].path), self.path("library", "steamapps", "common", "Wuchang"))
+
+    def test_default_folder_without_manifest(self):
+        os.remove(self.path("library", "steamapps", f"appmanifest_{STEAM_APP_ID}.acf"))
+        installs = self.discovery(epic=False).discover()
+        self.assertEqual(len(installs), 1)
+        self.assertIsNone(installs[0].manifest)
+
+    def test_manifest_without_game_folder_is_ignored(self):
+        shutil.rmtree(self.path("library", "steamapps", "common", STEAM_INSTALL_DIR))
+        self.assertEqual(self.discovery(epic=False).discover(), [])
+
+    def test_missing_steam_root(self):
+        discovery = GameDiscovery(None, steam_roots=[self.path("missing")], epic_manifest_dirs=[])
+        self.assertEqual(discovery.discover(), [])
+
+
+class EpicDiscoveryTests(FixtureTreeTestCase):
+
+    def test_finds_matching_item_only(self):
+        installs = self.discovery(steam=False).discover()
+        self.assertEqual(self.normalized(installs),
+                         self.normalized([GameInstall("epic", self.path("epic_games", "WuchangFallenFeathers"), None)]))
+        self.assertEqual(installs[0].manifest, self.path("epic", "Manifests", "wuchang.item"))
+
+    def test_missing_install_location_is_ignored(self):
+        shutil.rmtree(self.path("epic_games", "WuchangFallenFeathers"))
+        self.assertEqual(self.discovery(steam=False).discover(), [])
+
+    def test_damaged_item_is_skipped(self):
+        with open(self.path("epic", "Manifests", "broken.item"), "w", encoding="utf-8") as f:
+            f.write('{"DisplayName": "WUCHANG", "InstallLocation": ')
+        self.assertEqual([install.store for install in self.discovery(steam=False).discover()], ["epic"])
+
+
+class DiscoveryCacheTests(FixtureTreeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_file = os.path.join(self.temp_dir, "game_discovery_cache.json")
+
+    def test_both_stores_and_duplicates(self):
+        # Epic 清单指向与 Steam 相同的目录时只保留一次 - An Epic item pointing at the Steam folder is kept once
+        root = self.root.replace("\\", "/")
+        with open(self.path("epic", "Manifests", "copy.item"), "w", encoding="utf-8") as f:
+            f.write('{"DisplayName": "WUCHANG: Fallen Feathers", '
+                    f'"InstallLocation": "{root}/library/steamapps/common/{STEAM_INSTALL_DIR}"}}')
+        installs = self.discovery().discover()
+        self.assertEqual([install.store for install in installs], ["steam", "epic"])
+
+    def test_unchanged_manifests_are_served_from_the_cache(self):
+        first = self.discovery(cache_file=self.cache_file).discover()
+        self.assertTrue(os.path.exists(self.cache_file))
+        # 缓存命中时不检查游戏目录 - A cache hit does not look at the game folders
+        shutil.rmtree(self.path("epic_games", "WuchangFallenFeathers"))
+        self.assertEqual(self.discovery(cache_file=self.cache_file).discover(), first)
+        self.assertEqual(len(self.discovery(cache_file=self.cache_file).discover(refresh=True)), 1)
+
+    def test_changed_manifest_invalidates_the_cache(self):
+        self.discovery(cache_file=self.cache_file).discover()
+        shutil.rmtree(self.path("library", "steamapps", "common", STEAM_INSTALL_DIR))
+        manifest = self.path("library", "steamapps", f"appmanifest_{STEAM_APP_ID}.acf")
+        later = time.time() + 10
+        os.utime(manifest, (later, later))
+        self.assertEqual([install.store for install in self.discovery(cache_file=self.cache_file).discover()], ["epic"])
+
+    def test_added_epic_item_invalidates_the_cache(self):
+        self.discovery(steam=False, cache_file=self.cache_file).discover()
+        os.remove(self.path("epic", "Manifests", "wuchang.item"))
+        later = time.time() + 10
+        os.utime(self.path("epic", "Manifests"), (later, later))
+        self.assertEqual(self.discovery(steam=False, cache_file=self.cache_file).discover(), [])
+
+    def test_different_roots_ignore_the_cache(self):
+        self.discovery(cache_file=self.cache_file).discover()
+        self.assertEqual(self.discovery(steam=False, cache_file=self.cache_file).discover(),
+                         self.discovery(steam=False).discover())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入完成检测模块 - Write Completion Detection Module
+根据文件事件以及大小/修改时间的稳定性判断文件是否已写入完成
+Decides a file has finished being written from its events and the stability of its size and mtime
+
+静置窗口随文件大小和观测到的写入速率自适应：小文件几乎立即就绪，大文件只在最后一次写入后就绪一次。
+平台提供关闭事件（Linux inotify）时，以写入方关闭文件作为完成信号。
+The settle window adapts to file size and observed write rate: small files are ready almost at once,
+large ones become ready exactly once after their final write. Where the platform reports close events
+(Linux inotify), the writer closing the file is taken as the completion signal.
+"""
+
+import os
+import time
+import threading
+
+# 静置窗口范围（秒） - Settle window bounds (seconds)
+DEFAULT_MIN_SETTLE = 0.05
+DEFAULT_MAX_SETTLE = 5.0
+# 放弃等待前的最长时间（秒） - Longest total wait before giving up (seconds)
+DEFAULT_READY_TIMEOUT = 1800.0
+# 每增加这么多字节，静置窗口增加一个最小窗口 - Each step of this many bytes adds one minimum window
+SIZE_STEP = 256 * 1024 * 1024
+# 写入间隔的平滑系数 - Smoothing factor for observed write gaps
+GAP_SMOOTHING = 0.3
+# 假定写入者每次刷新的数据量，用于由写入速率推算停顿 - Assumed bytes per writer flush, used to turn a write rate into a pause
+WRITE_FLUSH_BYTES = 1024 * 1024
+
+
+class _WriteTrack:
+    """单个文件的写入跟踪状态 - Write tracking state for one file"""
+
+    def __init__(self, now, directory=""):
+        self.directory = directory
+        self.last_activity = now
+        self.last_size = -1
+        self.last_mtime_ns = -1
+        self.last_sample = now
+        self.gap_estimate = 0.0
+        self.write_rate = 0.0
+        self.events = 0
+        self.closed = False
+        self.closed_size = -1
+        self.claimed = False
+
+
+class WriteQuiescenceDetector:
+    """写入静止检测器 - Write quiescence detector"""
+
+    def __init__(self, min_settle=DEFAULT_MIN_SETTLE, max_settle=DEFAULT_MAX_SETTLE, timeout=DEFAULT_READY_TIMEOUT,
+                 close_events=False):
+        self.min_settle = max(0.0, float(min_settle))
+        self.max_settle = max(self.min_settle, float(max_settle))
+        self.timeout = timeout
+        # 事件源是否会报告写入方关闭文件 - Whether the event source reports writers closing files
+        self.close_events = close_events
+        # 轮询监控的目录收不到关闭事件 - Directories watched by polling get no close events
+        self._no_close_dirs = set()
+        self._tracks = {}
+        self._cond = threading.Condition()
+
+    def begin(self, path):
+        """开始跟踪文件，返回 False 表示该文件已有等待中的任务 - Start tracking; False means a wait is already pending"""
+        key = os.path.normcase(path)
+        with self._cond:
+            if key in self._tracks:
+                self._note(self._tracks[key])
+                return False
+            self._tracks[key] = _WriteTrack(time.monotonic(), self._dir_key(path))
+            return True
+
+    @staticmethod
+    def _dir_key(path):
+        return os.path.normcase(os.path.normpath(os.path.dirname(os.path.abspath(path))))
+
+    def set_close_events(self, directory, enabled):
+        """设置目录的事件源是否报告关闭事件（改为轮询时关闭） - Set whether a directory's event source reports close events (off once it is polled)"""
+        key = os.path.normcase(os.path.normpath(os.path.abspath(directory)))
+        with self._cond:
+            if enabled:
+                self._no_close_dirs.discard(key)
+            else:
+                self._no_close_dirs.add(key)
+            self._cond.notify_all()
+
+    def claim(self, path):
+        """为文件认领等待任务，每个跟踪状态只能认领一次 - Claim the wait for a path; each track can be claimed once"""
+        key = os.path.normcase(path)
+        with self._cond:
+            track = self._tracks.get(key)
+            if track is None:
+                track = _WriteTrack(time.monotonic(), self._dir_key(path))
+                self._tracks[key] = track
+            if track.claimed:
+                return False
+            track.claimed = True
+            return True
+
+    def note_event(self, path):
+        """记录写入事件（on_modified），返回该文件是否正在跟踪 - Record a write event; returns whether the path is tracked"""
+        key = os.path.normcase(path)
+        with self._cond:
+            track = self._tracks.get(key)
+            if track is None:
+                return False
+            self._note(track)
+            return True
+
+    def note_closed(self, path):
+        """记录写入方关闭文件（on_closed） - Record that the writer closed the file (on_closed)"""
+        key = os.path.normcase(path)
+        try:
+            closed_size = os.stat(path).st_size
+        except OSError:
+            closed_size = -1
+        with self._cond:
+            track = self._tracks.get(key)
+            if track is None:
+                return False
+            track.closed = True
+            track.closed_size = closed_size
+            self._note(track)
+            return True
+
+    def discard(self, path):
+        """停止跟踪文件（文件被删除时） - Stop tracking a path (when the file is deleted)"""
+        with self._cond:
+            self._tracks.pop(os.path.normcase(path), None)
+            self._cond.notify_all()
+
+    def finish(self, path, track=None):
+        """结束跟踪，仅移除本次任务对应的状态 - Finish tracking, only removing the state owned by this wait"""
+        key = os.path.normcase(path)
+        with self._cond:
+            if track is None or self._tracks.get(key) is track:
+                self._tracks.pop(key, None)
+
+    def pending_count(self):
+        """正在等待写入完成的文件数 - Number of files waiting for their writes to finish"""
+        with self._cond:
+            return len(self._tracks)
+
+    def settle_window(self, track, size):
+        """计算文件的静置窗口 - Compute the settle window for a file"""
+        if track.closed:
+            # 写入方已关闭文件，只需确认没有新的写入 - The writer closed the file; only confirm no further writes
+            return self.min_settle
+        if self.close_events and track.directory not in self._no_close_dirs:
+            # 能收到关闭事件时，未关闭的文件按仍在写入处理 - With close events available, an unclosed file is still being written
+            return self.max_settle
+        window = self.min_settle * (1 + size / SIZE_STEP)
+        # 写入者两次写入之间的停顿必须被窗口覆盖 - The window must cover the writer's pauses between writes
+        window = max(window, 2 * track.gap_estimate)
+        # 慢速写入者两次刷新之间间隔更长 - Slow writers leave longer pauses between flushes
+        if track.write_rate > 0:
+            window = max(window, WRITE_FLUSH_BYTES / track.write_rate)
+        return min(window, self.max_settle)
+
+    def wait_until_ready(self, path):
+        """阻塞直到文件写入完成，返回 (是否就绪, 跟踪状态) - Block until the file is written; returns (ready, track)
+
+        文件被删除或等待超时时返回 False。
+        Returns False when the file is deleted or the wait times out.
+        """
+        key = os.path.normcase(path)
+        with self._cond:
+            track = self._tracks.get(key)
+            if track is None:
+                track = _WriteTrack(time.monotonic(), self._dir_key(path))
+                self._tracks[key] = track
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False, track
+
+            now = time.monotonic()
+            with self._cond:
+                if self._tracks.get(key) is not track:
+                    # 等待期间文件被删除 - The file was deleted while waiting
+                    return False, track
+                if track.closed and st.st_size != track.closed_size:
+                    # 关闭后大小又变化，说明文件被重新打开写入 - A size change after close means the file was reopened
+                    track.closed = False
+                if (st.st_size, st.st_mtime_ns) != (track.last_size, track.last_mtime_ns):
+                    if track.last_size >= 0:
+                        elapsed = now - track.last_sample
+                        if elapsed > 0 and st.st_size > track.last_size:
+                            track.write_rate = (st.st_size - track.last_size) / elapsed
+                        self._note(track, now)
+                    track.last_size = st.st_size
+                    track.last_mtime_ns = st.st_mtime_ns
+                    track.last_sample = now
+
+                window = self.settle_window(track, st.st_size)
+                # 首次检查时以文件自身的修改时间衡量静止时长 - On the first check, measure quiet time from the file's own mtime
+                mtime_age = max(0.0, time.time() - st.st_mtime_ns / 1e9)
+                quiet_for = min(now - track.last_activity, mtime_age) if track.events else mtime_age
+
+                if quiet_for < window:
+                    if now >= deadline:
+                        return False, track
+                    # 新事件到来时提前唤醒重新计算 - New events wake us early to re-evaluate
+                    self._cond.wait(min(window - quiet_for, deadline - now))
+                    continue
+
+            if self._is_readable(path):
+                return True, track
+            with self._cond:
+                self._note(track)
+                if time.monotonic() >= deadline:
+                    return False, track
+                self._cond.wait(window)
+
+    def _note(self, track, now=None):
+        """更新活动时间和写入间隔估计 - Update the activity time and write-gap estimate"""
+        now = time.monotonic() if now is None else now
+        if track.events:
+            gap = now - track.last_activity
+            track.gap_estimate += GAP_SMOOTHING * (gap - track.gap_estimate)
+        track.last_activity = now
+        track.events += 1
+        self._cond.notify_all()
+
+    @staticmethod
+    def _is_readable(path):
+        """写入方仍独占文件时无法读取 - The file cannot be read while the writer still holds it exclusively"""
+        try:
+            with open(path, 'rb') as f:
+                f.read(1)
+            return True
+        except OSError:
+            return False